@@ -0,0 +1,54 @@
+"""
+Measure the throughput of the predictors of FlateDecode and LZWDecode, by
+predictor type.
+
+Usage:
+
+    python3 benchmark/bench_predictors.py
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "minimal_pdf_parser"))
+
+import filters  # noqa: E402
+from filters import (  # noqa: E402
+    png_predictor_decode, tiff_predictor_decode, PNG_NONE, PNG_SUB, PNG_UP,
+    PNG_AVERAGE, PNG_PAETH)
+
+COLUMNS = 1000
+COLORS = 3
+ROWS = 300
+
+
+def bench(name: str, decode, data: bytes, repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decode(data)
+        best = min(best, time.perf_counter() - start)
+    print("{:<8} {:>8.3f} s {:>8.2f} MB/s".format(
+        name, best, len(data) / best / 1e6))
+
+
+def main():
+    rnd = random.Random(0)
+    row_size = COLUMNS * COLORS
+    rows = [bytes(rnd.randrange(256) for _ in range(row_size))
+            for _ in range(ROWS)]
+    print("numpy: {}".format("yes" if filters.numpy else "no"))
+    for name, predictor in [("None", PNG_NONE), ("Sub", PNG_SUB),
+                            ("Up", PNG_UP), ("Average", PNG_AVERAGE),
+                            ("Paeth", PNG_PAETH)]:
+        data = b"".join(bytes([predictor]) + row for row in rows)
+        bench(name, lambda d: png_predictor_decode(d, COLUMNS, COLORS), data)
+    data = b"".join(rows)
+    bench("TIFF", lambda d: tiff_predictor_decode(d, COLUMNS, COLORS), data)
+    bench("TIFF 16", lambda d: tiff_predictor_decode(
+        d, COLUMNS // 2, COLORS, 16), data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Compare the tokenizer engines on the same inputs.
+
+Usage:
+
+    python3 benchmark/bench_tokenizer.py
+"""
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "minimal_pdf_parser"))
+
+from lexer import tokenize, STATE_ENGINE, TABLE_ENGINE  # noqa: E402
+from tokenizer import BinaryStreamWrapper  # noqa: E402
+
+CONTENT_LINE = (b"BT /F1 9.96 Tf 0.0009 Tc -0.0002 Tw 10.98 0 0 10.98 78.96 "
+                b"36.8003 Tm [(Adobe Sys)5(t)1(ems Inc)5(orporated)5( 20)5"
+                b"(08 \\226 All rights)5( reser)-9(ved)]TJ (Hello) Tj ET\n")
+OBJECT_LINE = (b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+               b"/Resources << /ProcSet [/PDF /Text] /Font << /R6 6 0 R >> >> "
+               b"/Contents 8 0 R /ID <9597C618BC90AFA4A078CA72B2DD061C> >>\n")
+
+
+def bench(name: str, data: bytes, repeat: int = 3):
+    for engine in (STATE_ENGINE, TABLE_ENGINE):
+        best = float("inf")
+        count = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            count = sum(1 for _ in tokenize(
+                BinaryStreamWrapper(io.BytesIO(data)), engine))
+            best = min(best, time.perf_counter() - start)
+        print("{:<8} {:<6} {:>8} tokens {:>8.3f} s {:>8.2f} MB/s".format(
+            name, engine, count, best, len(data) / best / 1e6))
+
+
+def main():
+    bench("content", CONTENT_LINE * 5000)
+    bench("objects", OBJECT_LINE * 5000)
+
+
+if __name__ == "__main__":
+    main()
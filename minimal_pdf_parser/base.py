@@ -1,4 +1,7 @@
-from typing import NamedTuple, List, Any, Dict, Union, TypeVar, Type, cast
+import re
+from typing import (
+    NamedTuple, List, Any, Dict, Union, TypeVar, Type, cast, Optional,
+    Callable, Tuple)
 
 
 class _OpenDictTokenClass:
@@ -28,6 +31,8 @@ CloseArrayToken = _CloseArrayTokenClass()
 
 
 class StringObject:
+    __slots__ = ("bs",)
+
     def __init__(self, bs: bytes):
         self.bs = bs
 
@@ -36,6 +41,8 @@ class StringObject:
 
 
 class NameObject:
+    __slots__ = ("bs",)
+
     def __init__(self, bs: bytes):
         self.bs = bs
 
@@ -44,6 +51,8 @@ class NameObject:
 
 
 class WordToken:
+    __slots__ = ("bs",)
+
     def __init__(self, bs: bytes):
         self.bs = bs
 
@@ -51,7 +60,85 @@ class WordToken:
         return "WordToken({})".format(self.bs)
 
 
+# the names and words are interned: the tokenizers return shared instances
+MAX_INTERNED_LENGTH = 64
+MAX_INTERNED_COUNT = 1 << 16
+NAME_ESCAPE_RE = re.compile(rb"#([0-9A-Fa-f]{2})")
+NAME_CHAR_TO_ESCAPE_RE = re.compile(rb"[^!-~]|[#()<>\[\]{}/%]")
+# a raw spelling may be the decoded form of another name (`/A#2342` is
+# `/A#42`, which is spelled `/A#42` or `/A#2342`...): two tables
+_name_by_spelling = cast(Dict[bytes, NameObject], {})
+_name_by_bytes = cast(Dict[bytes, NameObject], {})
+_word_by_bytes = cast(Dict[bytes, WordToken], {})
+
+
+def decode_name(bs: bytes) -> bytes:
+    """
+    7.3.5 Name Objects: decode the `#xx` escapes. A `#` that is not followed
+    by two hex digits is kept.
+
+    :param bs: the name, as written in the file
+    :return: the name
+    """
+    if b"#" not in bs:
+        return bs
+    return NAME_ESCAPE_RE.sub(lambda m: bytes.fromhex(m.group(1).decode()),
+                              bs)
+
+
+def encode_name(bs: bytes) -> bytes:
+    """
+    7.3.5 Name Objects: escape the delimiters, the `#` and the characters
+    outside the range `!`-`~` (the first slash is kept).
+
+    :param bs: the name
+    :return: the name, as written in a file
+    """
+    return bs[:1] + NAME_CHAR_TO_ESCAPE_RE.sub(
+        lambda m: b"#%02X" % m.group()[0], bs[1:])
+
+
+def intern_name(bs: bytes) -> NameObject:
+    """
+    :param bs: the name, as written in the file
+    :return: the shared name object, or a new one if the name is long or
+    the table is full
+    """
+    try:
+        return _name_by_spelling[bs]
+    except KeyError:
+        pass
+    decoded = decode_name(bs)
+    name = _name_by_bytes.get(decoded)
+    if name is None:
+        name = NameObject(decoded)
+    if (len(bs) <= MAX_INTERNED_LENGTH
+            and len(_name_by_spelling) < MAX_INTERNED_COUNT):
+        name = _name_by_bytes.setdefault(decoded, name)
+        _name_by_spelling[bs] = name
+    return name
+
+
+def intern_word(bs: bytes) -> WordToken:
+    """
+    :param bs: the word: an operator or a keyword
+    :return: the shared word token, or a new one if the word is long or the
+    table is full
+    """
+    try:
+        return _word_by_bytes[bs]
+    except KeyError:
+        pass
+    word = WordToken(bs)
+    if (len(bs) <= MAX_INTERNED_LENGTH
+            and len(_word_by_bytes) < MAX_INTERNED_COUNT):
+        word = _word_by_bytes.setdefault(bs, word)
+    return word
+
+
 class ArrayObject:
+    __slots__ = ("_arr",)
+
     def __init__(self, arr: List[Any]):
         self._arr = arr
 
@@ -63,6 +150,8 @@ class ArrayObject:
 
 
 class DictObject:
+    __slots__ = ("_d",)
+
     def __init__(self, d: Dict[bytes, Any]):
         self._d = d
 
@@ -79,44 +168,150 @@ class DictObject:
         return self._d.items()
 
 
+# (buffer, start, end) -> the object
+ValueParser = Callable[[Any, int, int], Any]
+
+
+class LazyArrayObject(ArrayObject):
+    """
+    An array whose elements are parsed on first access. The span of each
+    element in the buffer was found by a structural scan.
+    """
+    __slots__ = ("_buf", "_spans", "_parse_value", "_values")
+
+    def __init__(self, buf: Any, spans: List[Tuple[int, int]],
+                 parse_value: ValueParser):
+        """
+        :param buf: the buffer
+        :param spans: the span (start, end) of each element
+        :param parse_value: the function that parses an element
+        """
+        self._buf = buf
+        self._spans = spans
+        self._parse_value = parse_value
+        self._values = cast(Optional[List[Any]], None)
+
+    @property
+    def _arr(self) -> List[Any]:
+        if self._values is None:
+            self._values = [self._parse_value(self._buf, start, end)
+                            for start, end in self._spans]
+        return self._values
+
+
+class LazyDictObject(DictObject):
+    """
+    A dictionary whose values are parsed on first access. The span of each
+    value in the buffer was found by a structural scan.
+    """
+    __slots__ = ("_buf", "_spans", "_parse_value", "_values")
+
+    def __init__(self, buf: Any, spans: Dict[bytes, Tuple[int, int]],
+                 parse_value: ValueParser):
+        """
+        :param buf: the buffer
+        :param spans: the span (start, end) of each value, by key
+        :param parse_value: the function that parses a value
+        """
+        self._buf = buf
+        self._spans = spans
+        self._parse_value = parse_value
+        self._values = cast(Dict[bytes, Any], {})
+
+    @property
+    def _d(self) -> Dict[bytes, Any]:
+        if len(self._values) < len(self._spans):
+            self._values = {key: self[key] for key in self._spans}
+        return self._values
+
+    def __getitem__(self, item):
+        if item in self._values:
+            return self._values[item]
+        start, end = self._spans[item]
+        value = self._parse_value(self._buf, start, end)
+        self._values[item] = value
+        return value
+
+    def get(self, item, default_value=None):
+        if item in self._spans:
+            return self[item]
+        return default_value
+
+
 BooleanObject = NamedTuple("BooleanObject", [("value", bool)])
 class NullObject: pass
 
 
 class NumberObject:
-    def __init__(self, bs: bytes):
-        self._bs = bs
-
-    def __repr__(self) -> str:
-        return "NumberObject(text={})".format(repr(self._bs))
+    """
+    7.3.3 Numeric Objects
+
+    The text is converted once, when the token is read. The value of a
+    malformed number (`-`, `1.2.3`...) raises a ValueError when it is read.
+    """
+    __slots__ = ("_value", "_malformed")
+
+    def __init__(self, bs: Union[bytes, int, float]):
+        """
+        :param bs: the text of the number, or its value
+        """
+        self._malformed = cast(Optional[bytes], None)
+        self._value = cast(Union[int, float], 0)
+        if isinstance(bs, (bytes, bytearray)):
+            try:
+                self._value = parse_number(bs)
+            except ValueError:
+                self._malformed = bytes(bs)
+        else:
+            self._value = bs
 
     @property
     def value(self) -> Union[int, float]:
-        if b"." in self._bs:
-            return float(self._bs)
-        else:
-            return int(self._bs)
+        """
+        :raise ValueError: if the number is malformed
+        """
+        if self._malformed is not None:
+            raise ValueError(
+                "Malformed number {}".format(repr(self._malformed)))
+        return self._value
 
+    def __repr__(self) -> str:
+        if self._malformed is not None:
+            return "NumberObject(text={})".format(repr(self._malformed))
+        return "NumberObject(value={})".format(repr(self._value))
 
-class IndirectRef:
-    def __init__(self, obj_num: NumberObject, gen_num: NumberObject):
-        self._obj_num = obj_num
-        self._gen_num = gen_num
 
-    def __repr__(self) -> str:
-        return "IndirectRef(obj_num={}, gen_num={})".format(self._obj_num,
-                                                            self._gen_num)
+def parse_number(bs: bytes) -> Union[int, float]:
+    """
+    :param bs: the text of a number
+    :return: the value of the number
+    :raise ValueError: if the number is malformed
+    """
+    if b"." in bs:
+        return float(bs)
+    return int(bs)
 
-    @property
-    def obj_num(self) -> int:
-        return self._obj_num.value
 
-    @property
-    def gen_num(self) -> int:
-        return self._gen_num.value
+class IndirectRef:
+    __slots__ = ("obj_num", "gen_num")
+
+    def __init__(self, obj_num: Union[int, NumberObject],
+                 gen_num: Union[int, NumberObject]):
+        if isinstance(obj_num, NumberObject):
+            obj_num = obj_num.value
+        if isinstance(gen_num, NumberObject):
+            gen_num = gen_num.value
+        self.obj_num = cast(int, obj_num)
+        self.gen_num = cast(int, gen_num)
+
+    def __repr__(self) -> str:
+        return "IndirectRef(obj_num={}, gen_num={})".format(self.obj_num,
+                                                            self.gen_num)
 
 
 class IndirectObject:
+    __slots__ = ("obj_num", "gen_num", "object")
+
     def __init__(self, obj_num: int, gen_num: int, object: Any):
         self.obj_num = obj_num
         self.gen_num = gen_num
@@ -128,13 +323,40 @@ class IndirectObject:
 
 
 class StreamObject:
+    __slots__ = ("obj_num", "gen_num", "object", "start", "_length",
+                 "_length_resolver")
+
     def __init__(self, obj_num: int, gen_num: int, object: DictObject,
-                 start: int, length: int):
+                 start: int, length: Optional[int],
+                 length_resolver: Optional[
+                     Callable[["StreamObject"], int]] = None):
+        """
+        :param start: the offset of the data
+        :param length: the length of the data, or None if it is an indirect
+                       object that is not read yet
+        :param length_resolver: the function that computes the length if
+                                `length` is None
+        """
         self.obj_num = obj_num
         self.gen_num = gen_num
         self.object = object
         self.start = start
-        self.length = length
+        self._length = length
+        self._length_resolver = length_resolver
+
+    @property
+    def length(self) -> int:
+        if self._length is None:
+            self._length = self._length_resolver(self)
+        return self._length
+
+    @length.setter
+    def length(self, length: int):
+        self._length = length
+
+    @property
+    def length_resolved(self) -> bool:
+        return self._length is not None
 
     def __repr__(self, ):
         return "StreamObject({}, {}, {}, {}, {})".format(self.obj_num,
@@ -0,0 +1,190 @@
+import io
+import mmap
+import os
+from typing import BinaryIO, Any
+
+from tokenizer import LINE_FEED, CARRIAGE_RETURN
+
+FIND_CHUNK_SIZE = 256
+
+
+class BufferStream:
+    """
+    A read only, BinaryIO like, stream over a buffer: `bytes`, `mmap` or any
+    object supporting the buffer protocol. Reads return `memoryview` slices
+    of the buffer: nothing is copied.
+
+    Several streams may share the same buffer, each one with its own
+    position (see `fork`).
+    """
+
+    @staticmethod
+    def from_file(stream: BinaryIO) -> "BufferStream":
+        """Map a file in memory. The OS page cache is shared by processes."""
+        return BufferStream(
+            mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __init__(self, buf: Any, pos: int = 0):
+        self._buf = buf
+        self._view = memoryview(buf).cast("B")
+        self._pos = pos
+        # bytes, bytearray and mmap have a `find` method
+        self._buf_find = getattr(buf, "find", None)
+
+    def fork(self, pos: int = 0) -> "BufferStream":
+        """
+        :param pos: the position of the new stream
+        :return: a new stream on the same buffer
+        """
+        return BufferStream(self._buf, pos)
+
+    def getbuffer(self) -> memoryview:
+        return self._view
+
+    def __len__(self) -> int:
+        return len(self._view)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = len(self._view) + offset
+        else:
+            raise ValueError(whence)
+        return self._pos
+
+    def read(self, size: int = -1) -> memoryview:
+        start = self._pos
+        if size < 0:
+            end = len(self._view)
+        else:
+            end = min(start + size, len(self._view))
+        self._pos = end
+        return self._view[start:end]
+
+    def readline(self) -> bytes:
+        """
+        Read a line. The EOL may be CR, LF or CRLF and is not returned.
+
+        :return: the line, without the EOL
+        """
+        view = self._view
+        start = self._pos
+        end = self.find_eol(start)
+        if end == -1:
+            self._pos = len(view)
+            return bytes(view[start:])
+
+        if view[end] == CARRIAGE_RETURN and end + 1 < len(view) and view[
+                end + 1] == LINE_FEED:
+            self._pos = end + 2
+        else:
+            self._pos = end + 1
+        return bytes(view[start:end])
+
+    def find_eol(self, start: int) -> int:
+        """
+        :param start: the start position
+        :return: the position of the next CR or LF, or -1
+        """
+        size = len(self._view)
+        while start < size:
+            end = min(start + FIND_CHUNK_SIZE, size)
+            lf = self.find(b"\n", start, end)
+            cr = self.find(b"\r", start, end if lf == -1 else lf)
+            if cr != -1:
+                return cr
+            elif lf != -1:
+                return lf
+            start = end
+        return -1
+
+    def find(self, sub: bytes, start: int, end: int) -> int:
+        """
+        :return: the position of `sub` in the buffer between `start` and
+        `end`, or -1
+        """
+        if self._buf_find is not None:
+            return self._buf_find(sub, start, end)
+        i = bytes(self._view[start:end]).find(sub)
+        if i == -1:
+            return -1
+        return start + i
+
+
+class PreadStream:
+    """
+    A read only, BinaryIO like, stream over a file descriptor. Reads are
+    positional (`os.pread`): the file offset of the descriptor is never
+    used, and each fork has its own position. Hence several threads may read
+    the same file through their own forks.
+    """
+
+    @staticmethod
+    def from_file(stream: BinaryIO) -> Any:
+        """
+        :param stream: a file
+        :return: a PreadStream, or a memory mapped BufferStream if `os.pread`
+        is not available
+        """
+        if not hasattr(os, "pread"):
+            return BufferStream.from_file(stream)
+        fd = stream.fileno()
+        return PreadStream(fd, os.fstat(fd).st_size)
+
+    def __init__(self, fd: int, size: int, pos: int = 0):
+        """
+        :param fd: the file descriptor. It is not closed by the stream.
+        :param size: the size of the file
+        :param pos: the position
+        """
+        self._fd = fd
+        self._size = size
+        self._pos = pos
+
+    def fork(self, pos: int = 0) -> "PreadStream":
+        """
+        :param pos: the position of the new stream
+        :return: a new stream on the same file
+        """
+        return PreadStream(self._fd, self._size, pos)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = self._size + offset
+        else:
+            raise ValueError(whence)
+        return self._pos
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0:
+            size = self._size - self._pos
+        data = self.pread(size, self._pos)
+        self._pos += len(data)
+        return data
+
+    def pread(self, size: int, offset: int) -> bytes:
+        """
+        Read `size` bytes at `offset`. The position is not modified.
+        """
+        if size <= 0 or offset >= self._size:
+            return b""
+        return os.pread(self._fd, size, offset)
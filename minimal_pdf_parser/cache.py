@@ -0,0 +1,233 @@
+"""
+A cache of the objects of a document, and a cache of the decoded streams.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import (
+    Any, Dict, Hashable, NamedTuple, Optional, Set, Callable, Tuple, cast)
+
+from base import (
+    DictObject, ArrayObject, StringObject, NameObject, IndirectObject,
+    StreamObject, LazyDictObject, LazyArrayObject)
+
+# a rough size of a Python object, in bytes
+OBJECT_OVERHEAD = 56
+ITEM_OVERHEAD = 16
+# the default budget of a stream cache, in bytes
+STREAM_CACHE_SIZE = 16 * 1024 * 1024
+
+CacheStats = NamedTuple("CacheStats", [
+    ("hits", int), ("misses", int), ("evictions", int), ("entries", int),
+    ("size", int)
+])
+
+
+def estimate_size(obj: Any) -> int:
+    """
+    :param obj: a PDF object
+    :return: an estimate of the memory used by the object, in bytes
+    """
+    if isinstance(obj, (IndirectObject, StreamObject)):
+        return OBJECT_OVERHEAD + estimate_size(obj.object)
+    elif isinstance(obj, LazyDictObject):
+        # don't parse the values: the size of the source is close enough
+        return OBJECT_OVERHEAD + sum(
+            ITEM_OVERHEAD + len(k) + end - start
+            for k, (start, end) in obj._spans.items())
+    elif isinstance(obj, LazyArrayObject):
+        return OBJECT_OVERHEAD + sum(
+            ITEM_OVERHEAD + end - start for start, end in obj._spans)
+    elif isinstance(obj, DictObject):
+        return OBJECT_OVERHEAD + sum(
+            ITEM_OVERHEAD + len(k) + estimate_size(v) for k, v in obj.items())
+    elif isinstance(obj, ArrayObject):
+        return OBJECT_OVERHEAD + sum(
+            ITEM_OVERHEAD + estimate_size(v) for v in obj)
+    elif isinstance(obj, (StringObject, NameObject)):
+        return OBJECT_OVERHEAD + len(obj.bs)
+    else:
+        return OBJECT_OVERHEAD
+
+
+class ObjectCache:
+    """
+    A cache of the indirect objects, by obj num.
+
+    If `max_entries` or `max_size` is set, the least recently used objects
+    are evicted when the cache is full. The pinned objects (root, page tree
+    nodes, fonts...) are never evicted and are not counted in the budget.
+
+    Any object with the same `get`, `put`, `pin` and `__contains__` methods
+    may be used by a `PDFDocument`.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None,
+                 max_size: Optional[int] = None,
+                 size_of: Callable[[Any], int] = estimate_size):
+        """
+        :param max_entries: the maximum number of unpinned objects, or None
+        :param max_size: the maximum estimated size of the unpinned objects,
+                         in bytes, or None
+        :param size_of: the function that estimates the size of an object
+        """
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self._size_of = size_of
+        # least recently used first: obj num -> (obj, size)
+        self._lru = cast("OrderedDict[int, Tuple[Any, int]]", OrderedDict())
+        self._pinned = cast(Dict[int, Any], {})
+        self._pinned_nums = cast(Set[int], set())
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, obj_num: int) -> Any:
+        """
+        :param obj_num: the obj num
+        :return: the object
+        :raise KeyError: if the object is not in the cache
+        """
+        try:
+            obj = self._pinned[obj_num]
+        except KeyError:
+            try:
+                obj, _ = self._lru[obj_num]
+            except KeyError:
+                self.misses += 1
+                raise
+            self._lru.move_to_end(obj_num)
+        self.hits += 1
+        return obj
+
+    def put(self, obj_num: int, obj: Any):
+        """
+        Add an object, and evict the least recently used objects if the
+        cache is full.
+        """
+        if obj_num in self._pinned_nums:
+            self._pinned[obj_num] = obj
+            return
+        if self.max_entries is None and self.max_size is None:
+            size = 0  # unbounded: don't walk the object
+        else:
+            size = self._size_of(obj)
+        self._discard(obj_num)
+        self._lru[obj_num] = (obj, size)
+        self._size += size
+        self._evict()
+
+    def pin(self, obj_num: int):
+        """
+        Pin an object: it won't be evicted. The object may be put later.
+        """
+        self._pinned_nums.add(obj_num)
+        try:
+            obj, size = self._lru.pop(obj_num)
+        except KeyError:
+            return
+        self._size -= size
+        self._pinned[obj_num] = obj
+
+    def unpin(self, obj_num: int):
+        self._pinned_nums.discard(obj_num)
+        try:
+            obj = self._pinned.pop(obj_num)
+        except KeyError:
+            return
+        self.put(obj_num, obj)
+
+    def _discard(self, obj_num: int):
+        try:
+            _, size = self._lru.pop(obj_num)
+        except KeyError:
+            pass
+        else:
+            self._size -= size
+
+    def _evict(self):
+        lru = self._lru
+        while lru and (
+                (self.max_entries is not None and len(lru) > self.max_entries)
+                or (self.max_size is not None and self._size > self.max_size)):
+            _, (_, size) = lru.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+
+    def clear(self):
+        self._lru.clear()
+        self._pinned.clear()
+        self._size = 0
+
+    def __contains__(self, obj_num: int) -> bool:
+        return obj_num in self._pinned or obj_num in self._lru
+
+    def __len__(self) -> int:
+        return len(self._pinned) + len(self._lru)
+
+    @property
+    def stats(self) -> CacheStats:
+        return CacheStats(self.hits, self.misses, self.evictions, len(self),
+                          self._size)
+
+
+class StreamCache(ObjectCache):
+    """
+    A cache of the decoded data of the streams, with a budget in bytes.
+
+    The key is (obj num, gen num), or, if `content_addressed` is True, a hash
+    of the raw data and of the filters of the stream: a cache shared by the
+    documents of a batch keeps one entry for the identical streams (fonts,
+    ToUnicode CMaps, form XObjects...) of several files. A cache that is not
+    content addressed must not be shared.
+
+    Unlike an `ObjectCache`, the methods are thread safe.
+    """
+
+    def __init__(self, max_size: Optional[int] = STREAM_CACHE_SIZE,
+                 max_entry_size: Optional[int] = None,
+                 content_addressed: bool = False):
+        """
+        :param max_size: the maximum size of the data, in bytes, or None
+        :param max_entry_size: the maximum size of the data of a stream. The
+                               larger streams are not cached. Default is a
+                               quarter of `max_size`.
+        :param content_addressed: if True, the key is a hash of the stream
+        """
+        ObjectCache.__init__(self, max_size=max_size, size_of=len)
+        if max_entry_size is None and max_size is not None:
+            max_entry_size = max_size // 4
+        self.max_entry_size = max_entry_size
+        self.content_addressed = content_addressed
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def content_key(raw: bytes, filters: bytes) -> bytes:
+        """
+        :param raw: the raw (decrypted) data of the stream
+        :param filters: the /Filter and /DecodeParms of the stream
+        :return: a key that does not depend on the document
+        """
+        h = hashlib.sha256(filters)
+        h.update(b"\x00")
+        h.update(raw)
+        return h.digest()
+
+    def accepts(self, size: int) -> bool:
+        """:return: True if a stream of this size may be cached"""
+        return self.max_entry_size is None or size <= self.max_entry_size
+
+    def get(self, key: Hashable) -> bytes:
+        with self._lock:
+            return ObjectCache.get(self, key)
+
+    def put(self, key: Hashable, data: bytes):
+        if not self.accepts(len(data)):
+            return
+        with self._lock:
+            ObjectCache.put(self, key, data)
+
+    def clear(self):
+        with self._lock:
+            ObjectCache.clear(self)
@@ -2,18 +2,25 @@ from typing import Iterator, Mapping
 
 from base import (NumberObject,
     WordToken, checked_cast, StringObject, ArrayObject)
-from tokenizer import (PDFTokenizer, StreamWrapper)
+from tokenizer import StreamWrapper
+from lexer import tokenize, STATE_ENGINE
 from pdf_operator import *
 
 class ContentParser:
     _logger = logging.getLogger(__name__)
 
+    def __init__(self, engine: str = STATE_ENGINE):
+        """
+        :param engine: the tokenizer engine, `STATE_ENGINE` or `TABLE_ENGINE`
+        """
+        self._engine = engine
+
     def parse_content(self, stream_wrapper: StreamWrapper
                       ) -> Iterator[Operation]:
         stack = TokenStack()
 
         # See : Table A.1 – PDF content stream operators
-        for token in PDFTokenizer(stream_wrapper):
+        for token in tokenize(stream_wrapper, self._engine):
             if isinstance(token, WordToken):
                 token_bytes = token.bs
                 try:
@@ -38,7 +45,7 @@ class ContentParser:
         fchar_count = 0
         frange_count = 0
         encoding = {}
-        for token in PDFTokenizer(stream_wrapper):
+        for token in tokenize(stream_wrapper, self._engine):
             if isinstance(token, WordToken):
                 token_bytes = token.bs
                 if token_bytes == b"beginbfchar":
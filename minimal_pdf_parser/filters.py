@@ -0,0 +1,511 @@
+"""
+7.4 Filters
+
+The filters are decoded chunk by chunk: each stage of the pipeline consumes
+and produces chunks, and keeps at most a partial group, row or run between two
+chunks. A large stream is never fully resident.
+"""
+import base64
+import logging
+import sys
+import zlib
+from array import array
+from functools import lru_cache
+from typing import (
+    List, Tuple, Optional, Any, Iterable, Iterator, Callable, Dict, cast)
+
+try:
+    import numpy
+except ImportError:  # the predictors use a pure Python implementation
+    numpy = None
+
+from base import (
+    DictObject, NameObject, ArrayObject, NullObject, checked_cast, check,
+    get_num)
+
+_logger = logging.getLogger(__name__)
+
+FLATE_DECODE = b"/FlateDecode"
+ASCII_HEX_DECODE = b"/ASCIIHexDecode"
+ASCII85_DECODE = b"/ASCII85Decode"
+LZW_DECODE = b"/LZWDecode"
+RUN_LENGTH_DECODE = b"/RunLengthDecode"
+CRYPT = b"/Crypt"
+# the data of the image codecs is returned encoded
+IMAGE_FILTERS = {b"/DCTDecode", b"/JPXDecode", b"/JBIG2Decode",
+                 b"/CCITTFaxDecode"}
+# Table 94 – Additional Abbreviations in an Inline Image Object
+FILTER_BY_ABBREVIATION = {
+    b"/AHx": ASCII_HEX_DECODE,
+    b"/A85": ASCII85_DECODE,
+    b"/LZW": LZW_DECODE,
+    b"/Fl": FLATE_DECODE,
+    b"/RL": RUN_LENGTH_DECODE,
+    b"/CCF": b"/CCITTFaxDecode",
+    b"/DCT": b"/DCTDecode",
+}
+# the max size of a chunk inflated from one compressed chunk
+MAX_INFLATED_SIZE = 64 * 1024
+WHITESPACES = b"\x00\t\n\x0c\r "
+LZW_CLEAR_TABLE = 256
+LZW_EOD = 257
+LZW_MAX_CODE_SIZE = 12
+RUN_LENGTH_EOD = 128
+
+# 7.4.4.4 LZW and Flate Predictor Functions
+NO_PREDICTION = 1
+TIFF_PREDICTOR_2 = 2
+PNG_NONE = 0
+PNG_SUB = 1
+PNG_UP = 2
+PNG_AVERAGE = 3
+PNG_PAETH = 4
+
+Filter = Tuple[bytes, Optional[DictObject]]
+# (encoded chunks, decode parms) -> decoded chunks
+Decoder = Callable[[Iterator[Any], Optional[DictObject]], Iterator[Any]]
+
+
+def get_filters(stream_dict: DictObject,
+                resolve: Callable[[Any], Any] = lambda obj: obj
+                ) -> List[Filter]:
+    """
+    Table 5 – Entries common to all stream dictionaries
+
+    :param stream_dict: the stream dictionary
+    :param resolve: a function that derefs the indirect /Filter,
+                    /DecodeParms and items of these arrays. The entries of
+                    a xref stream are direct: the default is the identity.
+    :return: the list of (filter name, decode parms). A null decode parms
+    is None.
+    """
+    filter_obj = resolve(stream_dict.get(b"/Filter"))
+    if filter_obj is None or filter_obj is NullObject:
+        return []
+    parms_obj = resolve(stream_dict.get(b"/DecodeParms"))
+    if isinstance(filter_obj, NameObject):
+        names = [filter_obj.bs]
+        parms = [parms_obj]
+    else:
+        names = [checked_cast(NameObject, resolve(f)).bs
+                 for f in checked_cast(ArrayObject, filter_obj)]
+        if parms_obj is None or parms_obj is NullObject:
+            parms = []
+        else:
+            parms = [resolve(parm)
+                     for parm in checked_cast(ArrayObject, parms_obj)]
+        parms += [None] * (len(names) - len(parms))
+    return [(name, None if parm is NullObject else parm)
+            for name, parm in zip(names, parms)]
+
+
+def decode_data(data: Any, filters: List[Filter]) -> bytes:
+    """
+    Decode the whole data of a stream.
+
+    :param data: the encoded data
+    :param filters: the list of (filter name, decode parms)
+    :return: the decoded data
+    """
+    return b"".join(decode_chunks([data], filters))
+
+
+def decode_chunks(chunks: Iterable[Any], filters: List[Filter]
+                  ) -> Iterator[Any]:
+    """
+    Chain the decoders of the filters. The image codecs (and the filters
+    after them) are not decoded.
+
+    :param chunks: the encoded data, by chunks
+    :param filters: the list of (filter name, decode parms)
+    :return: an iterator over the decoded chunks
+    :raise NotImplementedError: if a filter is unknown
+    """
+    it = iter(chunks)
+    for name, parms in filters:
+        name = FILTER_BY_ABBREVIATION.get(name, name)
+        if name in IMAGE_FILTERS:
+            break
+        try:
+            decoder = DECODER_BY_NAME[name]
+        except KeyError:
+            raise NotImplementedError(name)
+        it = decoder(it, parms)
+    return it
+
+
+def flate_decode(chunks: Iterator[Any], parms: Optional[DictObject]
+                 ) -> Iterator[Any]:
+    """7.4.4 LZWDecode and FlateDecode Filters"""
+    return predictor_decode(_inflate(chunks), parms)
+
+
+def _inflate(chunks: Iterator[Any]) -> Iterator[bytes]:
+    decompressobj = zlib.decompressobj()
+    for chunk in chunks:
+        data = decompressobj.decompress(chunk, MAX_INFLATED_SIZE)
+        while data:
+            yield data
+            data = decompressobj.decompress(decompressobj.unconsumed_tail,
+                                            MAX_INFLATED_SIZE)
+    data = decompressobj.flush()
+    if data:
+        yield data
+
+
+def lzw_decode(chunks: Iterator[Any], parms: Optional[DictObject]
+               ) -> Iterator[Any]:
+    """7.4.4 LZWDecode and FlateDecode Filters"""
+    early_change = 1 if parms is None else get_num(parms, b"/EarlyChange", 1)
+    return predictor_decode(_lzw_decode(chunks, early_change), parms)
+
+
+def _lzw_decode(chunks: Iterator[Any], early_change: int) -> Iterator[bytes]:
+    table = [bytes((i,)) for i in range(256)] + [b"", b""]
+    code_size = 9
+    bits = 0  # the bits not decoded yet
+    bit_count = 0
+    prev = b""
+    for chunk in chunks:
+        out = bytearray()
+        for byte in bytes(chunk):
+            bits = (bits << 8) | byte
+            bit_count += 8
+            while bit_count >= code_size:
+                bit_count -= code_size
+                code = bits >> bit_count
+                bits &= (1 << bit_count) - 1
+                if code == LZW_CLEAR_TABLE:
+                    del table[258:]
+                    code_size = 9
+                    prev = b""
+                    continue
+                elif code == LZW_EOD:
+                    yield bytes(out)
+                    return
+                elif code < len(table):
+                    entry = table[code]
+                    if prev:
+                        table.append(prev + entry[:1])
+                elif code == len(table) and prev:
+                    entry = prev + prev[:1]
+                    table.append(entry)
+                else:
+                    raise ValueError("LZW: unknown code {}".format(code))
+                out += entry
+                prev = entry
+                if (len(table) + early_change >= 1 << code_size
+                        and code_size < LZW_MAX_CODE_SIZE):
+                    code_size += 1
+        if out:
+            yield bytes(out)
+
+
+def ascii_hex_decode(chunks: Iterator[Any], parms: Optional[DictObject]
+                     ) -> Iterator[bytes]:
+    """7.4.2 ASCIIHexDecode Filter"""
+    rest = b""  # an odd digit
+    for chunk in chunks:
+        data = bytes(chunk)
+        eod = data.find(b">")
+        if eod != -1:
+            data = data[:eod]
+        digits = rest + data.translate(None, WHITESPACES)
+        even = len(digits) - len(digits) % 2
+        if even:
+            yield bytes.fromhex(digits[:even].decode("ascii"))
+        rest = digits[even:]
+        if eod != -1:
+            break
+    if rest:
+        yield bytes.fromhex((rest + b"0").decode("ascii"))
+
+
+def ascii85_decode(chunks: Iterator[Any], parms: Optional[DictObject]
+                   ) -> Iterator[bytes]:
+    """7.4.3 ASCII85Decode Filter"""
+    rest = b""  # a partial group
+    for chunk in chunks:
+        data = bytes(chunk)
+        eod = data.find(b"~")
+        if eod != -1:
+            data = data[:eod]
+        # `z` is a group of zeros
+        data = rest + data.translate(None, WHITESPACES).replace(b"z", b"!!!!!")
+        aligned = len(data) - len(data) % 5
+        if aligned:
+            yield base64.a85decode(data[:aligned])
+        rest = data[aligned:]
+        if eod != -1:
+            break
+    if len(rest) > 1:  # a final partial group of n chars gives n - 1 bytes
+        yield base64.a85decode(rest)
+
+
+def run_length_decode(chunks: Iterator[Any], parms: Optional[DictObject]
+                      ) -> Iterator[bytes]:
+    """7.4.5 RunLengthDecode Filter"""
+    rest = b""  # a partial run
+    for chunk in chunks:
+        data = rest + bytes(chunk)
+        out = bytearray()
+        i = 0
+        while i < len(data):
+            length = data[i]
+            if length < RUN_LENGTH_EOD:  # copy length + 1 bytes
+                if i + length + 2 > len(data):
+                    break
+                out += data[i + 1:i + length + 2]
+                i += length + 2
+            elif length > RUN_LENGTH_EOD:  # repeat 257 - length times
+                if i + 2 > len(data):
+                    break
+                out += data[i + 1:i + 2] * (257 - length)
+                i += 2
+            else:
+                yield bytes(out)
+                return
+        rest = data[i:]
+        if out:
+            yield bytes(out)
+
+
+def pass_through(chunks: Iterator[Any], parms: Optional[DictObject]
+                 ) -> Iterator[Any]:
+    """7.4.10 Crypt Filter: the data was decrypted by the parser"""
+    return chunks
+
+
+DECODER_BY_NAME = cast(Dict[bytes, Decoder], {
+    FLATE_DECODE: flate_decode,
+    LZW_DECODE: lzw_decode,
+    ASCII_HEX_DECODE: ascii_hex_decode,
+    ASCII85_DECODE: ascii85_decode,
+    RUN_LENGTH_DECODE: run_length_decode,
+    CRYPT: pass_through,
+})
+
+
+def predictor_decode(chunks: Iterator[Any], parms: Optional[DictObject]
+                     ) -> Iterator[Any]:
+    """
+    Table 8 – Optional parameters for LZWDecode and FlateDecode filters
+    """
+    if parms is None:
+        return chunks
+    predictor = get_num(parms, b"/Predictor", NO_PREDICTION)
+    if predictor == NO_PREDICTION:
+        return chunks
+    colors = get_num(parms, b"/Colors", 1)
+    bits_per_component = get_num(parms, b"/BitsPerComponent", 8)
+    columns = get_num(parms, b"/Columns", 1)
+    if predictor >= 10:
+        return _png_predictor_decode_chunks(chunks, columns, colors,
+                                            bits_per_component)
+    elif predictor == TIFF_PREDICTOR_2:
+        return _tiff_predictor_decode_chunks(chunks, columns, colors,
+                                             bits_per_component)
+    raise NotImplementedError(predictor)
+
+
+def _png_predictor_decode_chunks(chunks: Iterator[Any], columns: int,
+                                 colors: int, bits_per_component: int
+                                 ) -> Iterator[bytes]:
+    row_size = (columns * colors * bits_per_component + 7) // 8
+    prev = bytes(row_size)
+    rest = b""  # a partial row
+    for chunk in chunks:
+        data = rest + bytes(chunk)
+        aligned = len(data) - len(data) % (row_size + 1)
+        if aligned:
+            ret = png_predictor_decode(data[:aligned], columns, colors,
+                                       bits_per_component, prev)
+            prev = ret[-row_size:]
+            yield ret
+        rest = data[aligned:]
+    if rest:
+        # a truncated stream: the last row is decoded as if it was padded
+        # with zeros
+        _logger.warning("Predictor: truncated row of %d bytes", len(rest))
+        padded = rest + bytes(row_size + 1 - len(rest))
+        yield png_predictor_decode(padded, columns, colors,
+                                   bits_per_component, prev)[:len(rest) - 1]
+
+
+def _tiff_predictor_decode_chunks(chunks: Iterator[Any], columns: int,
+                                  colors: int, bits_per_component: int
+                                  ) -> Iterator[bytes]:
+    row_size = (columns * colors * bits_per_component + 7) // 8
+    rest = b""  # a partial row
+    for chunk in chunks:
+        data = rest + bytes(chunk)
+        aligned = len(data) - len(data) % row_size
+        if aligned:
+            yield tiff_predictor_decode(data[:aligned], columns, colors,
+                                        bits_per_component)
+        rest = data[aligned:]
+    if rest:
+        _logger.warning("Predictor: truncated row of %d bytes", len(rest))
+        padded = rest + bytes(row_size - len(rest))
+        yield tiff_predictor_decode(padded, columns, colors,
+                                    bits_per_component)[:len(rest)]
+
+
+def png_predictor_decode(data: bytes, columns: int, colors: int = 1,
+                         bits_per_component: int = 8,
+                         prev: Optional[bytes] = None) -> bytes:
+    """
+    Undo the PNG predictors: each row starts with a byte that gives the
+    predictor of the row. The Sub and Up rows are decoded in a few
+    operations on the whole row; the Average and Paeth rows byte by byte.
+
+    See https://www.w3.org/TR/PNG-Filters.html
+
+    :param prev: the previous row, if the data is not the first row
+    """
+    bpp = max(1, colors * bits_per_component // 8)
+    row_size = (columns * colors * bits_per_component + 7) // 8
+    check(len(data) % (row_size + 1) == 0,
+          "Predictor: length {} is not a multiple of {}", len(data),
+          row_size + 1)
+    prev = bytes(row_size) if prev is None else bytes(prev)
+    rows = []
+    for i in range(0, len(data), row_size + 1):
+        predictor = data[i]
+        row = data[i + 1:i + 1 + row_size]
+        if predictor == PNG_NONE:
+            pass
+        elif predictor == PNG_SUB:
+            row = sub_decode(row, bpp)
+        elif predictor == PNG_UP:
+            row = add_bytes(row, prev)
+        elif predictor == PNG_AVERAGE:
+            row = _average_decode(row, prev, bpp)
+        elif predictor == PNG_PAETH:
+            row = _paeth_decode(row, prev, bpp)
+        else:
+            raise ValueError("Unknown PNG predictor {}".format(predictor))
+        rows.append(row)
+        prev = row
+    return b"".join(rows)
+
+
+def tiff_predictor_decode(data: bytes, columns: int, colors: int = 1,
+                          bits_per_component: int = 8) -> bytes:
+    """
+    Undo the TIFF predictor 2: each component is the difference with the
+    same component of the previous pixel of the row.
+    """
+    row_size = (columns * colors * bits_per_component + 7) // 8
+    check(len(data) % row_size == 0,
+          "Predictor: length {} is not a multiple of {}", len(data),
+          row_size)
+    if bits_per_component == 8:
+        return b"".join(sub_decode(data[i:i + row_size], colors)
+                        for i in range(0, len(data), row_size))
+    elif bits_per_component == 16:
+        return b"".join(sub_decode_16(data[i:i + row_size], colors)
+                        for i in range(0, len(data), row_size))
+    raise NotImplementedError(
+        "TIFF predictor: {} bits per component".format(bits_per_component))
+
+
+def _average_decode(row: bytes, prev: bytes, bpp: int) -> bytes:
+    ret = bytearray(row)
+    for j in range(bpp):
+        ret[j] = (ret[j] + (prev[j] >> 1)) & 0xFF
+    for j in range(bpp, len(ret)):
+        ret[j] = (ret[j] + ((ret[j - bpp] + prev[j]) >> 1)) & 0xFF
+    return bytes(ret)
+
+
+def _paeth_decode(row: bytes, prev: bytes, bpp: int) -> bytes:
+    ret = bytearray(row)
+    for j in range(bpp):  # left and up left are 0: the predictor is up
+        ret[j] = (ret[j] + prev[j]) & 0xFF
+    for j in range(bpp, len(ret)):
+        a = ret[j - bpp]
+        b = prev[j]
+        c = prev[j - bpp]
+        pa = abs(b - c)  # |p - a| with p = a + b - c
+        pb = abs(a - c)
+        pc = abs(a + b - 2 * c)
+        if pa <= pb and pa <= pc:
+            ret[j] = (ret[j] + a) & 0xFF
+        elif pb <= pc:
+            ret[j] = (ret[j] + b) & 0xFF
+        else:
+            ret[j] = (ret[j] + c) & 0xFF
+    return bytes(ret)
+
+
+# Bytewise operations on whole rows. With NumPy, on uint8 arrays. Without,
+# on the row as a big int: the bytes are added in parallel (SWAR), the high
+# bit of each byte is handled apart to stop the carries.
+
+@lru_cache(maxsize=64)
+def _masks(size: int) -> Tuple[int, int]:
+    """:return: 0x7F7F...7F and 0x8080...80 of `size` bytes"""
+    return (int.from_bytes(b"\x7f" * size, "little"),
+            int.from_bytes(b"\x80" * size, "little"))
+
+
+def _add_ints(x: int, y: int, size: int) -> int:
+    """Add the `size` bytes of x and y, modulo 256"""
+    low, high = _masks(size)
+    return ((x & low) + (y & low)) ^ ((x ^ y) & high)
+
+
+def _add_bytes_int(a: bytes, b: bytes) -> bytes:
+    size = len(a)
+    return _add_ints(int.from_bytes(a, "little"), int.from_bytes(b, "little"),
+                     size).to_bytes(size, "little")
+
+
+def _sub_decode_int(row: bytes, bpp: int) -> bytes:
+    # a prefix sum by steps of bpp, 2 bpp, 4 bpp... bytes (Hillis-Steele)
+    size = len(row)
+    x = int.from_bytes(row, "little")
+    mask = (1 << 8 * size) - 1
+    shift = bpp
+    while shift < size:
+        x = _add_ints(x, (x << 8 * shift) & mask, size)
+        shift *= 2
+    return x.to_bytes(size, "little")
+
+
+def _add_bytes_numpy(a: bytes, b: bytes) -> bytes:
+    return (numpy.frombuffer(a, numpy.uint8)
+            + numpy.frombuffer(b, numpy.uint8)).tobytes()
+
+
+def _sub_decode_numpy(row: bytes, bpp: int) -> bytes:
+    pixels = numpy.frombuffer(row, numpy.uint8).reshape(-1, bpp)
+    return pixels.cumsum(axis=0, dtype=numpy.uint8).tobytes()
+
+
+def _sub_decode_16_numpy(row: bytes, colors: int) -> bytes:
+    samples = numpy.frombuffer(row, ">u2").reshape(-1, colors)
+    # cumsum returns native uint16: back to big endian
+    return samples.cumsum(axis=0, dtype=numpy.uint16).astype(">u2").tobytes()
+
+
+def _sub_decode_16_array(row: bytes, colors: int) -> bytes:
+    samples = array("H", row)
+    if sys.byteorder == "little":
+        samples.byteswap()
+    for j in range(colors, len(samples)):
+        samples[j] = (samples[j] + samples[j - colors]) & 0xFFFF
+    if sys.byteorder == "little":
+        samples.byteswap()
+    return samples.tobytes()
+
+
+if numpy is None:
+    add_bytes = _add_bytes_int
+    sub_decode = _sub_decode_int
+    sub_decode_16 = _sub_decode_16_array
+else:
+    add_bytes = _add_bytes_numpy
+    sub_decode = _sub_decode_numpy
+    sub_decode_16 = _sub_decode_16_numpy
@@ -0,0 +1,358 @@
+"""
+A table driven lexer: an alternative to the `State` machine of the
+`PDFTokenizer`.
+
+The lexer works on a whole buffer. The class of the first byte of a token is
+read in a 256 entries table, and the runs of name, number, word or whitespace
+characters are skipped in one step by a compiled regex. The tokens are the
+same as the tokens of the `PDFTokenizer`.
+"""
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, cast
+
+from base import (
+    OpenDictToken, CloseDictToken, OpenArrayToken, CloseArrayToken,
+    StringObject, NumberObject, intern_name, intern_word)
+from tokenizer import (
+    PDFTokenizer, StreamWrapper, TokenError, WHITESPACES, STRING_DELIMITER_RE,
+    lex_string)
+
+STATE_ENGINE = "state"
+TABLE_ENGINE = "table"
+
+# Character classes
+WHITESPACE_CLASS = 0
+WORD_CLASS = 1
+NAME_CLASS = 2
+NUMBER_CLASS = 3
+LESS_THAN_CLASS = 4
+GREATER_THAN_CLASS = 5
+OPEN_ARRAY_CLASS = 6
+CLOSE_ARRAY_CLASS = 7
+STRING_CLASS = 8
+COMMENT_CLASS = 9
+
+
+def _build_char_class_table() -> bytes:
+    table = bytearray([WORD_CLASS]) * 256
+    for c in WHITESPACES:
+        table[c] = WHITESPACE_CLASS
+    for c in b"+-.0123456789":
+        table[c] = NUMBER_CLASS
+    table[ord("/")] = NAME_CLASS
+    table[ord("<")] = LESS_THAN_CLASS
+    table[ord(">")] = GREATER_THAN_CLASS
+    table[ord("[")] = OPEN_ARRAY_CLASS
+    table[ord("]")] = CLOSE_ARRAY_CLASS
+    table[ord("(")] = STRING_CLASS
+    table[ord("%")] = COMMENT_CLASS
+    return bytes(table)
+
+
+CHAR_CLASS = _build_char_class_table()
+
+WHITESPACES_RE = re.compile(rb"[\x00\t\n\x0c\r ]+")
+NAME_RE = re.compile(rb"/[^\x00\t\n\x0c\r ()<>\[\]{}/%]*")
+NUMBER_RE = re.compile(rb"[+\-0-9][0-9]*(?:\.[0-9]*)?|\.[0-9]*")
+WORD_RE = re.compile(rb".[A-Za-z*]*", re.DOTALL)
+HEX_STRING_RE = re.compile(rb"<([0-9A-Fa-f\x00\t\n\x0c\r ]*)>")
+HEX_STRING_START_RE = re.compile(rb"<[0-9A-Fa-f\x00\t\n\x0c\r ]*")
+HEX_DIGITS_RE = re.compile(rb"[0-9A-Fa-f]")
+COMMENT_RE = re.compile(rb"%[^\r\n]*")
+# for the structural scan
+SPACES_RE = re.compile(rb"(?:[\x00\t\n\x0c\r ]+|%[^\r\n]*)*")
+REF_TAIL_RE = re.compile(rb"[\x00\t\n\x0c\r ]+[0-9]+[\x00\t\n\x0c\r ]+R"
+                         rb"(?![^\x00\t\n\x0c\r ()<>\[\]{}/%])")
+NESTED_RE = re.compile(rb"<<|>>|[\[\]()%<]")
+# the min size of the buffer of `lex_chunks`
+MIN_LEX_SIZE = 4096
+
+
+class TableLexer:
+    """
+    Lexer for a buffer.
+
+    If the buffer is not `final` (more data will follow), the lexer stops
+    before a token that may be incomplete. In any case, `pos` is the
+    position of the first byte that was not consumed.
+    """
+
+    def __init__(self, buf: Any, pos: int = 0, final: bool = True):
+        self._buf = buf
+        self.pos = pos
+        self._final = final
+
+    def __iter__(self) -> Iterator[Any]:
+        buf = self._buf
+        end = len(buf)
+        pos = self.pos
+        final = self._final
+        while pos < end:
+            char_class = CHAR_CLASS[buf[pos]]
+            if char_class == WHITESPACE_CLASS:
+                pos = WHITESPACES_RE.match(buf, pos).end()
+                self.pos = pos
+                continue
+
+            if char_class == NAME_CLASS:
+                m = NAME_RE.match(buf, pos)
+                new_pos = m.end()
+                token = intern_name(m.group())
+            elif char_class == NUMBER_CLASS:
+                m = NUMBER_RE.match(buf, pos)
+                new_pos = m.end()
+                token = NumberObject(m.group())
+            elif char_class == WORD_CLASS:
+                m = WORD_RE.match(buf, pos)
+                new_pos = m.end()
+                token = intern_word(m.group())
+            elif char_class == OPEN_ARRAY_CLASS:
+                new_pos = pos + 1
+                token = OpenArrayToken
+            elif char_class == CLOSE_ARRAY_CLASS:
+                new_pos = pos + 1
+                token = CloseArrayToken
+            elif char_class == LESS_THAN_CLASS:
+                token, new_pos = self._lex_less_than(buf, pos, end)
+            elif char_class == GREATER_THAN_CLASS:
+                if pos + 1 >= end:
+                    new_pos = -1
+                    token = None
+                elif buf[pos + 1] == ord(">"):
+                    new_pos = pos + 2
+                    token = CloseDictToken
+                else:
+                    raise TokenError()
+            elif char_class == STRING_CLASS:
+                bs, new_pos = lex_string(buf, pos + 1, end)
+                token = StringObject(bs) if new_pos != -1 else None
+            else:  # COMMENT_CLASS
+                new_pos = COMMENT_RE.match(buf, pos).end()
+                if new_pos < end or final:
+                    pos = new_pos
+                    self.pos = pos
+                    continue
+                new_pos = -1
+                token = None
+
+            if new_pos == -1:  # unterminated
+                if final:
+                    raise TokenError()
+                return
+            if new_pos >= end and not final:  # may continue
+                return
+            pos = new_pos
+            self.pos = pos
+            yield token
+
+    def _lex_less_than(self, buf: Any, pos: int, end: int
+                       ) -> Tuple[Any, int]:
+        if pos + 1 >= end:
+            return None, -1
+        if buf[pos + 1] == ord("<"):
+            return OpenDictToken, pos + 2
+        m = HEX_STRING_RE.match(buf, pos)
+        if m is None:
+            if HEX_STRING_START_RE.match(buf, pos).end() < end:
+                raise TokenError()
+            return None, -1  # unterminated
+        return StringObject(_hex_to_bytes(m.group(1))), m.end()
+
+
+def _hex_to_bytes(hex_string: bytes) -> bytes:
+    try:  # usually, pairs of digits without whitespaces
+        return bytes.fromhex(hex_string.decode("ascii"))
+    except ValueError:
+        pass
+    digits = b"".join(HEX_DIGITS_RE.findall(hex_string))
+    if len(digits) % 2 == 1:
+        digits += b"0"
+    return bytes.fromhex(digits.decode("ascii"))
+
+
+def skip_spaces(buf: Any, pos: int) -> int:
+    """
+    :return: the position of the first byte after the whitespaces and the
+    comments
+    """
+    return SPACES_RE.match(buf, pos).end()
+
+
+def scan_dict(buf: Any, pos: int
+              ) -> Tuple[Dict[bytes, Tuple[int, int]], int]:
+    """
+    A structural scan of a dictionary: the values are skipped, not parsed.
+
+    :param pos: the position of `<<`
+    :return: the span (start, end) of each value by key, and the position
+    after `>>`
+    :raise TokenError: if the dictionary is malformed or not terminated
+    """
+    end = len(buf)
+    if buf[pos:pos + 2] != b"<<":
+        raise TokenError()
+    spans = cast(Dict[bytes, Tuple[int, int]], {})
+    pos = skip_spaces(buf, pos + 2)
+    while pos < end:
+        if buf[pos] == ord(">"):
+            if buf[pos:pos + 2] != b">>":
+                raise TokenError()
+            return spans, pos + 2
+        m = NAME_RE.match(buf, pos)
+        if m is None:
+            raise TokenError()
+        start, pos = skip_object(buf, m.end())
+        spans[intern_name(m.group()).bs] = (start, pos)
+        pos = skip_spaces(buf, pos)
+    raise TokenError()
+
+
+def scan_array(buf: Any, pos: int) -> Tuple[List[Tuple[int, int]], int]:
+    """
+    A structural scan of an array: the elements are skipped, not parsed.
+
+    :param pos: the position of `[`
+    :return: the span (start, end) of each element, and the position after
+    `]`
+    :raise TokenError: if the array is malformed or not terminated
+    """
+    end = len(buf)
+    if pos >= end or buf[pos] != ord("["):
+        raise TokenError()
+    spans = []
+    pos = skip_spaces(buf, pos + 1)
+    while pos < end:
+        if buf[pos] == ord("]"):
+            return spans, pos + 1
+        start, pos = skip_object(buf, pos)
+        spans.append((start, pos))
+        pos = skip_spaces(buf, pos)
+    raise TokenError()
+
+
+def skip_object(buf: Any, pos: int) -> Tuple[int, int]:
+    """
+    Skip a direct object or an indirect reference (`N G R`).
+
+    :param pos: the position of the object, or of the whitespaces before
+    :return: the span (start, end) of the object
+    :raise TokenError: if the object is malformed or not terminated
+    """
+    end = len(buf)
+    start = skip_spaces(buf, pos)
+    if start >= end:
+        raise TokenError()
+    char_class = CHAR_CLASS[buf[start]]
+    if char_class == NAME_CLASS:
+        return start, NAME_RE.match(buf, start).end()
+    elif char_class == NUMBER_CLASS:
+        new_pos = NUMBER_RE.match(buf, start).end()
+        m = REF_TAIL_RE.match(buf, new_pos)
+        return start, new_pos if m is None else m.end()
+    elif char_class == WORD_CLASS:
+        return start, WORD_RE.match(buf, start).end()
+    elif char_class == STRING_CLASS:
+        return start, _skip_string(buf, start + 1)
+    elif char_class == LESS_THAN_CLASS and buf[start:start + 2] != b"<<":
+        m = HEX_STRING_RE.match(buf, start)
+        if m is None:
+            raise TokenError()
+        return start, m.end()
+    elif char_class in (LESS_THAN_CLASS, OPEN_ARRAY_CLASS):
+        return start, _skip_nested(buf, start)
+    else:
+        raise TokenError()
+
+
+def _skip_nested(buf: Any, pos: int) -> int:
+    """
+    :param pos: the position of `<<` or `[`
+    :return: the position after the matching `>>` or `]`
+    """
+    depth = 0
+    while True:
+        m = NESTED_RE.search(buf, pos)
+        if m is None:
+            raise TokenError()
+        delimiter = m.group()
+        pos = m.end()
+        if delimiter in (b"<<", b"["):
+            depth += 1
+        elif delimiter in (b">>", b"]"):
+            depth -= 1
+            if depth == 0:
+                return pos
+        elif delimiter == b"(":
+            pos = _skip_string(buf, pos)
+        elif delimiter == b"%":
+            pos = COMMENT_RE.match(buf, m.start()).end()
+        else:  # `<`
+            m = HEX_STRING_RE.match(buf, m.start())
+            if m is None:
+                raise TokenError()
+            pos = m.end()
+
+
+def _skip_string(buf: Any, pos: int) -> int:
+    """
+    :param pos: the position after the left parenthesis
+    :return: the position after the right parenthesis
+    """
+    lparen_count = 0
+    while True:
+        m = STRING_DELIMITER_RE.search(buf, pos)
+        if m is None:
+            raise TokenError()
+        delimiter = m.group()
+        pos = m.end()
+        if delimiter == b"\\":
+            pos += 1  # the escaped char
+        elif delimiter == b"(":
+            lparen_count += 1
+        elif lparen_count == 0:
+            return pos
+        else:
+            lparen_count -= 1
+
+
+def lex_chunks(chunks: Iterable[Any]) -> Iterator[Any]:
+    """
+    Lex a sequence of chunks (e.g. the decompressed chunks of a stream). The
+    partial token at the end of a chunk is carried over to the next chunk.
+
+    :param chunks: the chunks
+    :return: an iterator over the tokens
+    """
+    pending = []
+    pending_size = 0
+    # small chunks are joined, and a long token waits for twice its size:
+    # the bytes are copied O(1) times
+    min_size = MIN_LEX_SIZE
+    for chunk in chunks:
+        pending.append(chunk)
+        pending_size += len(chunk)
+        if pending_size < min_size:
+            continue
+        buf = pending[0] if len(pending) == 1 else b"".join(pending)
+        lexer = TableLexer(buf, 0, False)
+        yield from lexer
+        rest = buf[lexer.pos:]
+        pending = [rest]
+        pending_size = len(rest)
+        min_size = max(MIN_LEX_SIZE, 2 * pending_size)
+    yield from TableLexer(b"".join(pending))
+
+
+def tokenize(stream_wrapper: StreamWrapper, engine: str = STATE_ENGINE
+             ) -> Iterator[Any]:
+    """
+    :param stream_wrapper: the stream wrapper
+    :param engine: `STATE_ENGINE` or `TABLE_ENGINE`
+    :return: an iterator over the tokens
+    """
+    if engine == STATE_ENGINE:
+        return iter(PDFTokenizer(stream_wrapper))
+    elif engine == TABLE_ENGINE:
+        return lex_chunks(stream_wrapper.chunks())
+    else:
+        raise ValueError(engine)
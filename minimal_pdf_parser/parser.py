@@ -1,29 +1,63 @@
 import io
 import logging
+import os
 import re
-import zlib
+import threading
+from array import array
+from collections import OrderedDict
 from typing import (
     BinaryIO, Iterator, Optional, Any, List, Dict, Mapping, cast, Tuple, Union,
-    Iterable
+    Iterable, Sequence
 )
 
 from base import (
     OpenDictToken, CloseDictToken, OpenArrayToken, CloseArrayToken,
     StringObject, NameObject, WordToken, ArrayObject, DictObject, BooleanObject,
     NullObject, IndirectRef, IndirectObject, StreamObject, get_num, get_string,
-    check, checked_cast, NumberObject
+    check, checked_cast, NumberObject, LazyDictObject, LazyArrayObject
 )
+from buffer_stream import BufferStream, PreadStream
 from content_parser import ContentParser
+from lexer import (
+    TableLexer, STATE_ENGINE, TABLE_ENGINE, CHAR_CLASS, NUMBER_CLASS,
+    skip_spaces, scan_dict, scan_array)
+from filters import decode_data, decode_chunks, get_filters, FLATE_DECODE
+from cache import ObjectCache, StreamCache
+from recovery import scan_objects, ScanResult
+from sidecar import (
+    IndexKey, DocumentIndex, PathLike, TRAILER_REGION_SIZE, index_key,
+    read_index, write_index, to_pdf_syntax)
+from xref import (
+    LazyXrefTable, XrefSubsection, XREF_ENTRY_SIZE, XREF_ENTRY_RE,
+    XREF_SUBSECTION_RE, CompressedXrefEntry, decode_xref_stream, XrefIndex,
+    IN_USE, FREE, ExtentIndex, XrefChain)
 from pdf_operation import SetFont, ShowTextString
 from pdf_encodings import STD_ENCODING, ENCODING_BY_NAME
 from security import StandardEncrypterFactory, Encrypter
 from tokenizer import (
-    PDFTokenizer, XrefEntry, BinaryStreamWrapper, LINE_FEED, CARRIAGE_RETURN,
-    _bytes_to_string, StreamWrapper)
+    PDFTokenizer, XrefEntry, BinaryStreamWrapper, StreamWrapper,
+    BufferedBinaryStreamWrapper, BLOCK_SIZE,
+    BufferStreamWrapper, FIRST_BLOCK_SIZE, LineReader, ChunkStreamWrapper)
 
 BUF_SIZE = 40  # 96
+# the max size of a read of a stream. The streams of at most this size are
+# read in one call; the reads of the larger streams grow from
+# FIRST_STREAM_CHUNK_SIZE to this size, so that a consumer that stops early
+# reads little.
+STREAM_CHUNK_SIZE = 64 * 1024
+FIRST_STREAM_CHUNK_SIZE = 4 * 1024
+OBJECT_STREAM_CACHE_SIZE = 16
+# the max size of the read of an object, if its extent is known
+MAX_EXTENT_READ_SIZE = 64 * 1024
+ENDSTREAM_READ_SIZE = 16
+# the reads of objects separated by less than COALESCE_GAP bytes are merged
+COALESCE_GAP = 4 * 1024
+MAX_COALESCED_READ_SIZE = 1024 * 1024
+READLINE_BLOCK_SIZE = 256
+OBJ_HEADER_RE = re.compile(rb"\s*(\d+)\s+(\d+)\s+obj(?![^\s<\[(/%])")
 
 Encoding = Mapping[int, str]
+AnyXrefEntry = Union[XrefEntry, CompressedXrefEntry]
 IndirectOrStreamObject = Union[IndirectObject, StreamObject]
 PDFObject = Union[NullObject, IndirectObject, StreamObject, DictObject]
 
@@ -33,24 +67,12 @@ class StreamFactory:
         pass
 
 
-class DeflateStreamWrapper(StreamWrapper):
+class DeflateStreamWrapper(ChunkStreamWrapper):
+    """A wrapper that inflates the chunks of a window."""
+
     def __init__(self, window: Iterable[bytes]):
-        StreamWrapper.__init__(self)
-        self._it = iter(window)
-        self._decompressobj = zlib.decompressobj()
-        self._cur = b''
-        self._i = 0
-
-    def _get(self) -> int:
-        if self._i >= len(self._cur):
-            self._cur = b''
-            while not self._cur:
-                self._cur = self._decompressobj.decompress(next(self._it))
-            self._i = 0
-
-        ret = self._cur[self._i]
-        self._i += 1
-        return ret
+        ChunkStreamWrapper.__init__(
+            self, decode_chunks(window, [(FLATE_DECODE, None)]))
 
 
 class FontParser:
@@ -69,6 +91,7 @@ class FontParser:
         self._encoding_by_obj_num = cast(Dict[int, Encoding], {})
 
     def parse(self, v: Any) -> Encoding:
+        self._document.pin(v)
         font_object = checked_cast(DictObject, self._document.get_object(v))
         if isinstance(font_object, IndirectRef):
             obj_num = font_object.obj_num
@@ -128,7 +151,8 @@ class FontParser:
                         to_unicode_stream_wrapper = self._document.get_stream(
                             font_object[b"/ToUnicode"])
                         # 9.10.3 ToUnicode CMaps
-                        encoding = ContentParser().parse_to_unicode(
+                        encoding = ContentParser(
+                            self._document.parser.engine).parse_to_unicode(
                             to_unicode_stream_wrapper)
                         self._logger.info("To Unicode: %s", encoding)
                         return encoding  # TODO apply to base encoding
@@ -237,7 +261,15 @@ class PDFDocument:
     def __init__(self, parser: "PDFParser", doc_id: Optional[ArrayObject],
                  size: int, root: IndirectRef,
                  encrypt: Optional[Any],
-                 xref_table: Mapping[int, XrefEntry]):
+                 xref_table: Mapping[int, AnyXrefEntry],
+                 object_cache: Optional[ObjectCache] = None,
+                 stream_cache: Optional[StreamCache] = None):
+        """
+        :param object_cache: the cache of the indirect objects. Default is
+                             an unbounded cache.
+        :param stream_cache: the cache of the decoded streams. Default is a
+                             cache of this document, with the default budget.
+        """
         self.parser = parser
 
         self._font_parser = FontParser(self, {}, ENCODING_BY_NAME)
@@ -246,9 +278,27 @@ class PDFDocument:
         self.root = root
         self.encrypt = encrypt
         self.xref_table = xref_table
-        self._obj_by_num = cast(Dict[int, Any], {})
+        if object_cache is None:
+            object_cache = ObjectCache()
+        self.object_cache = object_cache
+        if stream_cache is None:
+            stream_cache = StreamCache()
+        self.stream_cache = stream_cache
+        # (obj num, gen num) -> the key in a content addressed stream cache
+        self._stream_keys = cast(Dict[Tuple[int, int], bytes], {})
+        self._cache_lock = threading.Lock()
+        self._page_obj_nums = cast(Optional[List[int]], None)
+        # the sorted offsets of the objects, and the size of the file
+        self._sorted_offsets = cast(Optional[Sequence[int]], None)
+        self._extent_index = cast(Optional[ExtentIndex], None)
+        # the number of objects found by a scan of a damaged file
+        self.recovered_count = cast(Optional[int], None)
         self._offsets = cast(List[int], [])
         self._encrypter = cast(Optional[Encrypter], None)
+        # the decoded object streams, least recently used first
+        self._object_stream_by_num = cast(
+            "OrderedDict[int, ObjectStream]", OrderedDict())
+        self.object_stream_cache_size = OBJECT_STREAM_CACHE_SIZE
 
     def extract_text(self) -> Iterator[str]:
         if self.encrypt is not None:
@@ -266,6 +316,7 @@ class PDFDocument:
             try:
                 contents = kid_object[b"/Contents"]
             except KeyError:
+                self.pin(kid)  # a page tree node
                 kids = kid_object[b"/Kids"]
                 stack = list(kids) + stack
             else:
@@ -276,7 +327,8 @@ class PDFDocument:
                 stream_wrapper = self.get_stream(contents)
 
                 encoding = STD_ENCODING
-                for x in ContentParser().parse_content(stream_wrapper):
+                for x in ContentParser(self.parser.engine).parse_content(
+                        stream_wrapper):
                     if isinstance(x, SetFont):
                         encoding = encoding_by_ref.get(x.name, STD_ENCODING)
                         if not encoding:
@@ -293,9 +345,59 @@ class PDFDocument:
                     else:
                         self._logger.debug("Ignore %s", x)
 
+    def set_index(self, page_obj_nums: List[int],
+                  sorted_offsets: Sequence[int]):
+        """
+        Use the data of a sidecar index.
+
+        :param page_obj_nums: the obj nums of the pages
+        :param sorted_offsets: the sorted offsets of the objects and the size
+                               of the file
+        """
+        self._page_obj_nums = page_obj_nums
+        self._sorted_offsets = sorted_offsets
+
+    def get_page_obj_nums(self) -> List[int]:
+        """
+        7.7.3 Page Tree
+
+        :return: the obj nums of the pages, in the order of the document
+        """
+        if self._page_obj_nums is None:
+            page_obj_nums = []
+            kids = list(self._get_pages_kids())
+            self.get_objects(kids)
+            stack = kids[::-1]
+            while stack:
+                kid = stack.pop()
+                kid_object = checked_cast(DictObject, self.get_object(kid))
+                kids = kid_object.get(b"/Kids")
+                if kids is None:  # a page
+                    page_obj_nums.append(kid.obj_num)
+                else:
+                    self.pin(kid)
+                    kids = list(checked_cast(ArrayObject,
+                                             self.get_object(kids)))
+                    self.get_objects(kids)
+                    stack.extend(reversed(kids))
+            self._page_obj_nums = page_obj_nums
+        return self._page_obj_nums
+
     def get_root_object(self):
+        self.pin(self.root)
         return self.get_object(self.root)
 
+    def pin(self, obj: Any):
+        """
+        Keep an object in the cache. Used for the objects that are reused
+        by every page.
+
+        :param obj: a ref or a direct object (ignored)
+        """
+        if isinstance(obj, IndirectRef):
+            with self._cache_lock:
+                self.object_cache.pin(obj.obj_num)
+
     def get_object(self, obj: Union[IndirectRef, PDFObject]) -> PDFObject:
         """
         Deref the obj if necessary
@@ -317,7 +419,9 @@ class PDFDocument:
     def _handle_fonts(self, kid_object) -> Mapping[bytes, Encoding]:
         encoding_by_ref = {}
         resources = kid_object[b"/Resources"]  # 7.8.3
-        for k, v in resources.get(b"/Font", {}).items():
+        fonts = resources.get(b"/Font", {})
+        self.get_objects(v for _, v in fonts.items())
+        for k, v in fonts.items():
             encoding = self._font_parser.parse(v)
             self._logger.info("Encoding %s: %s", k, encoding)
             encoding_by_ref[k] = encoding
@@ -333,11 +437,54 @@ class PDFDocument:
             stream_obj = obj
         checked_cast(StreamObject, stream_obj)
         window = self.parser.stream_window(stream_obj, self._encrypter)
-        return DeflateStreamWrapper(window)
+        filters = get_filters(stream_obj.object, self.get_object)
+        cache = self.stream_cache
+        if not cache.accepts(stream_obj.length):
+            return ChunkStreamWrapper(decode_chunks(window, filters))
+
+        ref = (stream_obj.obj_num, stream_obj.gen_num)
+        key = cast(Any, ref)
+        if cache.content_addressed:
+            with self._cache_lock:
+                key = self._stream_keys.get(ref)
+            if key is None:
+                raw = b"".join(self.parser.stream_window(
+                    stream_obj, self._encrypter, stream_obj.length))
+                window = [raw]
+                key = cache.content_key(raw, _filters_syntax(filters))
+                with self._cache_lock:
+                    self._stream_keys[ref] = key
+        try:
+            data = cache.get(key)
+        except KeyError:
+            return ChunkStreamWrapper(self._cache_chunks(
+                key, decode_chunks(window, filters)))
+        return ChunkStreamWrapper([data])
+
+    def _cache_chunks(self, key: Any, chunks: Iterable[Any]
+                      ) -> Iterator[Any]:
+        """
+        Yield the decoded chunks, and put the data in the stream cache when
+        the stream is fully read and is not too large.
+        """
+        cache = self.stream_cache
+        parts = cast(Optional[List[bytes]], [])
+        size = 0
+        for chunk in chunks:
+            yield chunk
+            if parts is not None:
+                size += len(chunk)
+                if cache.accepts(size):
+                    parts.append(bytes(chunk))
+                else:
+                    parts = None
+        if parts is not None:
+            cache.put(key, b"".join(parts))
 
     def _get_pages_kids(self):
         root_object = self.get_root_object()
         PDFDocument._logger.debug("Root obj %s", root_object)
+        self.pin(root_object[b"/Pages"])
         pages_object = self.get_object(root_object[b"/Pages"])
         PDFDocument._logger.debug("Pages obj %s", pages_object)
         kids = checked_cast(ArrayObject,
@@ -347,58 +494,356 @@ class PDFDocument:
     def _get_indirect_object(self, ref: IndirectRef
                              ) -> IndirectOrStreamObject:
         """Convert a ref to an indirect object or a stream object"""
-        obj_num = ref.obj_num
-        try:
-            return self._obj_by_num[obj_num]
-        except KeyError:
-            byte_offset = int(self.xref_table[obj_num].byte_offset)
+        return self._get_object_by_num(ref.obj_num)
 
-            obj = self.read_indirect_object(byte_offset)
-            self._obj_by_num[obj_num] = obj
+    def _get_object_by_num(self, obj_num: int) -> IndirectOrStreamObject:
+        # the lock protects the caches, not the reads: two threads may read
+        # the same object
+        with self._cache_lock:
+            try:
+                return self.object_cache.get(obj_num)
+            except KeyError:
+                pass
+        entry = self.xref_table[obj_num]
+        if isinstance(entry, CompressedXrefEntry):
+            object_stream = self._get_object_stream(entry.stream_obj_num)
+            obj = object_stream.get_object(obj_num, entry.index)
+        elif entry.kw == b"n":
+            obj = self.read_indirect_object(entry.byte_offset)
+        else:
+            # 7.3.10: a ref to a free object is a ref to the null object.
+            # The "offset" is the next free obj num.
+            raise KeyError(obj_num)
+        self._put_object(obj_num, obj)
+        return obj
+
+    def get_objects(self, objs: Iterable[Union[IndirectRef, PDFObject]]
+                    ) -> List[PDFObject]:
+        """
+        Deref many objects. The objects that are not in the cache are read
+        in the order of the file, and the reads of close objects are
+        coalesced.
+
+        :param objs: the objs or refs
+        :return: the objs
+        """
+        objs = list(objs)
+        with self._cache_lock:
+            missing_obj_nums = {obj.obj_num for obj in objs
+                                if isinstance(obj, IndirectRef)
+                                and obj.obj_num not in self.object_cache}
+        located = []
+        for obj_num in missing_obj_nums:
+            try:
+                entry = self.xref_table[obj_num]
+            except KeyError:
+                continue
+            if isinstance(entry, CompressedXrefEntry):
+                # the objects of a stream are read together
+                located.append((entry.stream_obj_num, entry.index, obj_num))
+            elif entry.kw == b"n":
+                located.append((entry.byte_offset, -1, obj_num))
+        located.sort()
+
+        compressed = [obj_num for _, index, obj_num in located if index >= 0]
+        read_objs = self._read_objects([(byte_offset, obj_num)
+                                        for byte_offset, index, obj_num in
+                                        located if index < 0])
+        for obj_num in compressed:
+            self._get_object_by_num(obj_num)
+        # read the indirect lengths of the streams together
+        length_refs = [obj.object[b"/Length"] for obj in read_objs
+                       if isinstance(obj, StreamObject)
+                       and not obj.length_resolved]
+        if length_refs:
+            self.get_objects(length_refs)
+        return [self.get_object(obj) for obj in objs]
+
+    def _read_objects(self, located: List[Tuple[int, int]]
+                      ) -> List[IndirectOrStreamObject]:
+        """
+        :param located: the sorted list of (byte offset, obj num)
+        :return: the objects
+        """
+        read_objs = []
+        extent_index = self._get_extent_index()
+        if extent_index is None or self.parser.buffered:
+            for byte_offset, obj_num in located:
+                read_objs.append(self._put_object(
+                    obj_num, self.read_indirect_object(byte_offset)))
+            return read_objs
+
+        extents = []
+        for byte_offset, obj_num in located:
+            end = extent_index.end(byte_offset)
+            if end - byte_offset > MAX_EXTENT_READ_SIZE:  # read the head only
+                read_objs.append(self._put_object(
+                    obj_num, self.read_indirect_object(byte_offset)))
+            else:
+                extents.append((byte_offset, end, obj_num))
+        for group in _coalesce_extents(extents):
+            start = group[0][0]
+            data = memoryview(self.parser.read_at(start, group[-1][1] - start))
+            for byte_offset, end, obj_num in group:
+                obj = None
+                if end > byte_offset:
+                    obj = self._parse_indirect_object_in_extent(
+                        byte_offset, end,
+                        data[byte_offset - start:end - start])
+                if obj is None:
+                    obj = self.read_indirect_object(byte_offset)
+                read_objs.append(self._put_object(obj_num, obj))
+        return read_objs
+
+    def _put_object(self, obj_num: int, obj: IndirectOrStreamObject
+                    ) -> IndirectOrStreamObject:
+        with self._cache_lock:
+            self.object_cache.put(obj_num, obj)
         return obj
 
+    def _get_object_stream(self, stream_obj_num: int) -> "ObjectStream":
+        """
+        :param stream_obj_num: the obj num of the object stream
+        :return: the decoded object stream, from the cache if possible.
+        """
+        with self._cache_lock:
+            try:
+                object_stream = self._object_stream_by_num[stream_obj_num]
+            except KeyError:
+                pass
+            else:
+                self._object_stream_by_num.move_to_end(stream_obj_num)
+                return object_stream
+
+        stream_obj = checked_cast(StreamObject,
+                                  self._get_object_by_num(stream_obj_num))
+        data = b"".join(self.parser.stream_window(
+            stream_obj, self._encrypter, stream_obj.length))
+        data = decode_data(data,
+                           get_filters(stream_obj.object, self.get_object))
+        object_stream = ObjectStream(stream_obj.object, data)
+        with self._cache_lock:
+            self._object_stream_by_num[stream_obj_num] = object_stream
+            if len(self._object_stream_by_num) > self.object_stream_cache_size:
+                self._object_stream_by_num.popitem(last=False)
+        return object_stream
+
     def read_indirect_object(self, byte_offset: int
                              ) -> IndirectOrStreamObject:
+        """
+        Read an object. If the parser is forkable, the read does not depend
+        on the position of the parser and is thread safe.
+        """
+        if self.parser.forkable and self.parser.buffered:
+            # no shared position: no need to save and restore the offset
+            return self._read_indirect_object(self.parser.at(byte_offset))
+
+        extent_index = self._get_extent_index()
+        if extent_index is not None:
+            end = extent_index.end(byte_offset)
+            if end > byte_offset:
+                ret = self._read_indirect_object_in_extent(byte_offset, end)
+                if ret is not None:
+                    return ret
+
+        if self.parser.forkable:
+            return self._read_indirect_object(self.parser.at(byte_offset))
+
         self._offsets.append(self.parser.tell())
         self.parser.seek(byte_offset)
-        obj_num, gen_num = map(int, self.parser.read_obj_line())
+        ret = self._read_indirect_object(self.parser)
+        byte_offset = self._offsets.pop()
+        self.parser.seek(byte_offset)
+        return ret
+
+    def _get_extent_index(self) -> Optional[ExtentIndex]:
+        """
+        :return: the extent index, built on first use, or None if the xref
+        table is lazy and there is no sidecar index.
+        """
+        if self._extent_index is None:
+            if self._sorted_offsets is not None:
+                self._extent_index = ExtentIndex(self._sorted_offsets)
+            elif not self.parser.lazy_xref:
+                self._extent_index = ExtentIndex.from_xref_table(
+                    self.xref_table, self.parser.size())
+        return self._extent_index
+
+    def _read_indirect_object_in_extent(self, byte_offset: int, end: int
+                                        ) -> Optional[IndirectOrStreamObject]:
+        """
+        Read the object in one read (up to MAX_EXTENT_READ_SIZE bytes) and
+        parse it from memory.
+
+        :param byte_offset: the offset of the object
+        :param end: the offset of the next object, or the size of the file
+        :return: the object, or None if the head of a large object was not
+        enough to parse it.
+        """
+        size = end - byte_offset
+        data = self.parser.read_at(byte_offset,
+                                   min(size, MAX_EXTENT_READ_SIZE))
+        return self._parse_indirect_object_in_extent(byte_offset, end, data)
+
+    def _parse_indirect_object_in_extent(self, byte_offset: int, end: int,
+                                         data: Any
+                                         ) -> Optional[IndirectOrStreamObject]:
+        """
+        :param byte_offset: the offset of the object
+        :param end: the offset of the next object, or the size of the file
+        :param data: the extent of the object, or its head
+        :return: the object, or None if the head of a large object was not
+        enough to parse it.
+        """
+        truncated = len(data) < end - byte_offset
+        parser = PDFParser.from_buffer(data, engine=self.parser.engine,
+                                       lazy_objects=self.parser.lazy_objects)
+        try:
+            obj_num, gen_num = map(int, parser.read_obj_line())
+            obj = parser.read_object()
+            endobj_word = self._read_endobj_word(parser)
+        except Exception:
+            if truncated:
+                return None
+            raise
+
+        if endobj_word == b"stream" and truncated and parser.tell() >= len(
+                data):
+            return None  # the EOL after `stream` may be missing
+        elif endobj_word == b"stream":  # open a stream
+            start = byte_offset + parser.tell()
+            obj = checked_cast(DictObject, obj)
+            length = self._known_length(obj)
+            if length is None:
+                return StreamObject(obj_num, gen_num, obj, start, None,
+                                    self._resolve_length)
+            if start + length > end:
+                self._logger.warning(
+                    "Object %s: /Length %s exceeds the extent %s-%s",
+                    obj_num, length, byte_offset, end)
+                return None
+            if not truncated or (start + length + ENDSTREAM_READ_SIZE
+                                 <= byte_offset + len(data)):
+                self._read_stream(obj, parser)  # check `endstream`
+            else:
+                tail = self.parser.read_at(start + length, ENDSTREAM_READ_SIZE)
+                check(tail.lstrip().startswith(b"endstream"),
+                      "Expected `endstream`, was {}", tail)
+            return StreamObject(obj_num, gen_num, obj, start, length)
+        elif endobj_word == b"endobj":
+            return IndirectObject(obj_num, gen_num, obj)
+        elif truncated:  # the word may be truncated
+            return None
+        else:
+            raise Exception(endobj_word)
+
+    def _read_indirect_object(self, parser: "PDFParser"
+                              ) -> IndirectOrStreamObject:
+        obj_num, gen_num = map(int, parser.read_obj_line())
         # TODO: create tokenizer ? TODO: encrypter
-        obj = self.parser.read_object()
-        endobj_word = self._read_endobj_word()
+        obj = parser.read_object()
+        endobj_word = self._read_endobj_word(parser)
         if endobj_word == b"stream":  # open a stream
-            start, length = self._read_stream(obj)
-            ret = StreamObject(obj_num, gen_num, obj, start, length)
+            start, length = self._read_stream(obj, parser)
+            ret = StreamObject(obj_num, gen_num, obj, start, length,
+                               self._resolve_length)
         elif endobj_word == b"endobj":
             ret = IndirectObject(obj_num, gen_num, obj)
         else:
             raise Exception(endobj_word)
-
-        byte_offset = self._offsets.pop()
-        self.parser.seek(byte_offset)
         return ret
 
-    def _read_endobj_word(self):
-        endobj_word = self.parser.read_endobj_line()
+    def _read_endobj_word(self, parser: "PDFParser"):
+        endobj_word = parser.read_endobj_line()
         if not endobj_word:  # sometimes just a void line
-            endobj_word = self.parser.read_endobj_line()
+            endobj_word = parser.read_endobj_line()
         return endobj_word
 
-    def _read_stream(self, obj: Any) -> Tuple[int, int]:
-        start = self.parser.tell()
+    def _read_stream(self, obj: Any, parser: "PDFParser"
+                     ) -> Tuple[int, Optional[int]]:
+        """
+        :return: the start of the data and the length, or None if the
+        length is an indirect object that was not read yet. In this case,
+        `endstream` is not checked.
+        """
+        start = parser.tell()
         obj = checked_cast(DictObject, obj)
-        length_obj = checked_cast(NumberObject,
-                                  self.get_object(obj[b"/Length"]))
-        length = length_obj.value
-        self.parser.seek(length, io.SEEK_CUR)
-        end_stream_word = self.parser.read_endobj_line()
+        length = self._known_length(obj)
+        if length is None:
+            return start, None
+        parser.seek(length, io.SEEK_CUR)
+        end_stream_word = parser.read_endobj_line()
         if not end_stream_word:
-            end_stream_word = self.parser.read_endobj_line()
-        self.parser.check(end_stream_word == b"endstream",
-                          "Expected `endstream`, was {}", end_stream_word)
-        endobj_word = self.parser.read_endobj_line()
-        self.parser.check(endobj_word == b"endobj", "")
+            end_stream_word = parser.read_endobj_line()
+        parser.check(end_stream_word == b"endstream",
+                     "Expected `endstream`, was {}", end_stream_word)
+        endobj_word = parser.read_endobj_line()
+        parser.check(endobj_word == b"endobj", "")
         return start, length
 
+    def _known_length(self, stream_dict: DictObject) -> Optional[int]:
+        """
+        :return: the /Length of the stream, or None if it is an indirect
+        object that is not in the cache.
+        """
+        length_obj = stream_dict[b"/Length"]
+        if isinstance(length_obj, IndirectRef):
+            with self._cache_lock:
+                if length_obj.obj_num not in self.object_cache:
+                    return None
+        return checked_cast(NumberObject, self.get_object(length_obj)).value
+
+    def _resolve_length(self, stream_obj: StreamObject) -> int:
+        """
+        Resolve an indirect /Length. If the length is missing or exceeds the
+        extent of the object, look for `endstream`.
+        """
+        length_obj = self.get_object(stream_obj.object[b"/Length"])
+        extent_index = self._get_extent_index()
+        if extent_index is None:
+            end = None
+        else:
+            end = extent_index.end(stream_obj.start)
+        if isinstance(length_obj, NumberObject):
+            length = length_obj.value
+            if end is None or stream_obj.start + length <= end:
+                return length
+            self._logger.warning(
+                "Object %s: /Length %s exceeds the extent %s-%s",
+                stream_obj.obj_num, length, stream_obj.start, end)
+        else:
+            self._logger.warning("Object %s: invalid /Length %s",
+                                 stream_obj.obj_num, length_obj)
+        return self._scan_length(stream_obj.start, end)
+
+    def _scan_length(self, start: int, end: Optional[int]) -> int:
+        """
+        :param start: the start of the data of the stream
+        :param end: the end of the extent, if known
+        :return: the length of the data, before `endstream` and its EOL
+        """
+        if end is None:
+            end = self.parser.size()
+        offset = start
+        while offset < end:
+            # the blocks overlap: `endstream` may be split
+            size = min(BLOCK_SIZE, end - offset)
+            data = self.parser.read_at(offset, size)
+            i = data.find(b"endstream")
+            if i != -1:
+                length = offset + i - start
+                tail = self.parser.read_at(start + max(0, length - 2),
+                                           min(2, length))
+                if tail.endswith(b"\r\n"):
+                    return length - 2
+                elif tail.endswith((b"\r", b"\n")):
+                    return length - 1
+                return length
+            if len(data) < size or offset + size >= end:
+                break
+            offset += size - len(b"endstream")
+        raise ValueError("Can't find `endstream` after {}".format(start))
+
     def parse_encryption(self,
                          encryption: DictObject) -> StandardEncrypterFactory:
         """
@@ -452,24 +897,233 @@ class PDFDocument:
         raise Exception(str(version))
 
 
+def _filters_syntax(filters: List[Tuple[bytes, Any]]) -> bytes:
+    """:return: the filters and their decode parms, in PDF syntax"""
+    return b" ".join(name + b" " + to_pdf_syntax(
+        NullObject if parms is None else parms) for name, parms in filters)
+
+
+def _coalesce_extents(extents: List[Tuple[int, int, int]]
+                      ) -> Iterator[List[Tuple[int, int, int]]]:
+    """
+    :param extents: the sorted list of (start, end, obj num)
+    :return: the groups of extents that can be read at once: the gaps are
+    smaller than COALESCE_GAP and the total size is less than
+    MAX_COALESCED_READ_SIZE.
+    """
+    group = []
+    for extent in extents:
+        if group and (
+                extent[0] - group[-1][1] > COALESCE_GAP
+                or max(extent[1], group[-1][1]) - group[0][0]
+                > MAX_COALESCED_READ_SIZE):
+            yield group
+            group = []
+        group.append(extent)
+    if group:
+        yield group
+
+
+class ObjectStream:
+    """
+    7.5.7 Object Streams
+
+    The stream is decoded once, the header of (obj num, offset) pairs is
+    indexed, and the objects are parsed on demand.
+    """
+
+    def __init__(self, stream_dict: DictObject, data: bytes):
+        """
+        :param stream_dict: the dictionary of the stream
+        :param data: the decoded data
+        """
+        self._data = data
+        self._first = get_num(stream_dict, b"/First")
+        n = get_num(stream_dict, b"/N")
+        header = [checked_cast(NumberObject, token).value
+                  for token in TableLexer(data[:self._first])]
+        check(len(header) >= 2 * n,
+              "Object stream: expected {} pairs, was {}", n, header)
+        self._obj_nums = header[0:2 * n:2]
+        self._offsets = header[1:2 * n:2]
+
+    def __len__(self) -> int:
+        return len(self._obj_nums)
+
+    @property
+    def obj_nums(self) -> List[int]:
+        """the obj nums of the objects, in the order of the stream"""
+        return self._obj_nums
+
+    def get_object(self, obj_num: int, index: int) -> IndirectObject:
+        """
+        :param obj_num: the obj num
+        :param index: the index in the object stream (from the xref stream)
+        :return: the object
+        """
+        if index >= len(self._obj_nums) or self._obj_nums[index] != obj_num:
+            index = self._obj_nums.index(obj_num)
+        start = self._first + self._offsets[index]
+        if index + 1 < len(self._offsets):
+            end = self._first + self._offsets[index + 1]
+        else:
+            end = len(self._data)
+        lexer = TableLexer(memoryview(self._data)[start:end])
+        # the generation number of an object in a stream is 0
+        return IndirectObject(obj_num, 0, ObjectParser(lexer).parse())
+
+
 class PDFParser:
-    def __init__(self, stream: BinaryIO):
+    _logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def from_buffer(buf: Any, block_size: int = BLOCK_SIZE,
+                    engine: str = STATE_ENGINE, lazy_xref: bool = False,
+                    recover: bool = False, lazy_objects: bool = False
+                    ) -> "PDFParser":
+        """
+        :param buf: a `bytes`, `mmap` or any object supporting the buffer
+                    protocol
+        :return: a parser that reads slices of the buffer
+        """
+        return PDFParser(BufferStream(buf), block_size, engine, lazy_xref,
+                         recover, lazy_objects)
+
+    @staticmethod
+    def from_mmap(stream: BinaryIO, block_size: int = BLOCK_SIZE,
+                  engine: str = STATE_ENGINE, lazy_xref: bool = False,
+                  recover: bool = False, lazy_objects: bool = False
+                  ) -> "PDFParser":
+        """
+        :param stream: a file
+        :return: a parser that reads slices of the memory mapped file
+        """
+        return PDFParser(BufferStream.from_file(stream), block_size, engine,
+                         lazy_xref, recover, lazy_objects)
+
+    @staticmethod
+    def from_pread(stream: BinaryIO, block_size: int = BLOCK_SIZE,
+                   engine: str = STATE_ENGINE, lazy_xref: bool = False,
+                   recover: bool = False, lazy_objects: bool = False
+                   ) -> "PDFParser":
+        """
+        :param stream: a file
+        :return: a parser that uses positional reads (`os.pread`), or a
+        memory mapped file on platforms without `os.pread`. The document may
+        be read by several threads.
+        """
+        return PDFParser(PreadStream.from_file(stream), block_size, engine,
+                         lazy_xref, recover, lazy_objects)
+
+    def __init__(self, stream: BinaryIO, block_size: int = BLOCK_SIZE,
+                 engine: str = STATE_ENGINE, lazy_xref: bool = False,
+                 recover: bool = False, lazy_objects: bool = False):
+        """
+        :param stream: the file
+        :param block_size: the max size of the blocks read by the tokenizer
+        :param engine: the tokenizer engine, `STATE_ENGINE` or `TABLE_ENGINE`
+        :param lazy_xref: if True, read the xref entries on demand
+        :param recover: if True, rebuild the xref table by a scan of the
+                        file when the cross-reference sections can't be read
+        :param lazy_objects: if True, the dictionaries read from a buffer are
+                             scanned, and their values are parsed on first
+                             access. The objects keep a view of the buffer.
+        """
         self._stream = stream
+        self._block_size = block_size
+        self.engine = engine
+        self.lazy_xref = lazy_xref
+        self.recover = recover
+        self.lazy_objects = lazy_objects
+        # a BufferStream or a PreadStream can be forked: each fork has its
+        # own position
+        self.buffered = isinstance(stream, BufferStream)
+        self.forkable = self.buffered or isinstance(stream, PreadStream)
+        self.stream_chunk_size = STREAM_CHUNK_SIZE
+
+    def at(self, offset: int) -> "PDFParser":
+        """
+        :param offset: the offset
+        :return: a new parser at this offset. Requires a forkable parser.
+        """
+        parser = PDFParser(self._stream.fork(offset), self._block_size,
+                           self.engine, self.lazy_xref, self.recover,
+                           self.lazy_objects)
+        parser.stream_chunk_size = self.stream_chunk_size
+        return parser
 
     def tell(self) -> int:
         return self._stream.tell()
 
+    def read_at(self, offset: int, size: int) -> bytes:
+        """
+        Read `size` bytes at `offset`. The position is not modified.
+        """
+        if self.buffered:
+            return bytes(self._stream.getbuffer()[offset:offset + size])
+        elif self.forkable:
+            return self._stream.pread(size, offset)
+
+        cur = self._stream.tell()
+        self._stream.seek(offset)
+        ret = self._stream.read(size)
+        self._stream.seek(cur)
+        return ret
+
     def seek(self, offset: int, whence: int = io.SEEK_SET):
         self._stream.seek(offset, whence)
 
-    def parse(self):
-        return self.parse_document()
+    def parse(self, object_cache: Optional[ObjectCache] = None,
+              index_path: Optional[PathLike] = None,
+              stream_cache: Optional[StreamCache] = None):
+        return self.parse_document(object_cache, index_path, stream_cache)
 
-    def parse_document(self) -> PDFDocument:
-        start_xref = self._find_start_xref()
-        xref_table = self.get_xref_table(start_xref)
-        # the trailer keyword was read, read the trailer dict now.
-        trailer_dict = self.read_dict()
+    def parse_document(self, object_cache: Optional[ObjectCache] = None,
+                       index_path: Optional[PathLike] = None,
+                       stream_cache: Optional[StreamCache] = None
+                       ) -> PDFDocument:
+        """
+        :param object_cache: the cache of the indirect objects
+        :param index_path: the path of a sidecar index file. If the index
+                           matches the file, the cross-reference sections are
+                           not read. Otherwise, the index is written.
+        :param stream_cache: the cache of the decoded streams. May be shared
+                             by several documents if it is content
+                             addressed.
+        :return: the document
+        """
+        if index_path is not None:
+            key = self.index_key()
+            index = read_index(index_path, key)
+            if index is not None:
+                trailer_dict = checked_cast(DictObject, ObjectParser(
+                    TableLexer(index.trailer)).parse())
+                document = self._create_document(
+                    trailer_dict, index.xref_table, object_cache,
+                    stream_cache)
+                document.set_index(index.page_obj_nums, index.offsets)
+                return document
+
+        try:
+            xref_table, last_trailer_dict = self._read_xref_sections()
+        except Exception:
+            if not self.recover:
+                raise
+            self._logger.warning("Can't read the cross-reference sections",
+                                 exc_info=True)
+            return self.recover_document(object_cache, stream_cache)
+
+        document = self._create_document(last_trailer_dict, xref_table,
+                                         object_cache, stream_cache)
+        if index_path is not None:
+            self._write_index(index_path, key, document, last_trailer_dict)
+        return document
+
+    def _create_document(self, trailer_dict: DictObject,
+                         xref_table: Mapping[int, AnyXrefEntry],
+                         object_cache: Optional[ObjectCache],
+                         stream_cache: Optional[StreamCache] = None
+                         ) -> PDFDocument:
         size = trailer_dict[b"/Size"].value
         root = trailer_dict[b"/Root"]
         try:
@@ -479,23 +1133,256 @@ class PDFParser:
             doc_id = None
         else:
             doc_id = trailer_dict[b"/ID"]
+        return PDFDocument(self, doc_id, size, root, encrypt, xref_table,
+                           object_cache, stream_cache)
+
+    def _read_xref_sections(self) -> Tuple[Mapping[int, AnyXrefEntry],
+                                           DictObject]:
+        """
+        Read the newest cross-reference section and the previous ones.
+
+        :return: the merged xref table and the newest trailer dict
+        """
+        start_xref = self._find_start_xref()
+        xref_table, trailer_dict = self.get_xref_section(start_xref)
+        last_trailer_dict = trailer_dict
+
+        if self.lazy_xref:
+            # the previous sections are read on demand
+            xref_table = XrefChain(xref_table,
+                                   self._previous_sections(trailer_dict),
+                                   self._load_xref_section)
+            return xref_table, last_trailer_dict
 
         # look for previous xref tables
+        xref_tables = [xref_table]
         while True:
+            try:
+                # 7.5.8.4 Compatibility with Applications That Do Not Support
+                # Compressed Reference Streams
+                xref_stm = trailer_dict[b"/XRefStm"].value
+            except KeyError:
+                pass
+            else:
+                xref_tables.append(self.get_xref_section(xref_stm)[0])
+
             try:
                 other_start_xref = trailer_dict[b"/Prev"].value
             except KeyError:
                 break
 
-            other_xref_table = self.get_xref_table(other_start_xref)
-            trailer_dict = self.read_dict()
+            other_xref_table, trailer_dict = self.get_xref_section(
+                other_start_xref)
+            xref_tables.append(other_xref_table)
+
+        for other_xref_table in xref_tables[1:]:
             for k, v in other_xref_table.items():
                 # fill the missing elements
                 if k not in xref_table:
                     xref_table[k] = v
-        return PDFDocument(self, doc_id, size, root, encrypt, xref_table)
+        return xref_table, last_trailer_dict
 
-    def get_xref_table(self, start_xref: int) -> Dict[int, XrefEntry]:
+    @staticmethod
+    def _previous_sections(trailer_dict: DictObject
+                           ) -> List[Tuple[int, bool]]:
+        """
+        :return: the (offset, follow) of the /XRefStm section (7.5.8.4) and
+        of the /Prev section
+        """
+        sections = []
+        xref_stm = trailer_dict.get(b"/XRefStm")
+        if xref_stm is not None:
+            sections.append((xref_stm.value, False))
+        prev = trailer_dict.get(b"/Prev")
+        if prev is not None:
+            sections.append((prev.value, True))
+        return sections
+
+    def _load_xref_section(self, offset: int, follow: bool
+                           ) -> Tuple[Mapping[int, AnyXrefEntry],
+                                      List[Tuple[int, bool]]]:
+        xref_table, trailer_dict = self.get_xref_section(offset)
+        if follow:
+            return xref_table, self._previous_sections(trailer_dict)
+        return xref_table, []
+
+    def recover_document(self, object_cache: Optional[ObjectCache] = None,
+                         stream_cache: Optional[StreamCache] = None
+                         ) -> PDFDocument:
+        """
+        Rebuild the xref table by a scan of the file, and find the trailer
+        dict or the catalog.
+
+        :param object_cache: the cache of the indirect objects
+        :param stream_cache: the cache of the decoded streams
+        :return: the document. `recovered_count` is the number of objects
+        found.
+        """
+        scan = scan_objects(self.read_at, self.size())
+        xref_table = XrefIndex()
+        for obj_num, (offset, gen_num) in scan.entry_by_obj_num.items():
+            xref_table.set_entry(obj_num, IN_USE, offset, gen_num)
+
+        trailer_dict = self._recover_trailer_dict(scan)
+        items = dict(trailer_dict.items()) if trailer_dict is not None else {}
+        if b"/Root" not in items:
+            check(bool(scan.catalogs), "Can't find the catalog")
+            items[b"/Root"] = IndirectRef(scan.catalogs[-1], 0)
+        size = max(scan.entry_by_obj_num, default=0) + 1
+        if b"/Size" in items:
+            size = max(size, items[b"/Size"].value)
+        items[b"/Size"] = NumberObject(size)
+        document = self._create_document(DictObject(items), xref_table,
+                                         object_cache, stream_cache)
+        self._recover_object_streams(document, scan)
+        document.recovered_count = len(xref_table)
+        self._logger.info("Recovered %d objects", document.recovered_count)
+        return document
+
+    def _recover_trailer_dict(self, scan: ScanResult) -> Optional[DictObject]:
+        """
+        :return: the last trailer dict or xref stream dict, or None
+        """
+        try:
+            if scan.trailer_offset > scan.xref_stream_offset:
+                self.seek(scan.trailer_offset + len(b"trailer"))
+                return self.read_dict()
+            elif scan.xref_stream_offset >= 0:
+                self.seek(scan.xref_stream_offset)
+                self.read_obj_line()
+                return self.read_dict()
+        except Exception:
+            self._logger.warning("Can't read the trailer", exc_info=True)
+        return None
+
+    def _recover_object_streams(self, document: PDFDocument,
+                                scan: ScanResult):
+        """
+        Add the objects of the object streams to the xref table, unless
+        they are defined later in the file.
+        """
+        xref_table = document.xref_table
+        for stream_obj_num in sorted(set(scan.object_streams),
+                                     key=lambda n: scan.entry_by_obj_num[n]):
+            stream_offset = scan.entry_by_obj_num[stream_obj_num][0]
+            try:
+                object_stream = document._get_object_stream(stream_obj_num)
+            except Exception:
+                self._logger.warning("Can't read the object stream %s",
+                                     stream_obj_num, exc_info=True)
+                continue
+            for index, obj_num in enumerate(object_stream.obj_nums):
+                entry = scan.entry_by_obj_num.get(obj_num)
+                if entry is None or entry[0] < stream_offset:
+                    xref_table[obj_num] = CompressedXrefEntry(stream_obj_num,
+                                                              index)
+
+    def index_key(self) -> IndexKey:
+        """
+        :return: the key of the file for the sidecar index
+        """
+        size = self.size()
+        try:
+            mtime_ns = os.fstat(self._stream.fileno()).st_mtime_ns
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            mtime_ns = 0  # a buffer
+        start = max(0, size - TRAILER_REGION_SIZE)
+        return index_key(size, mtime_ns, self.read_at(start, size - start))
+
+    def _write_index(self, index_path: PathLike, key: IndexKey,
+                     document: PDFDocument, trailer_dict: DictObject):
+        """
+        Build and write the index. A failure (e.g. a damaged page tree) is
+        logged: the document is still opened.
+        """
+        try:
+            xref_table = document.xref_table
+            if not isinstance(xref_table, XrefIndex):
+                xref_table = XrefIndex()
+                xref_table.update(document.xref_table)
+            extent_index = ExtentIndex.from_xref_table(xref_table,
+                                                       self.size())
+            index = DocumentIndex(to_pdf_syntax(trailer_dict), xref_table,
+                                  document.get_page_obj_nums(),
+                                  array("q", extent_index.offsets))
+            write_index(index_path, key, index)
+        except Exception:
+            self._logger.warning("Can't write the index %s", index_path,
+                                 exc_info=True)
+
+    def size(self) -> int:
+        """
+        :return: the size of the file
+        """
+        if self.forkable:
+            return len(self._stream)
+        cur = self._stream.tell()
+        size = self._stream.seek(0, io.SEEK_END)
+        self._stream.seek(cur)
+        return size
+
+    def get_xref_section(self, start_xref: int
+                         ) -> Tuple[Mapping[int, AnyXrefEntry], DictObject]:
+        """
+        Read a cross-reference section: a xref table and the trailer dict or
+        a cross-reference stream.
+
+        :param start_xref: the offset of the section
+        :return: the xref table and the trailer dict
+        """
+        if self.read_at(start_xref, 4) == b"xref":
+            xref_table = self.get_xref_table(start_xref)
+            # the trailer keyword was read, read the trailer dict now.
+            return xref_table, self.read_dict()
+        else:
+            return self.get_xref_stream(start_xref)
+
+    def get_xref_stream(self, start_xref: int
+                        ) -> Tuple[XrefIndex, DictObject]:
+        """
+        7.5.8 Cross-Reference Streams
+
+        Example:
+
+            12 0 obj
+            << /Type /XRef /Size 13 /W [1 2 1] /Root 1 0 R /Length 52
+               /Filter /FlateDecode /DecodeParms << /Columns 4 /Predictor 12 >>
+            >>
+            stream
+            ...
+            endstream
+            endobj
+
+        :param start_xref: the offset of the stream object
+        :return: the xref table and the stream dict, that is the trailer dict
+        """
+        self.seek(start_xref)
+        self.read_obj_line()
+        stream_dict = self.read_dict()
+        type_obj = stream_dict.get(b"/Type")
+        check(isinstance(type_obj, NameObject) and type_obj.bs == b"/XRef",
+              "Expected a xref stream at offset {}, was {}", start_xref,
+              stream_dict)
+        stream_word = self.read_endobj_line()
+        if not stream_word:
+            stream_word = self.read_endobj_line()
+        check(stream_word == b"stream", "Expected `stream`, was {}",
+              stream_word)
+        # the entries of a xref stream shall be direct objects
+        length = get_num(stream_dict, b"/Length")
+        data = decode_data(self.read_at(self.tell(), length),
+                           get_filters(stream_dict))
+        widths = [checked_cast(NumberObject, w).value
+                  for w in checked_cast(ArrayObject, stream_dict[b"/W"])]
+        index_obj = stream_dict.get(b"/Index")
+        if index_obj is None:
+            index = [0, get_num(stream_dict, b"/Size")]
+        else:
+            index = [checked_cast(NumberObject, i).value
+                     for i in checked_cast(ArrayObject, index_obj)]
+        return decode_xref_stream(data, widths, index), stream_dict
+
+    def get_xref_table(self, start_xref: int) -> Mapping[int, XrefEntry]:
         """Read the xref table and the trailer keyword.
 
         Example:
@@ -512,20 +1399,90 @@ class PDFParser:
             0000025777 00000 n
         """
         self._stream.seek(start_xref)
-        line = self.readline()
+        reader = self._line_reader()
+        line = reader.readline()
         check(line == b"xref", "Can't find `xref` word at offset {}",
-              self._stream.tell())
-        line = self.readline()
-        entry_by_ref_num = {}
+              reader.tell())
+        line = reader.readline()
+        entry_by_ref_num = XrefIndex()
+        subsections = []
         while line and line != b"trailer":
             off, n = map(int, line.split())
-            for i in range(off, off + n):
-                line = self.readline()
-                byte_offset, gen_number, kw = line.split()
-                entry_by_ref_num[i] = XrefEntry(byte_offset, gen_number, kw)
-            line = self.readline()
+            if self.lazy_xref:
+                subsection = self._skip_xref_subsection(reader, off, n)
+                if subsection is not None:
+                    subsections.append(subsection)
+                    # the previous malformed entries are overwritten
+                    for obj_num in [obj_num for obj_num in entry_by_ref_num
+                                    if off <= obj_num < off + n]:
+                        del entry_by_ref_num[obj_num]
+                    line = reader.readline()
+                    continue
+            self._read_xref_subsection(reader, off, n, entry_by_ref_num)
+            line = reader.readline()
+        self._sync(reader)
+        if self.lazy_xref:
+            return LazyXrefTable(self.read_at, subsections, entry_by_ref_num)
         return entry_by_ref_num
 
+    @staticmethod
+    def _skip_xref_subsection(reader: LineReader, first: int, count: int
+                              ) -> Optional[XrefSubsection]:
+        """
+        Check the first and the last entries of the subsection, and skip the
+        subsection.
+
+        :return: the subsection or None if it is malformed (the reader is not
+        moved).
+        """
+        offset = reader.tell()
+        if count:
+            if not XREF_ENTRY_RE.fullmatch(reader.read(XREF_ENTRY_SIZE)):
+                reader.seek(offset)
+                return None
+            reader.seek(offset + (count - 1) * XREF_ENTRY_SIZE)
+            if not XREF_ENTRY_RE.fullmatch(reader.read(XREF_ENTRY_SIZE)):
+                reader.seek(offset)
+                return None
+        return XrefSubsection(first, count, offset)
+
+    @staticmethod
+    def _read_xref_subsection(reader: LineReader, first: int, count: int,
+                              entry_by_ref_num: XrefIndex):
+        """
+        Read the `count` entries of a subsection in one read. The entries
+        are 20 bytes long: fall back to a line by line read if they are
+        malformed.
+        """
+        set_entry = entry_by_ref_num.set_entry
+        start = reader.tell()
+        data = reader.read(count * XREF_ENTRY_SIZE)
+        if XREF_SUBSECTION_RE.fullmatch(data):
+            for i, (byte_offset, gen_number, kw) in enumerate(
+                    XREF_ENTRY_RE.findall(data), first):
+                set_entry(i, IN_USE if kw == b"n" else FREE, int(byte_offset),
+                          int(gen_number))
+        else:
+            reader.seek(start)
+            for i in range(first, first + count):
+                line = reader.readline()
+                byte_offset, gen_number, kw = line.split()
+                set_entry(i, IN_USE if kw == b"n" else FREE, int(byte_offset),
+                          int(gen_number))
+
+    def _line_reader(self) -> LineReader:
+        """
+        :return: a line reader at the current position. Call `_sync` after
+        use.
+        """
+        if self.buffered:  # a BufferStream is a line reader
+            return cast(LineReader, self._stream)
+        return LineReader(self._stream)
+
+    def _sync(self, reader: LineReader):
+        if not self.buffered:
+            reader.sync()
+
     def read_dict(self) -> DictObject:
         return checked_cast(DictObject, self.read_object())
 
@@ -537,8 +1494,65 @@ class PDFParser:
         raise Exception("Parser" + format_string.format(*parameters))
 
     def read_object(self):
-        tokenizer = PDFTokenizer.create(self._stream)
-        return ObjectParser(tokenizer).parse()
+        if self.lazy_objects and self.buffered:
+            obj = self._read_lazy_dict()
+            if obj is not None:
+                return obj
+
+        if self.engine == TABLE_ENGINE:
+            return self._read_object_table()
+
+        if self.buffered:
+            stream_wrapper = BufferStreamWrapper(self._stream.getbuffer(),
+                                                 self._stream.tell())
+            obj = ObjectParser(PDFTokenizer(stream_wrapper)).parse()
+            self._stream.seek(stream_wrapper.tell())
+            return obj
+
+        stream_wrapper = BufferedBinaryStreamWrapper(self._stream,
+                                                     self._block_size)
+        obj = ObjectParser(PDFTokenizer(stream_wrapper)).parse()
+        stream_wrapper.sync()
+        return obj
+
+    def _read_lazy_dict(self) -> Optional[LazyDictObject]:
+        """
+        :return: the dictionary, or None if the next object is not a
+        dictionary (it will be parsed)
+        """
+        buf = self._stream.getbuffer()
+        pos = skip_spaces(buf, self._stream.tell())
+        if buf[pos:pos + 2] != b"<<":
+            return None
+        spans, end = scan_dict(buf, pos)
+        self._stream.seek(end)
+        return LazyDictObject(buf, spans, parse_lazy_value)
+
+    def _read_object_table(self):
+        if self.buffered:
+            lexer = TableLexer(self._stream.getbuffer(), self._stream.tell())
+            obj = ObjectParser(lexer).parse()
+            self._stream.seek(lexer.pos)
+            return obj
+
+        # read a block, and retry with a larger block if the object is not
+        # complete.
+        start = self._stream.tell()
+        size = min(FIRST_BLOCK_SIZE, self._block_size)
+        while True:
+            data = self._stream.read(size)
+            final = len(data) < size
+            lexer = TableLexer(data, 0, final)
+            try:
+                obj = ObjectParser(lexer).parse()
+            except StopIteration:
+                if final:
+                    raise
+                size *= 2
+                self._stream.seek(start)
+            else:
+                self._stream.seek(start + lexer.pos)
+                return obj
 
     def _find_start_xref(self) -> int:
         """Find the startxref value.
@@ -549,14 +1563,13 @@ class PDFParser:
             18799
             %%EOF
         """
-        it = reverse_reader(self._stream)
+        # a CRLF may be split across two blocks: skip the void lines
+        it = (line for line in reverse_reader(self._stream) if line.strip())
         expected_eof = next(it)
-        while not expected_eof:
-            expected_eof = next(it)
-        if expected_eof != b"%%EOF":
+        if expected_eof.strip() != b"%%EOF":
             raise ValueError(expected_eof)
         startxref = int(next(it))
-        if next(it) != b"startxref":
+        if next(it).strip() != b"startxref":
             raise ValueError()
         return startxref
 
@@ -567,49 +1580,80 @@ class PDFParser:
         return self._stream.read(length)
 
     def read_obj_line(self) -> Tuple[bytes, bytes]:
+        start = self.tell()
         line = self.readline()
-        obj_num, gen_num, obj_word = line.split()
-        assert obj_word == b"obj"
-        return obj_num, gen_num
+        m = OBJ_HEADER_RE.match(line)
+        check(m is not None, "Expected `obj` at offset {}, was {}", start,
+              line)
+        if m.end() < len(line):  # the object starts on the same line
+            self.seek(start + m.end())
+        return m.group(1), m.group(2)
 
     def read_endobj_line(self) -> bytes:
         return self.readline()
 
-    def stream_window(self, stream_obj: StreamObject, encrypter: Encrypter
-                      ) -> Iterable[bytes]:
-        self._stream.seek(stream_obj.start, io.SEEK_SET)
+    def stream_window(self, stream_obj: StreamObject, encrypter: Encrypter,
+                      chunk_size: Optional[int] = None) -> Iterable[bytes]:
+        """
+        :param stream_obj: the stream
+        :param encrypter: the encrypter of the document, or None
+        :param chunk_size: the size of the reads. Default is adaptive (see
+                           `STREAM_CHUNK_SIZE`). A consumer of the whole data
+                           may pass the length of the stream to read it in
+                           one call.
+        :return: the raw data of the stream, by chunks
+        """
+        if self.buffered:
+            # a single memoryview, nothing is read or copied
+            start = stream_obj.start
+            view = self._stream.getbuffer()[start:start + stream_obj.length]
+            if encrypter is None:
+                yield view
+            else:
+                ec = encrypter.chunks_encrypter(stream_obj.obj_num,
+                                                stream_obj.gen_num)
+                yield ec.chunk(view)
+            return
+
+        if self.forkable:  # don't move the shared position
+            parser = self.at(stream_obj.start)
+        else:
+            parser = self
+            self._stream.seek(stream_obj.start, io.SEEK_SET)
         if encrypter is None:
-            yield from self._stream_window(stream_obj)
+            yield from parser._stream_window(stream_obj.length, chunk_size)
         else:
             ec = encrypter.chunks_encrypter(stream_obj.obj_num,
                                             stream_obj.gen_num)
-            for c in self._stream_window(stream_obj):
+            for c in parser._stream_window(stream_obj.length, chunk_size):
                 yield ec.chunk(c)
 
-    def _stream_window(self, stream_obj: StreamObject):
-        for i in range(0, stream_obj.length - BUF_SIZE, BUF_SIZE):
-            yield self._stream.read(BUF_SIZE)
-        yield self._stream.read(stream_obj.length % BUF_SIZE)
-
-    def readline(self):
-        cr = False
-        cs = []
-        while True:
-            bytes_read = self._stream.read(1)
-            if not bytes_read:
-                break
-            c = bytes_read[0]
-            if c == LINE_FEED:
-                break
-            if c == CARRIAGE_RETURN:
-                cr = True
-            elif cr:
-                self._stream.seek(-1, io.SEEK_CUR)
-                break
-            else:
-                cs.append(c)
-
-        return _bytes_to_string(cs)
+    def _stream_window(self, length: int, chunk_size: Optional[int]
+                       ) -> Iterator[bytes]:
+        max_size = self.stream_chunk_size if chunk_size is None else chunk_size
+        max_size = max(1, max_size)
+        if chunk_size is None and length > max_size:
+            size = min(FIRST_STREAM_CHUNK_SIZE, max_size)
+        else:
+            size = max_size
+        while length > 0:
+            data = self._stream.read(min(size, length))
+            if not data:
+                self._logger.warning("Truncated stream: %d bytes missing",
+                                     length)
+                return
+            yield data
+            length -= len(data)
+            size = min(2 * size, max_size)
+
+    def readline(self) -> bytes:
+        if self.buffered:
+            return self._stream.readline()
+
+        reader = LineReader(self._stream, READLINE_BLOCK_SIZE)
+        line = reader.readline()
+        reader.sync()
+        return line
 
 
 def reverse_reader(stream: BinaryIO) -> Iterator[bytes]:
@@ -623,7 +1667,7 @@ def reverse_reader(stream: BinaryIO) -> Iterator[bytes]:
         stream.seek(-to_read, io.SEEK_CUR)
         buf = stream.read(to_read)
         stream.seek(-to_read, io.SEEK_CUR)
-        lines = re.split(b"(\r|\n|\r\n)", buf)
+        lines = re.split(b"(\r\n|\r|\n)", buf)
         if len(lines) == 1:  # no EOL
             remainders.insert(0, lines[0])
         else:
@@ -708,3 +1752,27 @@ class ObjectParser:
 
             else:
                 assert False, "{} {} {}".format(repr(token), token.__class__, OpenDictToken.__class__)
+
+
+def parse_lazy_value(buf: Any, start: int, end: int) -> Any:
+    """
+    Parse the value of a lazy dictionary or array. The nested dictionaries
+    and arrays are lazy too.
+
+    :param buf: the buffer
+    :param start: the start of the value
+    :param end: the end of the value
+    :return: the value
+    """
+    first = buf[start]
+    if first == ord("["):
+        array_spans, _ = scan_array(buf, start)
+        return LazyArrayObject(buf, array_spans, parse_lazy_value)
+    elif buf[start:start + 2] == b"<<":
+        spans, _ = scan_dict(buf, start)
+        return LazyDictObject(buf, spans, parse_lazy_value)
+
+    if CHAR_CLASS[first] == NUMBER_CLASS and buf[end - 1] == ord("R"):
+        obj_num, gen_num, _ = bytes(buf[start:end]).split()
+        return IndirectRef(int(obj_num), int(gen_num))
+    return ObjectParser(TableLexer(buf[start:end])).parse()
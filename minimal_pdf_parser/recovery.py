@@ -0,0 +1,99 @@
+"""
+Rebuild the xref table of a damaged file by a linear scan of the file.
+"""
+import re
+from bisect import bisect_right
+from typing import Callable, Dict, List, NamedTuple, Tuple, cast
+
+SCAN_CHUNK_SIZE = 1024 * 1024
+# the context before a chunk (to check that a number is not truncated) and
+# the max length of a match that starts at the end of a chunk.
+SCAN_OVERLAP = 256
+
+WHITESPACES = b"\x00\t\n\x0c\r "
+DIGITS = b"0123456789"
+_WS = rb"[\x00\t\n\x0c\r ]"
+# the keywords are found by literal searches, which are fast. The text
+# before `obj` is checked by HEADER_RE.
+OBJ_RE = re.compile(rb"obj(?![A-Za-z])")
+TRAILER_RE = re.compile(rb"trailer(?![A-Za-z])")
+TYPE_RE = re.compile(rb"/Type" + _WS + rb"*/(Catalog|ObjStm|XRef)(?![A-Za-z])")
+# no lookbehind (slow): the char before the match is checked.
+HEADER_RE = re.compile(
+    rb"([0-9]{1,10})" + _WS + rb"+([0-9]{1,5})" + _WS + rb"+\Z")
+HEADER_LOOKBEHIND = 32
+
+ScanResult = NamedTuple("ScanResult", [
+    # the latest definition: obj num -> (offset, gen num)
+    ("entry_by_obj_num", Dict[int, Tuple[int, int]]),
+    # the offset of the last `trailer` keyword, or -1
+    ("trailer_offset", int),
+    # the obj nums of the objects that have this type, in file order
+    ("catalogs", List[int]),
+    ("object_streams", List[int]),
+    ("xref_streams", List[int]),
+    # the offset of the last xref stream, or -1
+    ("xref_stream_offset", int),
+])
+
+
+def scan_objects(read_at: Callable[[int, int], bytes], size: int,
+                 chunk_size: int = SCAN_CHUNK_SIZE) -> ScanResult:
+    """
+    Find the `N G obj` headers of the file, the `trailer` keywords and the
+    catalogs, object streams and xref streams. The file is read by chunks:
+    the memory use does not depend on the size of the file.
+
+    :param read_at: a function (offset, size) -> bytes
+    :param size: the size of the file
+    :param chunk_size: the size of a chunk
+    :return: the result of the scan
+    """
+    entry_by_obj_num = cast(Dict[int, Tuple[int, int]], {})
+    header_offsets = []  # the offsets of the headers, in file order
+    header_obj_nums = []
+    trailer_offset = -1
+    types = []  # (offset, type)
+    for chunk_start in range(0, size, chunk_size):
+        context = min(chunk_start, SCAN_OVERLAP)
+        data = read_at(chunk_start - context,
+                       context + chunk_size + SCAN_OVERLAP)
+        base = chunk_start - context
+        chunk_end = context + chunk_size
+        for m in OBJ_RE.finditer(data, context):
+            i = m.start()
+            if i >= chunk_end:
+                break
+            if data[i - 1] not in WHITESPACES:
+                continue  # not a header, e.g. `endobj`
+            h = HEADER_RE.search(data, max(0, i - HEADER_LOOKBEHIND), i)
+            if h is None or (h.start() > 0 and data[h.start() - 1] in DIGITS):
+                continue
+            obj_num = int(h.group(1))
+            offset = base + h.start()
+            header_offsets.append(offset)
+            header_obj_nums.append(obj_num)
+            # the latest definition wins
+            entry_by_obj_num[obj_num] = (offset, int(h.group(2)))
+        for m in TRAILER_RE.finditer(data, context):
+            i = m.start()
+            if i < chunk_end and not (i > 0 and data[i - 1:i].isalpha()):
+                trailer_offset = base + i
+        for m in TYPE_RE.finditer(data, context):
+            if m.start() < chunk_end:
+                types.append((base + m.start(), m.group(1)))
+
+    obj_nums_by_type = cast(Dict[bytes, List[int]], {
+        b"Catalog": [], b"ObjStm": [], b"XRef": []})
+    xref_stream_offset = -1
+    for offset, type_bs in types:
+        # the type belongs to the last object before it
+        i = bisect_right(header_offsets, offset) - 1
+        if i >= 0:
+            obj_nums_by_type[type_bs].append(header_obj_nums[i])
+            if type_bs == b"XRef":
+                xref_stream_offset = header_offsets[i]
+    return ScanResult(entry_by_obj_num, trailer_offset,
+                      obj_nums_by_type[b"Catalog"],
+                      obj_nums_by_type[b"ObjStm"], obj_nums_by_type[b"XRef"],
+                      xref_stream_offset)
@@ -2,8 +2,6 @@ import struct
 from hashlib import md5
 from typing import List, BinaryIO
 
-from minimal_pdf_parser.tokenizer import _bytes_to_string
-
 PADDING_STRING = (b"\x28\xbf\x4e\x5e\x4e\x75\x8a\x41"
                   b"\x64\x00\x4e\x56\xff\xfa\x01\x08"
                   b"\x2e\x2e\x00\xb6\xd0\x68\x3e\x80"
@@ -196,7 +194,7 @@ def ARC4(key: bytes, data: bytes) -> bytes:
         cipher_byte = permutation[(permutation[i] + permutation[j]) & 0xFF]
         ret.append(b ^ cipher_byte)
 
-    return _bytes_to_string(ret)
+    return bytes(ret)
 
 
 class ARC4_iterator:
@@ -224,7 +222,7 @@ class ARC4_iterator:
                 (self.permutation[self.i] + self.permutation[self.j]) & 0xFF]
             ret.append(b ^ cipher_byte)
 
-        return _bytes_to_string(ret)
+        return bytes(ret)
 
 
 def _init_ARC4(key: bytes):
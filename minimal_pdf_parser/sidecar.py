@@ -0,0 +1,156 @@
+"""
+A sidecar index file: the merged xref table, the trailer, the list of the
+pages and the offsets of the objects of a PDF file, to reopen the file
+without reading the cross-reference sections again.
+
+The index is keyed by the size and the modification time of the file, and
+a hash of the end of the file, where the last trailer is.
+"""
+import hashlib
+import logging
+import os
+import struct
+import sys
+from array import array
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, List, NamedTuple, Optional, Union
+
+from base import (
+    DictObject, ArrayObject, NameObject, StringObject, NumberObject,
+    BooleanObject, NullObject, IndirectRef, encode_name)
+from xref import XrefIndex
+
+MAGIC = b"%MPPIDX1"
+TRAILER_REGION_SIZE = 1024
+# size, mtime_ns, digest
+KEY_FORMAT = "<Qq32s"
+# len(trailer), len(xref), len(page_obj_nums), len(offsets)
+HEADER_FORMAT = "<QQQQ"
+
+_logger = logging.getLogger(__name__)
+
+IndexKey = NamedTuple("IndexKey", [
+    ("size", int), ("mtime_ns", int), ("digest", bytes)
+])
+
+DocumentIndex = NamedTuple("DocumentIndex", [
+    ("trailer", bytes), ("xref_table", XrefIndex),
+    ("page_obj_nums", List[int]), ("offsets", array)
+])
+
+PathLike = Union[str, Path]
+
+
+def index_key(size: int, mtime_ns: int, trailer_region: bytes) -> IndexKey:
+    """
+    :param size: the size of the file
+    :param mtime_ns: the modification time of the file, 0 if unknown
+    :param trailer_region: the last `TRAILER_REGION_SIZE` bytes of the file
+    :return: the key
+    """
+    return IndexKey(size, mtime_ns, hashlib.sha256(trailer_region).digest())
+
+
+def read_index(path: PathLike, key: IndexKey) -> Optional[DocumentIndex]:
+    """
+    Read the index in one read.
+
+    :param path: the path of the index file
+    :param key: the key of the PDF file
+    :return: the index, or None if the file is missing, stale or malformed
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    pos = len(MAGIC)
+    key_size = struct.calcsize(KEY_FORMAT)
+    header_size = struct.calcsize(HEADER_FORMAT)
+    if (data[:pos] != MAGIC or len(data) < pos + key_size + header_size
+            or IndexKey(*struct.unpack_from(KEY_FORMAT, data, pos)) != key):
+        return None
+    pos += key_size
+    trailer_len, xref_len, pages_len, offsets_len = struct.unpack_from(
+        HEADER_FORMAT, data, pos)
+    pos += header_size
+    trailer = data[pos:pos + trailer_len]
+    pos += trailer_len
+    try:
+        xref_table = XrefIndex.from_bytes(data[pos:pos + xref_len])
+    except Exception:
+        _logger.warning("Malformed index %s", path)
+        return None
+    pos += xref_len
+    page_obj_nums = array("q", data[pos:pos + 8 * pages_len])
+    pos += 8 * pages_len
+    offsets = array("q", data[pos:pos + 8 * offsets_len])
+    if len(page_obj_nums) != pages_len or len(offsets) != offsets_len:
+        _logger.warning("Truncated index %s", path)
+        return None
+    if sys.byteorder == "big":
+        page_obj_nums.byteswap()
+        offsets.byteswap()
+    return DocumentIndex(trailer, xref_table, list(page_obj_nums), offsets)
+
+
+def write_index(path: PathLike, key: IndexKey, index: DocumentIndex):
+    """
+    Write the index. The file is replaced atomically.
+
+    :param path: the path of the index file
+    :param key: the key of the PDF file
+    :param index: the index
+    """
+    xref_bytes = index.xref_table.to_bytes()
+    page_obj_nums = array("q", index.page_obj_nums)
+    offsets = array("q", index.offsets)
+    if sys.byteorder == "big":
+        page_obj_nums.byteswap()
+        offsets.byteswap()
+    data = b"".join([
+        MAGIC, struct.pack(KEY_FORMAT, *key),
+        struct.pack(HEADER_FORMAT, len(index.trailer), len(xref_bytes),
+                    len(page_obj_nums), len(offsets)),
+        index.trailer, xref_bytes, page_obj_nums.tobytes(),
+        offsets.tobytes()])
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def to_pdf_syntax(obj: Any) -> bytes:
+    """
+    7.3 Objects
+
+    :param obj: a direct object
+    :return: the object in PDF syntax
+    """
+    if isinstance(obj, DictObject):
+        return b"<<" + b"".join(
+            encode_name(k) + b" " + to_pdf_syntax(v) + b" " for k, v in obj.items()) + b">>"
+    elif isinstance(obj, ArrayObject):
+        return b"[" + b" ".join(to_pdf_syntax(v) for v in obj) + b"]"
+    elif isinstance(obj, NameObject):
+        return encode_name(obj.bs)
+    elif isinstance(obj, StringObject):
+        return b"<" + obj.bs.hex().encode("ascii") + b">"
+    elif isinstance(obj, NumberObject):
+        value = obj.value
+        if isinstance(value, int):
+            return b"%d" % value
+        # the shortest text that round trips, without an exponent
+        text = format(Decimal(repr(value)), "f")
+        if "." not in text:
+            text += "."
+        return text.encode("ascii")
+    elif isinstance(obj, BooleanObject):
+        return b"true" if obj.value else b"false"
+    elif isinstance(obj, IndirectRef):
+        return b"%d %d R" % (obj.obj_num, obj.gen_num)
+    elif obj is NullObject:
+        return b"null"
+    raise ValueError(obj)
@@ -1,10 +1,12 @@
-import struct
+import io
+import re
 from abc import ABC, abstractmethod
-from typing import NamedTuple, BinaryIO, cast, Any, Iterator
+from typing import (
+    NamedTuple, BinaryIO, cast, Any, Iterator, Optional, Tuple, Iterable)
 
 from base import (
     OpenDictToken, CloseDictToken, OpenArrayToken, CloseArrayToken,
-    StringObject, NameObject, WordToken, NumberObject)
+    StringObject, NumberObject, intern_name, intern_word)
 
 
 class TokenError(Exception):
@@ -37,6 +39,35 @@ class StreamWrapper(ABC):
             return
         self._unget = True
 
+    def read_all(self) -> bytes:
+        """
+        :return: all the remaining bytes
+        """
+        return bytes(self)
+
+    def take_string(self) -> Optional[bytes]:
+        """
+        Read the rest of a literal string in one step, after the left
+        parenthesis.
+
+        :return: the string, or None if the string must be read byte by
+        byte (the position is unchanged)
+        """
+        return None
+
+    def chunks(self) -> Iterator[Any]:
+        """
+        :return: an iterator over the remaining bytes, by chunks. The
+        wrapper is consumed.
+        """
+        yield self.read_all()
+
+    def _take_unget(self) -> bytes:
+        if self._unget:
+            self._unget = False
+            return bytes((self._prev,))
+        return b''
+
 
 class BinaryStreamWrapper(StreamWrapper):
     def __init__(self, stream: BinaryIO):
@@ -50,9 +81,294 @@ class BinaryStreamWrapper(StreamWrapper):
 
         return bytes_read[0]
 
+    def read_all(self) -> bytes:
+        return self._take_unget() + self._stream.read()
+
+
+BLOCK_SIZE = 64 * 1024
+FIRST_BLOCK_SIZE = 512
+
+
+class BufferedBinaryStreamWrapper(StreamWrapper):
+    """
+    A wrapper that reads the stream by blocks and serves the bytes from
+    memory. The first block is small (most objects are short) and the size
+    doubles on each read, up to `block_size`.
+
+    Call `sync` to move the underlying stream back to the position of the
+    last byte served.
+    """
+
+    def __init__(self, stream: BinaryIO, block_size: int = BLOCK_SIZE):
+        StreamWrapper.__init__(self)
+        self._stream = stream
+        self._block_size = block_size
+        self._next_size = min(FIRST_BLOCK_SIZE, block_size)
+        self._buf = b''
+        self._i = 0
+
+    def __next__(self) -> int:
+        if self._unget:
+            self._unget = False
+            return self._prev
+
+        if self._i >= len(self._buf):
+            self._fill()
+        self._prev = self._buf[self._i]
+        self._i += 1
+        return self._prev
+
+    def _get(self) -> int:
+        if self._i >= len(self._buf):
+            self._fill()
+        ret = self._buf[self._i]
+        self._i += 1
+        return ret
+
+    def _fill(self):
+        self._buf = self._stream.read(self._next_size)
+        self._next_size = min(self._next_size * 2, self._block_size)
+        self._i = 0
+        if not self._buf:
+            raise StopIteration()
+
+    def take_string(self) -> Optional[bytes]:
+        if self._unget:
+            return None
+        bs, pos = lex_string(self._buf, self._i, len(self._buf))
+        if pos == -1:  # not in this block
+            return None
+        self._i = pos
+        self._prev = RIGHT_PARENTHESIS
+        return bs
+
+    def read_all(self) -> bytes:
+        ret = self._take_unget() + self._buf[self._i:] + self._stream.read()
+        self._buf = b''
+        self._i = 0
+        return ret
+
+    def sync(self):
+        """
+        Seek the underlying stream to the position just after the last byte
+        served, as if the bytes had been read one by one.
+        """
+        remaining = len(self._buf) - self._i
+        if remaining:
+            self._stream.seek(-remaining, io.SEEK_CUR)
+        self._buf = b''
+        self._i = 0
+
+
+class ChunkStreamWrapper(StreamWrapper):
+    """
+    A wrapper over an iterator of chunks (e.g. the chunks decoded by the
+    filters of a stream). The bytes are served one by one, or by chunks
+    (see `chunks`).
+    """
+
+    def __init__(self, chunks: Iterable[Any]):
+        StreamWrapper.__init__(self)
+        self._it = iter(chunks)
+        self._cur = b''
+        self._i = 0
+
+    def __next__(self) -> int:
+        if self._unget:
+            self._unget = False
+            return self._prev
+
+        if self._i >= len(self._cur):
+            self._fill()
+        self._prev = self._cur[self._i]
+        self._i += 1
+        return self._prev
+
+    def _get(self) -> int:
+        if self._i >= len(self._cur):
+            self._fill()
+        ret = self._cur[self._i]
+        self._i += 1
+        return ret
+
+    def _fill(self):
+        self._cur = b''
+        while not self._cur:
+            self._cur = next(self._it)
+        self._i = 0
+
+    def take_string(self) -> Optional[bytes]:
+        if self._unget:
+            return None
+        bs, pos = lex_string(self._cur, self._i, len(self._cur))
+        if pos == -1:  # not in this chunk
+            return None
+        self._i = pos
+        self._prev = RIGHT_PARENTHESIS
+        return bs
+
+    def chunks(self) -> Iterator[Any]:
+        head = self._take_unget() + bytes(self._cur[self._i:])
+        self._cur = b''
+        self._i = 0
+        if head:
+            yield head
+        for chunk in self._it:
+            if chunk:
+                yield chunk
+
+    def read_all(self) -> bytes:
+        return b"".join(self.chunks())
 
-def _bytes_to_string(cs):
-    return struct.pack("{}B".format(len(cs)), *cs)
+
+class BufferStreamWrapper(StreamWrapper):
+    """A wrapper over a buffer: no read at all."""
+
+    def __init__(self, buf: memoryview, pos: int = 0):
+        StreamWrapper.__init__(self)
+        self._buf = buf
+        self._i = pos
+
+    def __next__(self) -> int:
+        if self._unget:
+            self._unget = False
+            return self._prev
+
+        try:
+            self._prev = self._buf[self._i]
+        except IndexError:
+            raise StopIteration()
+        self._i += 1
+        return self._prev
+
+    def _get(self) -> int:
+        try:
+            ret = self._buf[self._i]
+        except IndexError:
+            raise StopIteration()
+        self._i += 1
+        return ret
+
+    def take_string(self) -> Optional[bytes]:
+        if self._unget:
+            return None
+        bs, pos = lex_string(self._buf, self._i, len(self._buf))
+        if pos == -1:  # unterminated: the state machine will fail
+            return None
+        self._i = pos
+        self._prev = RIGHT_PARENTHESIS
+        return bs
+
+    def read_all(self) -> bytes:
+        head = self._take_unget()
+        ret = self._buf[self._i:]
+        self._i = len(self._buf)
+        if head:
+            return head + ret
+        return ret
+
+    def tell(self) -> int:
+        """:return: the position after the last byte served"""
+        return self._i
+
+
+LINE_BLOCK_SIZE = 4096
+
+
+class LineReader:
+    """
+    A line reader over a block buffer. The EOL may be CR, LF or CRLF.
+
+    Call `sync` to move the underlying stream back to the position of the
+    last byte read.
+    """
+
+    def __init__(self, stream: BinaryIO, block_size: int = LINE_BLOCK_SIZE):
+        self._stream = stream
+        self._block_size = block_size
+        self._offset = stream.tell()  # offset of self._buf[0]
+        self._buf = b''
+        self._i = 0
+        self._eof = False
+
+    def tell(self) -> int:
+        return self._offset + self._i
+
+    def seek(self, offset: int):
+        if self._offset <= offset <= self._offset + len(self._buf):
+            self._i = offset - self._offset
+        else:
+            self._stream.seek(offset)
+            self._offset = offset
+            self._buf = b''
+            self._i = 0
+            self._eof = False
+
+    def _fill(self, size: int):
+        """
+        Ensure that at least `size` bytes are available in the buffer, unless
+        the end of the stream is reached.
+        """
+        missing = size - (len(self._buf) - self._i)
+        if missing <= 0 or self._eof:
+            return
+        to_read = max(missing, self._block_size)
+        bytes_read = self._stream.read(to_read)
+        self._eof = len(bytes_read) < to_read
+        self._offset += self._i
+        self._buf = self._buf[self._i:] + bytes_read
+        self._i = 0
+
+    def read(self, size: int) -> bytes:
+        self._fill(size)
+        ret = self._buf[self._i:self._i + size]
+        self._i += len(ret)
+        return ret
+
+    def readline(self) -> bytes:
+        """
+        :return: the line, without the EOL
+        """
+        searched = 0
+        while True:
+            buf = self._buf
+            start = self._i
+            size = len(buf)
+            lf = buf.find(b"\n", start + searched)
+            cr = buf.find(b"\r", start + searched, size if lf == -1 else lf)
+            if cr != -1:
+                if cr + 1 < size:
+                    end = cr
+                    next_i = cr + 2 if buf[cr + 1] == LINE_FEED else cr + 1
+                    break
+                elif self._eof:
+                    end, next_i = cr, cr + 1
+                    break
+                searched = cr - start  # is the CR followed by a LF?
+            elif lf != -1:
+                end, next_i = lf, lf + 1
+                break
+            elif self._eof:
+                end = next_i = size
+                break
+            else:
+                searched = size - start
+            self._fill(size - start + 1)
+
+        self._i = next_i
+        return buf[start:end]
+
+    def sync(self):
+        """
+        Seek the underlying stream to the position just after the last byte
+        read.
+        """
+        offset = self.tell()
+        self._stream.seek(offset)
+        self._offset = offset
+        self._buf = b''
+        self._i = 0
+        self._eof = False
 
 
 DELIMITERS = b"()<>[]{}/%"
@@ -85,11 +401,71 @@ T_LOWER = 0x74
 Z_LOWER = 0x7A
 STAR = 0x2A
 
+ESCAPED_BY_CHAR = {
+    B_LOWER: BACKSPACE,
+    F_LOWER: FORM_FEED,
+    N_LOWER: LINE_FEED,
+    R_LOWER: CARRIAGE_RETURN,
+    T_LOWER: HORIZONTAL_TAB,
+    LEFT_PARENTHESIS: LEFT_PARENTHESIS,
+    RIGHT_PARENTHESIS: RIGHT_PARENTHESIS,
+    BACKSLASH: BACKSLASH,
+}
+STRING_DELIMITER_RE = re.compile(rb"[\\()]")
+ESCAPE_RE = re.compile(rb"\\(?:([0-7]{1,3})|(\r\n?|\n)|(.))", re.DOTALL)
+
+
+def lex_string(buf: Any, pos: int, end: int) -> Tuple[Optional[bytes], int]:
+    """
+    7.3.4.2 Literal Strings: find the unescaped right parenthesis, and
+    take the string as one slice. The escapes are decoded only if there is a
+    backslash.
+
+    :param pos: the position after the left parenthesis
+    :return: the string and the position after the right parenthesis, or
+             None, -1 if the string is not terminated.
+    """
+    escaped = False
+    lparen_count = 0
+    i = pos
+    while True:
+        m = STRING_DELIMITER_RE.search(buf, i, end)
+        if m is None:
+            return None, -1
+        i = m.end()
+        delimiter = buf[m.start()]
+        if delimiter == BACKSLASH:
+            escaped = True
+            i += 1  # the escaped char
+        elif delimiter == LEFT_PARENTHESIS:
+            lparen_count += 1
+        elif lparen_count == 0:
+            break
+        else:
+            lparen_count -= 1
+    bs = bytes(buf[pos:i - 1])
+    if escaped:
+        bs = ESCAPE_RE.sub(_unescape, bs)
+    return bs, i
+
+
+def _unescape(m: Any) -> bytes:
+    octal, eol, c = m.groups()
+    if octal is not None:  # \ddd
+        return bytes((int(octal, 8) & 0xFF,))
+    elif eol is not None:  # the string continues on the next line
+        return b""
+    try:
+        return bytes((ESCAPED_BY_CHAR[c[0]],))
+    except KeyError:
+        return m.group()
+
+
 # Tokens and objects
 
 
 XrefEntry = NamedTuple("XrefEntry", [
-    ("byte_offset", bytes), ("gen_number", bytes),
+    ("byte_offset", int), ("gen_number", int),
     ("kw", bytes)
 ])
 
@@ -113,6 +489,9 @@ class StartState(State):
         elif c == RIGHT_SQUARE_BRACKET:  # array
             return CloseArrayToken
         elif c == LEFT_PARENTHESIS:  # string
+            bs = tokenizer.take_string()
+            if bs is not None:
+                return StringObject(bs)
             tokenizer.set_state(StringState())
         elif c == PERCENT_SIGN:  # comment
             tokenizer.set_state(CommentState())
@@ -126,15 +505,13 @@ class StartState(State):
 
 class NameObjectState(State):
     def __init__(self):
-        self._cs = [SLASH]
+        self._cs = bytearray((SLASH,))
 
     def handle(self, tokenizer: "PDFTokenizer", c: int):
-        # TODO: hash
         if c in DELIMITERS or c in WHITESPACES:
-            ret = struct.pack("{}B".format(len(self._cs)), *self._cs)
             tokenizer.unget()
             tokenizer.set_state(StartState())
-            return NameObject(ret)
+            return intern_name(bytes(self._cs))
         else:
             self._cs.append(c)
 
@@ -165,7 +542,7 @@ class CloseDictState(State):
 
 class StringState(State):
     def __init__(self):
-        self._cs = []
+        self._cs = bytearray()
         self._esc = False
         self._esc_cr = False
         self._lparen_count = 0
@@ -208,7 +585,7 @@ class StringState(State):
 
         if ret:
             tokenizer.set_state(StartState())
-            return StringObject(_bytes_to_string(self._cs))
+            return StringObject(bytes(self._cs))
         else:
             return None
 
@@ -273,14 +650,14 @@ class CommentState(State):
 
 class DigitState(State):
     def __init__(self, c):
-        self._cs = [c]
+        self._cs = bytearray((c,))
         self._dot = c == DOT
 
     def handle(self, tokenizer: "PDFTokenizer", c: int):
         if c == DOT:
             if self._dot:
                 tokenizer.set_state(DigitState(c))
-                return NumberObject(_bytes_to_string(self._cs))
+                return NumberObject(bytes(self._cs))
             else:
                 self._dot = True
                 self._cs.append(c)
@@ -289,12 +666,12 @@ class DigitState(State):
         else:
             tokenizer.unget()
             tokenizer.set_state(StartState())
-            return NumberObject(_bytes_to_string(self._cs))
+            return NumberObject(bytes(self._cs))
 
 
 class WordState(State):
     def __init__(self, c):
-        self._cs = [c]
+        self._cs = bytearray((c,))
 
     def handle(self, tokenizer: "PDFTokenizer", c: int):
         if A_LOWER <= c <= Z_LOWER or A_UPPER <= c <= Z_UPPER or c == STAR:
@@ -302,21 +679,20 @@ class WordState(State):
         else:
             tokenizer.unget()
             tokenizer.set_state(StartState())
-            return WordToken(_bytes_to_string(self._cs))
+            return intern_word(bytes(self._cs))
 
 
 class HexStringState(State):
     def __init__(self, c):
-        self._cs = [c]
+        self._cs = bytearray((c,))
 
     def handle(self, tokenizer: "PDFTokenizer", c: int):
         if c in b"0123456789ABCDEFabcdef":  # 3.2.3 StringObject Objects
             self._cs.append(c)
         elif c == GREATER_THAN:
-            hex_string = _bytes_to_string(self._cs)
             if len(self._cs) % 2 == 1:
-                hex_string += b"0"
-            ret = bytes.fromhex(hex_string.decode("ascii"))
+                self._cs.append(ZERO_DIGIT)
+            ret = bytes.fromhex(self._cs.decode("ascii"))
             tokenizer.set_state(StartState())
             return StringObject(ret)
         else:
@@ -330,6 +706,11 @@ class PDFTokenizer:
     def create(stream: BinaryIO) -> "PDFTokenizer":
         return PDFTokenizer(BinaryStreamWrapper(stream))
 
+    @staticmethod
+    def create_buffered(stream: BinaryIO, block_size: int = BLOCK_SIZE
+                        ) -> "PDFTokenizer":
+        return PDFTokenizer(BufferedBinaryStreamWrapper(stream, block_size))
+
     def __init__(self, stream_wrapper: StreamWrapper):
         self._stream_wrapper = stream_wrapper
         self._state = cast(State, StartState())
@@ -345,3 +726,6 @@ class PDFTokenizer:
 
     def unget(self):
         self._stream_wrapper.unget()
+
+    def take_string(self) -> Optional[bytes]:
+        return self._stream_wrapper.take_string()
@@ -0,0 +1,524 @@
+import re
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from typing import (
+    Mapping, MutableMapping, Iterator, List, NamedTuple, Dict, Callable,
+    Optional, Any, Tuple, Sequence, cast
+)
+
+from base import check
+from tokenizer import XrefEntry
+
+XREF_ENTRY_SIZE = 20
+XREF_ENTRY_RE = re.compile(rb"(\d{10}) (\d{5}) ([fn])(?: \r| \n|\r\n)")
+XREF_SUBSECTION_RE = re.compile(rb"(?:\d{10} \d{5} [fn](?: \r| \n|\r\n))*")
+
+# 7.5.8.3 Cross-Reference Stream Data, type 2
+CompressedXrefEntry = NamedTuple("CompressedXrefEntry", [
+    ("stream_obj_num", int), ("index", int)
+])
+
+XrefSubsection = NamedTuple("XrefSubsection", [
+    ("first", int), ("count", int), ("offset", int)
+])
+
+
+# the type codes of the XrefIndex
+ABSENT = 0
+FREE = 1
+IN_USE = 2
+COMPRESSED = 3
+
+MAX_GEN_NUMBER = 0xFFFF
+# an obj num beyond len + MAX_DENSE_GAP goes to the sparse dict, unless it
+# is less than twice the len of the arrays
+MAX_DENSE_GAP = 1 << 16
+
+
+class XrefIndex(MutableMapping[int, Any]):
+    """
+    An xref table stored in arrays indexed by obj num: a type code byte, a
+    64 bits field (byte offset or obj num of the object stream) and a 16 bits
+    field (gen number or index in the object stream), that is 11 bytes per
+    entry instead of a dict entry and a tuple.
+
+    The entries that do not fit in the arrays (obj num far beyond the other
+    obj nums, index in object stream greater than 65535) are stored in a
+    sparse dict.
+    """
+
+    def __init__(self, size: int = 0):
+        """
+        :param size: the expected number of entries (the /Size of the
+                     trailer)
+        """
+        self._types = bytearray(size)
+        self._fields2 = array("q", bytes(8 * size))
+        self._fields3 = array("H", bytes(2 * size))
+        self._sparse = cast(Dict[int, Any], {})
+        self._count = 0
+
+    def set_entry(self, obj_num: int, entry_type: int, field2: int,
+                  field3: int):
+        """
+        Set an entry without building a tuple.
+
+        :param obj_num: the obj num
+        :param entry_type: FREE, IN_USE or COMPRESSED
+        :param field2: the byte offset or the obj num of the object stream
+        :param field3: the gen number or the index in the object stream
+        """
+        types = self._types
+        if obj_num >= len(types) and not self._grow(obj_num):
+            self._set_sparse(obj_num,
+                             _to_entry(entry_type, field2, field3))
+            return
+        if field3 > MAX_GEN_NUMBER or field2 < 0:
+            self._set_sparse(obj_num,
+                             _to_entry(entry_type, field2, field3))
+            return
+        if types[obj_num] == ABSENT:
+            if self._sparse.pop(obj_num, None) is None:
+                self._count += 1
+        types[obj_num] = entry_type
+        self._fields2[obj_num] = field2
+        self._fields3[obj_num] = field3
+
+    def _grow(self, obj_num: int) -> bool:
+        """
+        :return: True if the arrays were extended to contain `obj_num`
+        """
+        size = len(self._types)
+        if obj_num >= max(size + MAX_DENSE_GAP, 2 * size):
+            return False
+        new_size = max(obj_num + 1, size + size // 2)
+        extra = new_size - size
+        self._types.extend(bytes(extra))
+        self._fields2.frombytes(bytes(8 * extra))
+        self._fields3.frombytes(bytes(2 * extra))
+        return True
+
+    def _set_sparse(self, obj_num: int, entry: Any):
+        if obj_num < len(self._types) and self._types[obj_num] != ABSENT:
+            self._types[obj_num] = ABSENT
+        elif obj_num not in self._sparse:
+            self._count += 1
+        self._sparse[obj_num] = entry
+
+    def byte_offset(self, obj_num: int) -> int:
+        """
+        :param obj_num: the obj num of an object in use, not in an object
+                        stream
+        :return: the byte offset of the object
+        :raise KeyError: if the object is not in use or compressed
+        """
+        if obj_num < len(self._types) and self._types[obj_num] == IN_USE:
+            return self._fields2[obj_num]
+        entry = self._sparse[obj_num]
+        if isinstance(entry, XrefEntry) and entry.kw == b"n":
+            return entry.byte_offset
+        raise KeyError(obj_num)
+
+    def __getitem__(self, obj_num: int) -> Any:
+        if obj_num < len(self._types):
+            entry_type = self._types[obj_num]
+            if entry_type == IN_USE:
+                return XrefEntry(self._fields2[obj_num],
+                                 self._fields3[obj_num], b"n")
+            elif entry_type == COMPRESSED:
+                return CompressedXrefEntry(self._fields2[obj_num],
+                                           self._fields3[obj_num])
+            elif entry_type == FREE:
+                return XrefEntry(self._fields2[obj_num],
+                                 self._fields3[obj_num], b"f")
+        return self._sparse[obj_num]
+
+    def __setitem__(self, obj_num: int, entry: Any):
+        if isinstance(entry, CompressedXrefEntry):
+            self.set_entry(obj_num, COMPRESSED, entry.stream_obj_num,
+                           entry.index)
+        elif entry.kw == b"n":
+            self.set_entry(obj_num, IN_USE, entry.byte_offset,
+                           entry.gen_number)
+        else:
+            self.set_entry(obj_num, FREE, entry.byte_offset, entry.gen_number)
+
+    def __delitem__(self, obj_num: int):
+        if obj_num < len(self._types) and self._types[obj_num] != ABSENT:
+            self._types[obj_num] = ABSENT
+        else:
+            del self._sparse[obj_num]
+        self._count -= 1
+
+    def __contains__(self, obj_num: Any) -> bool:
+        if isinstance(obj_num, int) and 0 <= obj_num < len(self._types):
+            if self._types[obj_num] != ABSENT:
+                return True
+        return obj_num in self._sparse
+
+    def __iter__(self) -> Iterator[int]:
+        types = self._types
+        for obj_num in range(len(types)):
+            if types[obj_num] != ABSENT:
+                yield obj_num
+        yield from sorted(self._sparse)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def to_bytes(self) -> bytes:
+        """
+        :return: a compact little endian representation of the index, see
+        `from_bytes`.
+        """
+        fields2 = array("q", self._fields2)
+        fields3 = array("H", self._fields3)
+        sparse = array("q")
+        for obj_num, entry in sorted(self._sparse.items()):
+            if isinstance(entry, CompressedXrefEntry):
+                sparse.extend((obj_num, COMPRESSED) + tuple(entry))
+            else:
+                sparse.extend((obj_num, IN_USE if entry.kw == b"n" else FREE,
+                               entry.byte_offset, entry.gen_number))
+        if sys.byteorder == "big":
+            for arr in (fields2, fields3, sparse):
+                arr.byteswap()
+        return b"".join([
+            struct.pack("<QQ", len(self._types), len(self._sparse)),
+            bytes(self._types), fields2.tobytes(), fields3.tobytes(),
+            sparse.tobytes()])
+
+    @staticmethod
+    def from_bytes(data: bytes) -> "XrefIndex":
+        """
+        :param data: the result of `to_bytes`
+        :return: the index
+        """
+        size, sparse_count = struct.unpack_from("<QQ", data)
+        pos = struct.calcsize("<QQ")
+        index = XrefIndex()
+        index._types = bytearray(data[pos:pos + size])
+        pos += size
+        index._fields2 = array("q", data[pos:pos + 8 * size])
+        pos += 8 * size
+        index._fields3 = array("H", data[pos:pos + 2 * size])
+        pos += 2 * size
+        sparse = array("q", data[pos:pos + 32 * sparse_count])
+        check(len(index._types) == size and len(sparse) == 4 * sparse_count,
+              "Truncated xref index")
+        if sys.byteorder == "big":
+            for arr in (index._fields2, index._fields3, sparse):
+                arr.byteswap()
+        index._count = size - index._types.count(ABSENT)
+        for i in range(0, len(sparse), 4):
+            obj_num, entry_type, field2, field3 = sparse[i:i + 4]
+            index._sparse[obj_num] = _to_entry(entry_type, field2, field3)
+            index._count += 1
+        return index
+
+
+def _to_entry(entry_type: int, field2: int, field3: int) -> Any:
+    if entry_type == COMPRESSED:
+        return CompressedXrefEntry(field2, field3)
+    return XrefEntry(field2, field3, b"n" if entry_type == IN_USE else b"f")
+
+
+class LazyXrefTable(Mapping[int, XrefEntry]):
+    """
+    A classic xref table that only knows the headers of the subsections.
+    The entries are 20 bytes long: an entry is found by arithmetic and read
+    on demand.
+
+    The entries of malformed subsections are parsed eagerly and stored in
+    `entry_by_ref_num`.
+
+    As in an eager table, if the subsections overlap, the last entry in file
+    order wins.
+    """
+
+    def __init__(self, read_at: Callable[[int, int], bytes],
+                 subsections: List[XrefSubsection],
+                 entry_by_ref_num: Dict[int, XrefEntry]):
+        """
+        :param read_at: a function (offset, size) -> bytes
+        :param subsections: the well formed subsections
+        :param entry_by_ref_num: the entries of the malformed subsections
+                                 that are not overwritten by a later well
+                                 formed subsection
+        """
+        self._read_at = read_at
+        self._subsections = sorted(subsections)
+        self._firsts = [subsection.first for subsection in self._subsections]
+        self._overlapping = any(
+            a.first + a.count > b.first
+            for a, b in zip(self._subsections, self._subsections[1:]))
+        self._entry_by_ref_num = entry_by_ref_num
+
+    def __getitem__(self, obj_num: int) -> XrefEntry:
+        try:
+            return self._entry_by_ref_num[obj_num]
+        except KeyError:
+            pass
+        subsection = self._find_subsection(obj_num)
+        if subsection is None:
+            raise KeyError(obj_num)
+        first, _, offset = subsection
+        return self._read_entry(offset + (obj_num - first) * XREF_ENTRY_SIZE)
+
+    def _find_subsection(self, obj_num: int) -> Optional[XrefSubsection]:
+        """
+        :return: the last subsection in file order that contains the obj
+        num, or None
+        """
+        i = bisect_right(self._firsts, obj_num)
+        # without overlaps, only the last subsection that starts before the
+        # obj num may contain it
+        candidates = self._subsections[:i] if self._overlapping else (
+            self._subsections[i - 1:i])
+        found = None
+        for subsection in candidates:
+            if (obj_num < subsection.first + subsection.count
+                    and (found is None or subsection.offset > found.offset)):
+                found = subsection
+        return found
+
+    def _read_entry(self, offset: int) -> XrefEntry:
+        data = self._read_at(offset, XREF_ENTRY_SIZE)
+        m = XREF_ENTRY_RE.fullmatch(data)
+        check(m is not None, "Malformed xref entry at offset {}: {}", offset,
+              data)
+        byte_offset, gen_number, kw = m.groups()
+        return XrefEntry(int(byte_offset), int(gen_number), kw)
+
+    def __contains__(self, obj_num) -> bool:
+        return (self._find_subsection(obj_num) is not None
+                or obj_num in self._entry_by_ref_num)
+
+    def __iter__(self) -> Iterator[int]:
+        seen = set()
+        for first, count, _ in self._subsections:
+            for obj_num in range(first, first + count):
+                if obj_num not in seen:
+                    seen.add(obj_num)
+                    yield obj_num
+        for obj_num in self._entry_by_ref_num:
+            if obj_num not in seen:
+                yield obj_num
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class XrefChain(Mapping[int, Any]):
+    """
+    The xref tables of a file with incremental updates (7.5.6), newest
+    first. The older sections are read only when an obj num is not found in
+    the newer ones.
+    """
+
+    def __init__(self, newest: Mapping[int, Any],
+                 pending: List[Tuple[int, bool]],
+                 load_section: Callable[[int, bool], Tuple[
+                     Mapping[int, Any], List[Tuple[int, bool]]]]):
+        """
+        :param newest: the newest xref table
+        :param pending: the (offset, follow) of the previous sections, in
+                        order.
+        :param load_section: a function (offset, follow) -> (xref table,
+                             pending sections). If follow is False, the
+                             previous sections of the section are ignored.
+        """
+        self._tables = [newest]
+        self._pending = list(pending)
+        self._load_section = load_section
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def _load_next(self, loaded_count: int) -> bool:
+        """
+        :param loaded_count: the number of tables seen by the caller
+        :return: False if there is no more section to load
+        """
+        with self._lock:
+            if len(self._tables) > loaded_count:  # loaded by another thread
+                return True
+            while self._pending:
+                offset, follow = self._pending.pop(0)
+                if offset in self._seen:  # a loop in the /Prev chain
+                    continue
+                self._seen.add(offset)
+                table, pending = self._load_section(offset, follow)
+                self._pending[0:0] = pending
+                self._tables.append(table)
+                return True
+            return False
+
+    def _load_all(self):
+        while self._load_next(len(self._tables)):
+            pass
+
+    @property
+    def loaded_count(self) -> int:
+        """the number of sections loaded"""
+        return len(self._tables)
+
+    def __getitem__(self, obj_num: int) -> Any:
+        i = 0
+        while True:
+            while i < len(self._tables):
+                table = self._tables[i]
+                if obj_num in table:
+                    return table[obj_num]
+                i += 1
+            if not self._load_next(i):
+                raise KeyError(obj_num)
+
+    def __contains__(self, obj_num: Any) -> bool:
+        try:
+            self[obj_num]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[int]:
+        self._load_all()
+        seen = set()
+        for table in self._tables:
+            for obj_num in table:
+                if obj_num not in seen:
+                    seen.add(obj_num)
+                    yield obj_num
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class ExtentIndex:
+    """
+    The byte extents of the objects: an object ends where the next object
+    (or the file) ends.
+    """
+
+    @staticmethod
+    def from_xref_table(xref_table: Mapping[int, Any], size: int
+                        ) -> "ExtentIndex":
+        """
+        :param xref_table: the xref table
+        :param size: the size of the file
+        :return: the extent index of the objects in use
+        """
+        offsets = {entry.byte_offset for entry in xref_table.values()
+                   if isinstance(entry, XrefEntry) and entry.kw == b"n"}
+        offsets.add(size)
+        return ExtentIndex(sorted(offsets))
+
+    def __init__(self, offsets: Sequence[int]):
+        """
+        :param offsets: the sorted offsets of the objects, and the size of
+                        the file
+        """
+        self.offsets = offsets
+
+    def end(self, byte_offset: int) -> int:
+        """
+        :param byte_offset: the offset of an object
+        :return: the offset of the next object, or the size of the file
+        """
+        i = bisect_right(self.offsets, byte_offset)
+        if i == len(self.offsets):
+            return self.offsets[-1]
+        return self.offsets[i]
+
+
+FORMAT_BY_WIDTH = {1: "B", 2: "H", 4: "I", 8: "Q"}
+
+
+def decode_xref_stream(data: bytes, widths: List[int],
+                       index: List[int]) -> XrefIndex:
+    """
+    7.5.8.3 Cross-Reference Stream Data
+
+    The rows are decoded in bulk by `struct.iter_unpack`: fields whose width
+    is not 1, 2, 4 or 8 are padded first, by a slice assignment per byte of
+    the field.
+
+    :param data: the decoded data of the stream
+    :param widths: the /W array
+    :param index: the /Index array
+    :return: the entries by obj num
+    """
+    row_size = sum(widths)
+    check(row_size > 0, "Xref stream: invalid /W {}", widths)
+    row_count = len(data) // row_size
+    fmt, padded = _pad_fields(data, widths, row_count)
+    rows = struct.iter_unpack(fmt, padded)
+    w1, w2, w3 = widths
+
+    entry_by_ref_num = XrefIndex(_dense_size(index))
+    set_entry = entry_by_ref_num.set_entry
+    for first, count in zip(index[::2], index[1::2]):
+        for obj_num, row in zip(range(first, first + count), rows):
+            if w1:
+                entry_type = row[0]
+                fields = row[1:]
+            else:  # 7.5.8.2: the default type is 1
+                entry_type = 1
+                fields = row
+            field2 = fields[0] if w2 else 0
+            field3 = fields[-1] if w3 else 0
+            if entry_type == 1:
+                set_entry(obj_num, IN_USE, field2, field3)
+            elif entry_type == 2:
+                set_entry(obj_num, COMPRESSED, field2, field3)
+            elif entry_type == 0:
+                set_entry(obj_num, FREE, field2, field3)
+            # other types: a reference to the null object
+    return entry_by_ref_num
+
+
+def _dense_size(index: List[int]) -> int:
+    """
+    :return: the size of the arrays of the index, 0 if the subsections are
+    too sparse.
+    """
+    end = max((first + count for first, count in zip(index[::2], index[1::2])),
+              default=0)
+    if 2 * sum(index[1::2]) >= end:
+        return end
+    return 0
+
+
+def _pad_fields(data: bytes, widths: List[int], row_count: int
+                ) -> Tuple[str, bytes]:
+    """
+    :return: a struct format and the data, where every field has a width of
+    1, 2, 4 or 8.
+    """
+    row_size = sum(widths)
+    data = data[:row_count * row_size]
+    padded_widths = []
+    for width in widths:
+        if width == 0:
+            continue
+        padded_width = min(w for w in (1, 2, 4, 8, 9) if w >= width)
+        check(padded_width <= 8, "Xref stream: field too wide {}", width)
+        padded_widths.append((width, padded_width))
+    fmt = ">" + "".join(FORMAT_BY_WIDTH[w] for _, w in padded_widths)
+    if all(width == padded_width for width, padded_width in padded_widths):
+        return fmt, data
+
+    padded_row_size = sum(w for _, w in padded_widths)
+    padded = bytearray(row_count * padded_row_size)
+    source = 0
+    dest = 0
+    for width, padded_width in padded_widths:
+        shift = padded_width - width  # big endian: pad on the left
+        for k in range(width):
+            padded[dest + shift + k::padded_row_size] = data[
+                                                        source + k::row_size]
+        source += width
+        dest += padded_width
+    return fmt, bytes(padded)
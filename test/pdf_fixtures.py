@@ -0,0 +1,161 @@
+"""Small in-memory PDF documents for the tests"""
+import zlib
+from typing import Dict, Sequence, Optional
+
+CONTENTS = b"BT /F1 12 Tf 72 712 Td (Hello) Tj (World) Tj ET"
+
+
+def build_pdf(objects: Dict[int, bytes], root: int = 1,
+              eol: bytes = b" \n") -> bytes:
+    """
+    Build a PDF file with a classic xref table.
+
+    :param objects: the body of each object, by obj num
+    :param root: the obj num of the catalog
+    :param eol: the end of line in the xref entries
+    :return: the bytes of the file
+    """
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for obj_num, body in sorted(objects.items()):
+        offsets[obj_num] = len(out)
+        out += b"%d 0 obj\n" % obj_num + body + b"\nendobj\n"
+    size = max(objects) + 1
+    start_xref = len(out)
+    out += b"xref\n0 %d\n" % size
+    out += b"0000000000 65535 f" + eol
+    for obj_num in range(1, size):
+        if obj_num in offsets:
+            out += b"%010d 00000 n" % offsets[obj_num] + eol
+        else:
+            out += b"0000000000 65535 f" + eol
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\n" % (size, root)
+    out += b"startxref\n%d\n%%%%EOF\n" % start_xref
+    return bytes(out)
+
+
+def append_update(pdf: bytes, objects: Dict[int, bytes], root: int = 1
+                  ) -> bytes:
+    """
+    Append an incremental update to a PDF file.
+
+    :param pdf: the file
+    :param objects: the new or modified objects
+    :param root: the obj num of the catalog
+    :return: the bytes of the updated file
+    """
+    prev = int(pdf.rsplit(b"startxref", 1)[1].split()[0])
+    size = int(pdf.rsplit(b"/Size", 1)[1].split()[0])
+    out = bytearray(pdf)
+    offsets = {}
+    for obj_num, body in sorted(objects.items()):
+        offsets[obj_num] = len(out)
+        out += b"%d 0 obj\n" % obj_num + body + b"\nendobj\n"
+    size = max(size, max(objects) + 1)
+    start_xref = len(out)
+    out += b"xref\n"
+    for obj_num, offset in sorted(offsets.items()):
+        out += b"%d 1\n%010d 00000 n \n" % (obj_num, offset)
+    out += b"trailer\n<< /Size %d /Root %d 0 R /Prev %d >>\n" % (
+        size, root, prev)
+    out += b"startxref\n%d\n%%%%EOF\n" % start_xref
+    return bytes(out)
+
+
+def build_xref_stream_pdf(objects: Dict[int, bytes], root: int = 1,
+                          widths: Sequence[int] = (1, 2, 1),
+                          predictor: bool = True,
+                          compressed: Optional[Dict[int, bytes]] = None
+                          ) -> bytes:
+    """
+    Build a PDF file with a cross-reference stream.
+
+    :param objects: the body of each object, by obj num
+    :param root: the obj num of the catalog
+    :param widths: the /W array
+    :param predictor: if True, use the PNG Up predictor
+    :param compressed: the body of the objects stored in an object stream
+    :return: the bytes of the file
+    """
+    out = bytearray(b"%PDF-1.5\n")
+    compressed = compressed or {}
+    entries = {}
+    for obj_num, body in sorted(objects.items()):
+        entries[obj_num] = (1, len(out), 0)
+        out += b"%d 0 obj\n" % obj_num + body + b"\nendobj\n"
+    all_obj_nums = list(objects) + list(compressed)
+    if compressed:
+        obj_stm_num = max(all_obj_nums) + 1
+        all_obj_nums.append(obj_stm_num)
+        entries[obj_stm_num] = (1, len(out), 0)
+        out += b"%d 0 obj\n" % obj_stm_num + obj_stm_body(compressed)
+        out += b"\nendobj\n"
+        for i, obj_num in enumerate(sorted(compressed)):
+            entries[obj_num] = (2, obj_stm_num, i)
+    xref_num = max(all_obj_nums) + 1
+    size = xref_num + 1
+    entries[xref_num] = (1, len(out), 0)
+    entries[0] = (0, 0, 0)
+    rows = []
+    for obj_num in range(size):
+        row = b"".join(value.to_bytes(width, "big")
+                       for value, width in zip(entries.get(obj_num, (0, 0, 0)),
+                                               widths) if width)
+        rows.append(row)
+    row_size = sum(widths)
+    if predictor:
+        prev = bytes(row_size)
+        data = b""
+        for row in rows:
+            data += b"\x02" + bytes((r - p) & 0xFF for r, p in zip(row, prev))
+            prev = row
+        parms = b"/DecodeParms << /Columns %d /Predictor 12 >>" % row_size
+    else:
+        data = b"".join(rows)
+        parms = b""
+    data = zlib.compress(data)
+    out += (b"%d 0 obj\n<< /Type /XRef /Size %d /Root %d 0 R /W [%s] "
+            b"/Filter /FlateDecode %s /Length %d >>\nstream\n" % (
+                xref_num, size, root, b" ".join(b"%d" % w for w in widths),
+                parms, len(data)))
+    start_xref = out.index(b"%d 0 obj" % xref_num)
+    out += data + b"\nendstream\nendobj\n"
+    out += b"startxref\n%d\n%%%%EOF\n" % start_xref
+    return bytes(out)
+
+
+def obj_stm_body(compressed: Dict[int, bytes]) -> bytes:
+    """7.5.7 Object Streams"""
+    header = b""
+    body = b""
+    for obj_num, obj in sorted(compressed.items()):
+        header += b"%d %d " % (obj_num, len(body))
+        body += obj + b"\n"
+    data = zlib.compress(header + body)
+    return (b"<< /Type /ObjStm /N %d /First %d /Length %d "
+            b"/Filter /FlateDecode >>\nstream\n" % (
+                len(compressed), len(header), len(data))
+            + data + b"\nendstream")
+
+
+def stream_body(data: bytes, compress: bool = True) -> bytes:
+    if compress:
+        data = zlib.compress(data)
+        return (b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(data)
+                + data + b"\nendstream")
+    return b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream"
+
+
+def hello_objects() -> Dict[int, bytes]:
+    return {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        3: b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792]\n"
+           b"/Resources << /Font << /F1 4 0 R >> >>\n/Contents 5 0 R >>",
+        4: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        5: stream_body(CONTENTS),
+    }
+
+
+def hello_pdf() -> bytes:
+    return build_pdf(hello_objects())
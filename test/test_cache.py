@@ -0,0 +1,77 @@
+import unittest
+
+from minimal_pdf_parser.cache import (ObjectCache, CacheStats, estimate_size,
+                                      LazyDictObject, StreamCache)
+
+
+class ObjectCacheTestCase(unittest.TestCase):
+    def test_unbounded(self):
+        cache = ObjectCache()
+        for i in range(100):
+            cache.put(i, str(i))
+        self.assertEqual("5", cache.get(5))
+        self.assertRaises(KeyError, cache.get, 100)
+        self.assertEqual(CacheStats(1, 1, 0, 100, 0), cache.stats)
+
+    def test_max_entries(self):
+        cache = ObjectCache(max_entries=2)
+        cache.put(1, "a")
+        cache.put(2, "b")
+        cache.get(1)
+        cache.put(3, "c")
+        self.assertIn(1, cache)
+        self.assertNotIn(2, cache)
+        self.assertIn(3, cache)
+        self.assertEqual(1, cache.stats.evictions)
+
+    def test_max_size(self):
+        cache = ObjectCache(max_size=10, size_of=len)
+        cache.put(1, "abcd")
+        cache.put(2, "efgh")
+        cache.put(3, "ijkl")
+        self.assertEqual([2, 3], [i for i in (1, 2, 3) if i in cache])
+        self.assertEqual(8, cache.stats.size)
+
+    def test_pin(self):
+        cache = ObjectCache(max_entries=1)
+        cache.pin(1)
+        cache.put(1, "root")
+        cache.put(2, "a")
+        cache.put(3, "b")
+        self.assertEqual("root", cache.get(1))
+        self.assertEqual(2, len(cache))
+        cache.unpin(1)
+        self.assertNotIn(3, cache)
+        self.assertIn(1, cache)
+
+    def test_estimate_size_lazy(self):
+        def parse_value(buf, start, end):
+            raise AssertionError("parsed")
+
+        obj = LazyDictObject(b"<< /A [1 2] >>", {b"/A": (6, 11)}, parse_value)
+        self.assertLess(0, estimate_size(obj))
+
+
+class StreamCacheTestCase(unittest.TestCase):
+    def test_budget(self):
+        cache = StreamCache(max_size=10)
+        self.assertEqual(2, cache.max_entry_size)
+        cache.put((1, 0), b"ab")
+        cache.put((2, 0), b"abc")  # too large
+        self.assertEqual(b"ab", cache.get((1, 0)))
+        self.assertNotIn((2, 0), cache)
+        for i in range(3, 10):
+            cache.put((i, 0), b"cd")
+        self.assertEqual(CacheStats(1, 0, 3, 5, 10), cache.stats)
+
+    def test_content_key(self):
+        key = StreamCache.content_key(b"raw", b"/FlateDecode null")
+        self.assertEqual(key, StreamCache.content_key(
+            b"raw", b"/FlateDecode null"))
+        self.assertNotEqual(key, StreamCache.content_key(b"raw", b"null null"))
+        self.assertNotEqual(key, StreamCache.content_key(
+            b"raw2", b"/FlateDecode null"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,251 @@
+import base64
+import random
+import unittest
+import zlib
+
+from minimal_pdf_parser import filters
+from minimal_pdf_parser.filters import (png_predictor_decode, decode_data,
+                                        decode_chunks, tiff_predictor_decode,
+                                        get_filters)
+from minimal_pdf_parser.parser import ObjectParser
+from minimal_pdf_parser.lexer import TableLexer
+
+
+class FiltersTestCase(unittest.TestCase):
+    def test_png_predictors(self):
+        data = bytes([
+            0, 1, 2, 3, 4,
+            1, 1, 1, 1, 1,  # Sub
+            2, 1, 1, 1, 1,  # Up
+            3, 2, 2, 2, 2,  # Average
+            4, 0, 0, 0, 0,  # Paeth
+        ])
+        self.assertEqual(bytes([
+            1, 2, 3, 4,
+            1, 2, 3, 4,
+            2, 3, 4, 5,
+            3, 5, 6, 7,
+            3, 5, 6, 7,
+        ]), png_predictor_decode(data, 4))
+
+    def test_png_predictor_bpp(self):
+        data = bytes([1, 1, 2, 1, 1])
+        self.assertEqual(bytes([1, 2, 2, 3]),
+                         png_predictor_decode(data, 2, colors=2))
+
+    def test_decode_data(self):
+        self.assertEqual(b"foo", decode_data(zlib.compress(b"foo"),
+                                             [(b"/FlateDecode", None)]))
+
+    def test_get_filters(self):
+        stream_dict = ObjectParser(TableLexer(
+            b"<< /Filter [/ASCIIHexDecode /FlateDecode /LZWDecode] "
+            b"/DecodeParms [null 7 0 R] >>")).parse()
+        parms = ObjectParser(TableLexer(b"<< /Predictor 12 >>")).parse()
+
+        def resolve(obj):
+            return parms if type(obj).__name__ == "IndirectRef" else obj
+
+        self.assertEqual([(b"/ASCIIHexDecode", None), (b"/FlateDecode", parms),
+                          (b"/LZWDecode", None)],
+                         get_filters(stream_dict, resolve))
+        stream_dict = ObjectParser(TableLexer(
+            b"<< /Filter /FlateDecode /DecodeParms 7 0 R >>")).parse()
+        self.assertEqual([(b"/FlateDecode", parms)],
+                         get_filters(stream_dict, resolve))
+
+    def test_decode_chunks(self):
+        data = bytes(range(256)) * 8 + b"\x00" * 100
+        run_length = b"".join(
+            b"\x7f" + data[i:i + 128] for i in range(0, 2048, 128)
+        ) + b"\x9d\x00\x80junk"
+        for filters, encoded in [
+            ([], data),
+            ([(b"/FlateDecode", None)], zlib.compress(data)),
+            ([(b"/ASCIIHexDecode", None)], data.hex().encode() + b" \n>"),
+            ([(b"/AHx", None)], data.hex().encode()),
+            ([(b"/ASCII85Decode", None)],
+             base64.a85encode(data, foldspaces=False, wrapcol=64) + b"~>"),
+            ([(b"/RunLengthDecode", None)], run_length),
+            ([(b"/ASCII85Decode", None), (b"/FlateDecode", None)],
+             base64.a85encode(zlib.compress(data)) + b"~>"),
+        ]:
+            self.assertEqual(data, decode_data(encoded, filters))
+            for size in (1, 3, 1000):
+                chunks = [encoded[i:i + size]
+                          for i in range(0, len(encoded), size)]
+                self.assertEqual(data, b"".join(decode_chunks(chunks,
+                                                              filters)))
+
+    def test_ascii85_zeros(self):
+        self.assertEqual(b"\x00" * 8 + b"Man",
+                         decode_data(b"zz9jqo~>", [(b"/ASCII85Decode", None)]))
+
+    def test_lzw(self):
+        # 7.4.4.2 Details of LZW Encoding
+        encoded = bytes([0x80, 0x0B, 0x60, 0x50, 0x22, 0x0C, 0x0C, 0x85, 0x01])
+        self.assertEqual(b"-----A---B",
+                         decode_data(encoded, [(b"/LZWDecode", None)]))
+
+    def test_lzw_code_sizes(self):
+        # about 4000 codes: up to 12 bits
+        rand = random.Random(1)
+        data = bytes(rand.randrange(64) for _ in range(5000))
+        for early_change in (0, 1):
+            encoded = _lzw_encode(data, early_change)
+            parms = ObjectParser(TableLexer(
+                b"<< /EarlyChange %d >>" % early_change)).parse()
+            chunks = [encoded[i:i + 5] for i in range(0, len(encoded), 5)]
+            self.assertEqual(data, b"".join(decode_chunks(
+                chunks, [(b"/LZWDecode", parms)])))
+
+    def test_predictor_chunks(self):
+        data = bytes([2, 1, 1, 1, 1]) * 10
+        parms = ObjectParser(TableLexer(
+            b"<< /Predictor 12 /Columns 4 >>")).parse()
+        encoded = zlib.compress(data)
+        chunks = [encoded[i:i + 3] for i in range(0, len(encoded), 3)]
+        self.assertEqual(png_predictor_decode(data, 4), b"".join(
+            decode_chunks(chunks, [(b"/FlateDecode", parms)])))
+
+    def test_row_operations(self):
+        rnd = random.Random(2)
+        for size in (1, 3, 8, 17, 100):
+            a = bytes(rnd.randrange(256) for _ in range(size))
+            b = bytes(rnd.randrange(256) for _ in range(size))
+            self.assertEqual(bytes((x + y) & 0xFF for x, y in zip(a, b)),
+                             filters._add_bytes_int(a, b))
+            for bpp in (1, 2, 3, 4):
+                expected = bytearray(a)
+                for j in range(bpp, size):
+                    expected[j] = (expected[j] + expected[j - bpp]) & 0xFF
+                self.assertEqual(bytes(expected),
+                                 filters._sub_decode_int(a, bpp))
+
+    @unittest.skipUnless(filters.numpy, "NumPy is not installed")
+    def test_row_operations_numpy(self):
+        rnd = random.Random(3)
+        a = bytes(rnd.randrange(256) for _ in range(96))
+        b = bytes(rnd.randrange(256) for _ in range(96))
+        self.assertEqual(filters._add_bytes_int(a, b),
+                         filters._add_bytes_numpy(a, b))
+        for bpp in (1, 3, 4):
+            self.assertEqual(filters._sub_decode_int(a, bpp),
+                             filters._sub_decode_numpy(a, bpp))
+
+    def test_sub_decode_16(self):
+        row = bytes([0x01, 0x00, 0x00, 0xFF, 0xFF, 0x02, 0x00, 0x01])
+        expected = bytes([0x01, 0x00, 0x01, 0xFF, 0x01, 0x01, 0x01, 0x02])
+        self.assertEqual(expected, filters._sub_decode_16_array(row, 1))
+        self.assertEqual(bytes([0x01, 0x00, 0x00, 0xFF, 0x00, 0x02, 0x01,
+                                0x00]), filters._sub_decode_16_array(row, 2))
+
+    @unittest.skipUnless(filters.numpy, "NumPy is not installed")
+    def test_sub_decode_16_numpy(self):
+        rnd = random.Random(5)
+        row = bytes(rnd.randrange(256) for _ in range(96))
+        for colors in (1, 2, 3):
+            self.assertEqual(filters._sub_decode_16_array(row, colors),
+                             filters._sub_decode_16_numpy(row, colors))
+
+    def test_png_predictors_all_types(self):
+        rnd = random.Random(4)
+        data = b"".join(bytes([t]) + bytes(rnd.randrange(256)
+                                           for _ in range(12))
+                        for t in (0, 1, 2, 3, 4) * 3)
+        self.assertEqual(_naive_png_decode(data, 12, 3),
+                         png_predictor_decode(data, 4, colors=3))
+
+    def test_tiff_predictor(self):
+        data = bytes([10, 20, 1, 2, 1, 2, 5, 5, 1, 1, 255, 255])
+        self.assertEqual(bytes([10, 20, 11, 22, 12, 24, 5, 5, 6, 6, 5, 5]),
+                         tiff_predictor_decode(data, 3, colors=2))
+        data = bytes([0x01, 0x00, 0x00, 0xFF, 0xFF, 0x02])
+        self.assertEqual(bytes([0x01, 0x00, 0x01, 0xFF, 0x01, 0x01]),
+                         tiff_predictor_decode(data, 3, bits_per_component=16))
+        with self.assertRaises(NotImplementedError):
+            tiff_predictor_decode(b"\x00", 2, bits_per_component=4)
+
+    def test_predictor_truncated_row(self):
+        data = bytes([2, 1, 1, 1, 1]) * 2 + bytes([2, 1, 1])
+        parms = ObjectParser(TableLexer(
+            b"<< /Predictor 12 /Columns 4 >>")).parse()
+        with self.assertLogs(level="WARNING"):
+            self.assertEqual(bytes([1, 1, 1, 1, 2, 2, 2, 2, 3, 3]),
+                             decode_data(zlib.compress(data),
+                                         [(b"/FlateDecode", parms)]))
+        parms = ObjectParser(TableLexer(
+            b"<< /Predictor 2 /Columns 4 >>")).parse()
+        with self.assertLogs(level="WARNING"):
+            self.assertEqual(bytes([1, 2, 3, 4, 1, 2]), decode_data(
+                zlib.compress(bytes([1, 1, 1, 1, 1, 1])),
+                [(b"/FlateDecode", parms)]))
+
+    def test_tiff_predictor_chunks(self):
+        data = bytes(range(30))
+        parms = ObjectParser(TableLexer(
+            b"<< /Predictor 2 /Columns 5 /Colors 1 >>")).parse()
+        encoded = zlib.compress(data)
+        chunks = [encoded[i:i + 4] for i in range(0, len(encoded), 4)]
+        self.assertEqual(tiff_predictor_decode(data, 5), b"".join(
+            decode_chunks(chunks, [(b"/FlateDecode", parms)])))
+
+    def test_image_pass_through(self):
+        self.assertEqual(b"jpeg", decode_data(
+            b"jpeg", [(b"/DCTDecode", None), (b"/FlateDecode", None)]))
+        with self.assertRaises(NotImplementedError):
+            decode_data(b"", [(b"/Unknown", None)])
+
+
+def _naive_png_decode(data: bytes, row_size: int, bpp: int) -> bytes:
+    prev = bytes(row_size)
+    ret = b""
+    for i in range(0, len(data), row_size + 1):
+        predictor = data[i]
+        row = bytearray(data[i + 1:i + 1 + row_size])
+        for j in range(row_size):
+            a = row[j - bpp] if j >= bpp else 0
+            b = prev[j]
+            c = prev[j - bpp] if j >= bpp else 0
+            if predictor == 1:
+                row[j] = (row[j] + a) & 0xFF
+            elif predictor == 2:
+                row[j] = (row[j] + b) & 0xFF
+            elif predictor == 3:
+                row[j] = (row[j] + ((a + b) >> 1)) & 0xFF
+            elif predictor == 4:
+                p = a + b - c
+                pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+                pred = a if pa <= pb and pa <= pc else b if pb <= pc else c
+                row[j] = (row[j] + pred) & 0xFF
+        ret += row
+        prev = bytes(row)
+    return ret
+
+
+def _lzw_encode(data: bytes, early_change: int) -> bytes:
+    table = {bytes((i,)): i for i in range(256)}
+    next_code = 258
+    code_size = 9
+    codes = [(256, 9)]
+    w = b""
+    for i in range(len(data)):
+        wc = data[i:i + 1] if not w else w + data[i:i + 1]
+        if wc in table:
+            w = wc
+            continue
+        codes.append((table[w], code_size))
+        table[wc] = next_code
+        next_code += 1
+        if next_code + early_change > 1 << code_size and code_size < 12:
+            code_size += 1
+        w = data[i:i + 1]
+    codes.append((table[w], code_size))
+    codes.append((257, code_size))
+    bits = "".join(format(code, "0{}b".format(size)) for code, size in codes)
+    bits += "0" * (-len(bits) % 8)
+    return int(bits, 2).to_bytes(len(bits) // 8, "big")
+
+
+if __name__ == "__main__":
+    unittest.main()
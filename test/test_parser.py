@@ -1,14 +1,27 @@
 import io
 import logging
+import zlib
+import tempfile
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from unittest import mock
 
-from minimal_pdf_parser.parser import PDFParser, ObjectParser, FontParser
-from minimal_pdf_parser.tokenizer import PDFTokenizer, BinaryStreamWrapper
+from minimal_pdf_parser.buffer_stream import BufferStream, PreadStream
+from minimal_pdf_parser.cache import ObjectCache, StreamCache
+from minimal_pdf_parser.lexer import TableLexer
+from minimal_pdf_parser.parser import (PDFParser, ObjectParser, FontParser,
+                                       MAX_EXTENT_READ_SIZE,
+                                       DeflateStreamWrapper,
+                                       FIRST_STREAM_CHUNK_SIZE)
+from minimal_pdf_parser.tokenizer import (PDFTokenizer, BinaryStreamWrapper,
+                                          BufferedBinaryStreamWrapper,
+                                          LineReader)
 from minimal_pdf_parser.base import (NameObject, ArrayObject, DictObject,
                                      IndirectRef, NumberObject)
 from pdf_encodings import ENCODING_BY_NAME, UNICODE_BY_GLYPH_NAME
+from pdf_fixtures import (hello_pdf, build_pdf, hello_objects, append_update,
+                          stream_body, build_xref_stream_pdf, CONTENTS)
 
 FIXTURE_PATH = Path(__file__).parent.parent / "fixture"
 
@@ -100,6 +113,505 @@ class TestCase(unittest.TestCase):
         bsw.unget()
         self.assertEqual(122, next(bsw))
 
+    def test_buffered_stream_wrapper(self):
+        s = io.BytesIO(b"foo bar baz")
+        bsw = BufferedBinaryStreamWrapper(s, 4)
+        self.assertEqual(b"foo ", bytes(next(bsw) for _ in range(4)))
+        bsw.unget()
+        self.assertEqual(32, next(bsw))
+        self.assertEqual(98, next(bsw))
+        bsw.sync()
+        self.assertEqual(5, s.tell())
+        self.assertEqual(b"ar baz", bytes(bsw))
+        with self.assertRaises(StopIteration):
+            next(bsw)
+        bsw.sync()
+        self.assertEqual(11, s.tell())
+
+    def test_stream_window(self):
+        for length in (0, 1, 40, 80, 4096, 5000):
+            data = bytes(range(256)) * (length // 256) + b"x" * (length % 256)
+            objects = hello_objects()
+            objects[6] = stream_body(data, compress=False)
+            document = PDFParser(io.BytesIO(build_pdf(objects))).parse()
+            stream_obj = document._get_object_by_num(6)
+            chunks = list(document.parser.stream_window(stream_obj, None))
+            self.assertEqual(data, b"".join(chunks))
+            self.assertLessEqual(len(chunks), 1)  # a small stream
+            chunks = list(document.parser.stream_window(stream_obj, None, 40))
+            self.assertEqual(data, b"".join(chunks))
+            self.assertEqual([40] * (length // 40) + (
+                [length % 40] if length % 40 else []), list(map(len, chunks)))
+
+    def test_stream_window_growth(self):
+        data = b"x" * (FIRST_STREAM_CHUNK_SIZE * 8)
+        objects = hello_objects()
+        objects[6] = stream_body(data, compress=False)
+        document = PDFParser(io.BytesIO(build_pdf(objects))).parse()
+        parser = document.parser
+        parser.stream_chunk_size = FIRST_STREAM_CHUNK_SIZE * 4
+        chunks = list(parser.stream_window(document._get_object_by_num(6),
+                                           None))
+        self.assertEqual(data, b"".join(chunks))
+        self.assertEqual([1, 2, 4, 1], [len(c) // FIRST_STREAM_CHUNK_SIZE
+                                        for c in chunks])
+
+    def test_deflate_stream_wrapper(self):
+        data = CONTENTS * 100
+        compressed = zlib.compress(data)
+        window = [compressed[i:i + 7] for i in range(0, len(compressed), 7)]
+        dsw = DeflateStreamWrapper(window)
+        self.assertEqual(data[:3], bytes(next(dsw) for _ in range(3)))
+        dsw.unget()
+        chunks = list(dsw.chunks())
+        self.assertLess(1, len(chunks))
+        self.assertEqual(data[2:], b"".join(chunks))
+        self.assertEqual(b"", DeflateStreamWrapper(window[:0]).read_all())
+
+    def test_read_object_position(self):
+        s = io.BytesIO(b"<< /Length 10 >>\nstream\n")
+        parser = PDFParser(s, block_size=8)
+        self.assertEqual(10, parser.read_dict()[b"/Length"].value)
+        self.assertEqual(16, parser.tell())
+        self.assertEqual(b"", parser.readline())
+        self.assertEqual(b"stream", parser.readline())
+
+    def test_extract_text(self):
+        for block_size in (1, 7, 64 * 1024):
+            parser = PDFParser(io.BytesIO(hello_pdf()), block_size)
+            document = parser.parse()
+            self.assertEqual(["Hello", "World"], list(document.extract_text()))
+
+    def test_line_reader(self):
+        s = io.BytesIO(b"a\rb\r\nc\nd\r\r\ne")
+        reader = LineReader(s, 2)
+        self.assertEqual([b"a", b"b", b"c", b"d", b""],
+                         [reader.readline() for _ in range(5)])
+        reader.sync()
+        self.assertEqual(11, s.tell())
+        self.assertEqual(b"e", reader.readline())
+        self.assertEqual(b"", reader.readline())
+
+    def test_readline(self):
+        parser = PDFParser(io.BytesIO(b"a\rb\r\nc"))
+        self.assertEqual(b"a", parser.readline())
+        self.assertEqual(2, parser.tell())
+        self.assertEqual(b"b", parser.readline())
+        self.assertEqual(5, parser.tell())
+        self.assertEqual(b"c", parser.readline())
+
+    def test_xref_table_eol(self):
+        # b"\n" is not a valid EOL: the entries are 19 bytes long
+        for eol in [b" \n", b"\r\n", b" \r", b"\n"]:
+            data = build_pdf(hello_objects(), eol=eol)
+            for parser in [PDFParser(io.BytesIO(data)),
+                           PDFParser.from_buffer(data)]:
+                document = parser.parse()
+                self.assertEqual(list(range(6)),
+                                 sorted(document.xref_table))
+                self.assertEqual(b"n", document.xref_table[5].kw)
+                self.assertEqual(["Hello", "World"],
+                                 list(document.extract_text()))
+
+    def test_lazy_xref_table(self):
+        for eol in [b" \n", b"\n"]:
+            data = build_pdf(hello_objects(), eol=eol)
+            document = PDFParser(io.BytesIO(data), lazy_xref=True).parse()
+            self.assertEqual(list(range(6)), sorted(document.xref_table))
+            self.assertEqual(data.index(b"3 0 obj"),
+                             document.xref_table[3].byte_offset)
+            self.assertNotIn(6, document.xref_table)
+            self.assertEqual(["Hello", "World"],
+                             list(document.extract_text()))
+
+    def test_overlapping_xref_subsections(self):
+        data = build_pdf(hello_objects())
+        head, tail = data.split(b"\nxref\n")
+        table, trailer = tail.split(b"trailer\n")
+        entries = table.split(b"\n", 1)[1]
+        good = entries[60:80]
+        bad = entries[80:100]  # the offset of the object 4
+        for eol in [b" \n", b"\n"]:
+            for xref in [
+                b"3 1\n" + bad[:-2] + eol + b"0 6\n" + entries,
+                b"0 6\n" + entries[:60] + bad + entries[80:]
+                + b"3 1\n" + good[:-2] + eol,
+            ]:
+                pdf = head + b"\nxref\n" + xref + b"trailer\n" + trailer
+                for lazy_xref in [False, True]:
+                    document = PDFParser(io.BytesIO(pdf),
+                                         lazy_xref=lazy_xref).parse()
+                    self.assertEqual(data.index(b"3 0 obj"),
+                                     document.xref_table[3].byte_offset)
+                    self.assertEqual(["Hello", "World"],
+                                     list(document.extract_text()))
+
+    def test_lazy_xref_table_on_demand(self):
+        data = bytearray(build_pdf(hello_objects()))
+        document = PDFParser.from_buffer(data, lazy_xref=True).parse()
+        # the entries are read when needed
+        entry_offset = data.index(b"xref\n0 6\n") + 9 + 4 * 20
+        data[entry_offset:entry_offset + 10] = b"0000000042"
+        self.assertEqual(42, document.xref_table[4].byte_offset)
+
+    def test_incremental_update(self):
+        objects = hello_objects()
+        objects[5] = stream_body(b"BT /F1 12 Tf (Bye) Tj ET")
+        data = append_update(hello_pdf(), {5: objects[5]})
+        for lazy_xref in (False, True):
+            document = PDFParser(io.BytesIO(data), lazy_xref=lazy_xref).parse()
+            self.assertEqual(["Bye"], list(document.extract_text()))
+
+    def test_xref_stream(self):
+        for widths in [(1, 2, 1), (1, 3, 1), (0, 4, 2)]:
+            for predictor in [True, False]:
+                data = build_xref_stream_pdf(hello_objects(), widths=widths,
+                                             predictor=predictor)
+                for parser in [PDFParser(io.BytesIO(data)),
+                               PDFParser.from_buffer(data, lazy_xref=True)]:
+                    document = parser.parse()
+                    self.assertEqual(data.index(b"\n4 0 obj") + 1,
+                                     document.xref_table[4].byte_offset)
+                    self.assertEqual(["Hello", "World"],
+                                     list(document.extract_text()))
+
+    def test_free_entries(self):
+        objects = hello_objects()
+        objects[7] = b"<< /Producer (test) >>"  # 6 is free
+        for data in [build_pdf(objects), build_xref_stream_pdf(objects)]:
+            for parser in [PDFParser(io.BytesIO(data)),
+                           PDFParser.from_buffer(data, lazy_xref=True)]:
+                document = parser.parse()
+                self.assertEqual(b"f", document.xref_table[6].kw)
+                ref = list(ObjectParser(TableLexer(b"[6 0 R]")).parse())[0]
+                for obj in [document.get_object(ref),
+                            document.get_objects([ref])[0]]:
+                    self.assertEqual("NullObject", obj.__name__)
+                self.assertEqual(["Hello", "World"],
+                                 list(document.extract_text()))
+
+    def test_xref_stream_update(self):
+        objects = hello_objects()
+        data = append_update(build_xref_stream_pdf(objects),
+                             {5: stream_body(b"BT /F1 12 Tf (Bye) Tj ET")})
+        document = PDFParser(io.BytesIO(data)).parse()
+        self.assertEqual(["Bye"], list(document.extract_text()))
+
+    def test_object_stream(self):
+        objects = hello_objects()
+        compressed = {obj_num: objects.pop(obj_num) for obj_num in (1, 2, 3, 4)}
+        data = build_xref_stream_pdf(objects, compressed=compressed)
+        for parser in [PDFParser(io.BytesIO(data)),
+                       PDFParser.from_buffer(data, lazy_xref=True)]:
+            document = parser.parse()
+            self.assertEqual(["Hello", "World"], list(document.extract_text()))
+            self.assertEqual(1, len(document._object_stream_by_num))
+            self.assertEqual((6, 3), tuple(document.xref_table[4]))
+
+    def test_object_stream_cache_size(self):
+        objects = hello_objects()
+        compressed = {obj_num: objects.pop(obj_num) for obj_num in (1, 2, 3, 4)}
+        data = build_xref_stream_pdf(objects, compressed=compressed)
+        document = PDFParser(io.BytesIO(data)).parse()
+        document.object_stream_cache_size = 0
+        self.assertEqual(["Hello", "World"], list(document.extract_text()))
+        self.assertEqual(0, len(document._object_stream_by_num))
+
+    def test_object_cache(self):
+        objects = hello_objects()
+        objects[6] = stream_body(b"BT /F1 12 Tf (Again) Tj ET")
+        objects[7] = objects[3].replace(b"5 0 R", b"6 0 R")
+        objects[2] = b"<< /Type /Pages /Kids [3 0 R 7 0 R] /Count 2 >>"
+        cache = ObjectCache(max_entries=1)
+        document = PDFParser(io.BytesIO(build_pdf(objects))).parse(cache)
+        self.assertEqual(["Again", "Hello", "World"],
+                         sorted(document.extract_text()))
+        # the catalog, the pages and the font are pinned
+        for obj_num in (1, 2, 4):
+            self.assertIn(obj_num, cache)
+        self.assertEqual(4, len(cache))
+        self.assertGreater(cache.stats.evictions, 0)
+        self.assertGreater(cache.stats.hits, 0)
+
+    def test_stream_cache(self):
+        document = PDFParser(io.BytesIO(hello_pdf())).parse()
+        for _ in range(2):
+            self.assertEqual(CONTENTS, b"".join(
+                document.get_stream(document._get_object_by_num(5)).chunks()))
+        stats = document.stream_cache.stats
+        self.assertEqual((1, 1, 1), (stats.hits, stats.misses, stats.entries))
+        self.assertEqual(len(CONTENTS), stats.size)
+
+    def test_shared_stream_cache(self):
+        cache = StreamCache(content_addressed=True)
+        objects = hello_objects()
+        objects[6] = b"<< /Producer (test) >>"
+        for data in (hello_pdf(), build_pdf(objects)):
+            document = PDFParser(io.BytesIO(data)).parse(stream_cache=cache)
+            self.assertEqual(["Hello", "World"], list(document.extract_text()))
+        self.assertEqual((1, 1, 1), cache.stats[:2] + (len(cache),))
+
+    def test_stream_cache_partial_read(self):
+        document = PDFParser(io.BytesIO(hello_pdf())).parse(
+            stream_cache=StreamCache(max_size=None))
+        next(document.get_stream(document._get_object_by_num(5)))
+        self.assertEqual(0, len(document.stream_cache))
+
+    def test_extent_index(self):
+        data = hello_pdf()
+        for max_size in (MAX_EXTENT_READ_SIZE, 64, 16):
+            with mock.patch("minimal_pdf_parser.parser.MAX_EXTENT_READ_SIZE",
+                            max_size):
+                stream = io.BytesIO(data)
+                document = PDFParser(stream).parse()
+                with mock.patch.object(stream, "read",
+                                       wraps=stream.read) as read:
+                    obj = document._get_object_by_num(5)
+                    if max_size > 16:
+                        self.assertEqual(1 if max_size > 100 else 2,
+                                         read.call_count)
+                self.assertEqual(data.index(b"x\x9c"), obj.start)
+                self.assertEqual(["Hello", "World"],
+                                 list(document.extract_text()))
+
+    def test_extent_index_bad_length(self):
+        objects = hello_objects()
+        objects[5] = objects[5].replace(b"/Length", b"/Length 1000 /L")
+        document = PDFParser(io.BytesIO(build_pdf(objects))).parse()
+        with self.assertLogs(level=logging.WARNING):
+            self.assertRaises(Exception, document._get_object_by_num, 5)
+
+    def test_get_objects(self):
+        objects = hello_objects()
+        kids = range(10, 60)
+        for obj_num in kids:
+            objects[obj_num] = objects[3]
+        objects[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            b" ".join(b"%d 0 R" % obj_num for obj_num in reversed(kids)),
+            len(kids))
+        stream = io.BytesIO(build_pdf(objects))
+        document = PDFParser(stream).parse()
+        pages = document.get_object(document.get_root_object()[b"/Pages"])
+        refs = list(pages[b"/Kids"])
+        with mock.patch.object(stream, "read", wraps=stream.read) as read:
+            pages = document.get_objects(refs + [NumberObject(b"1")])
+            self.assertEqual(1, read.call_count)
+        self.assertEqual([b"/Page"] * len(kids),
+                         [page[b"/Type"].bs for page in pages[:-1]])
+        self.assertEqual(1, pages[-1].value)
+        self.assertEqual(list(reversed(kids)), document.get_page_obj_nums())
+
+    def test_lazy_prev_chain(self):
+        data = hello_pdf()
+        for i in range(20):
+            data = append_update(data, {6 + i: b"<< /N %d >>" % i})
+        data = append_update(data, {5: stream_body(b"BT (Bye) Tj ET")})
+        document = PDFParser(io.BytesIO(data), lazy_xref=True).parse()
+        self.assertEqual(1, document.xref_table.loaded_count)
+        self.assertEqual(b"BT (Bye) Tj ET",
+                         document.get_stream(
+                             document._get_object_by_num(5)).read_all())
+        self.assertEqual(1, document.xref_table.loaded_count)
+        self.assertEqual(19, document._get_object_by_num(25).object[
+            b"/N"].value)
+        self.assertEqual(2, document.xref_table.loaded_count)
+        self.assertEqual(["Bye"], list(document.extract_text()))
+        self.assertEqual(list(range(26)), sorted(document.xref_table))
+
+    def test_indirect_length(self):
+        objects = hello_objects()
+        objects[5] = stream_body(CONTENTS).replace(
+            b"/Length %d" % len(zlib.compress(CONTENTS)), b"/Length 6 0 R")
+        objects[6] = b"%d" % len(zlib.compress(CONTENTS))
+        data = build_pdf(objects)
+        for parser in [PDFParser(io.BytesIO(data)),
+                       PDFParser(io.BytesIO(data), lazy_xref=True),
+                       PDFParser.from_buffer(data)]:
+            document = parser.parse()
+            stream_obj = document._get_object_by_num(5)
+            self.assertFalse(stream_obj.length_resolved)
+            self.assertEqual(len(zlib.compress(CONTENTS)), stream_obj.length)
+            self.assertEqual(["Hello", "World"], list(document.extract_text()))
+
+    def test_missing_indirect_length(self):
+        for eol in (b"\n", b"\r\n"):
+            objects = hello_objects()
+            objects[5] = (b"<< /Length 99 0 R >>\nstream\n" + CONTENTS + eol
+                          + b"endstream")
+            data = build_pdf(objects)
+            for parser in [PDFParser(io.BytesIO(data)),
+                           PDFParser(io.BytesIO(data), lazy_xref=True)]:
+                document = parser.parse()
+                with self.assertLogs(level=logging.WARNING):
+                    self.assertEqual(len(CONTENTS),
+                                     document._get_object_by_num(5).length)
+
+    def test_batched_indirect_lengths(self):
+        objects = hello_objects()
+        for obj_num in range(10, 20):
+            objects[obj_num] = (b"<< /Length %d 0 R >>\nstream\nabc\n"
+                                b"endstream" % (obj_num + 10))
+            objects[obj_num + 10] = b"3"
+        objects[30] = b"[%s]" % b" ".join(b"%d 0 R" % obj_num
+                                          for obj_num in range(10, 20))
+        stream = io.BytesIO(build_pdf(objects))
+        document = PDFParser(stream).parse()
+        refs = list(document._get_object_by_num(30).object)
+        with mock.patch.object(stream, "read", wraps=stream.read) as read:
+            stream_objs = document.get_objects(refs)
+            # the streams, then the lengths
+            self.assertEqual(2, read.call_count)
+            self.assertEqual([3] * 10, [document._get_object_by_num(
+                obj_num).length for obj_num in range(10, 20)])
+            self.assertEqual(2, read.call_count)
+        self.assertEqual(10, len(stream_objs))
+
+    def test_lazy_objects(self):
+        objects = hello_objects()
+        annots = b" ".join(b"<< /Rect [0 0 1 1] /T (a\\)) >>"
+                           for _ in range(100))
+        objects[3] = objects[3].replace(
+            b"/Contents", b"/Annots [%s]\n/Contents" % annots)
+        data = build_pdf(objects)
+        eager = PDFParser.from_buffer(data).parse()
+        for engine in ("state", "table"):
+            document = PDFParser.from_buffer(data, engine=engine,
+                                             lazy_objects=True).parse()
+            self.assertEqual(["Hello", "World"], list(document.extract_text()))
+            page = document._get_object_by_num(3).object
+            self.assertEqual("LazyDictObject", type(page).__name__)
+            self.assertNotIn(b"/Annots", page._values)
+            self.assertEqual(repr(eager._get_object_by_num(3)),
+                             repr(document._get_object_by_num(3)))
+
+    def test_lazy_objects_in_extent(self):
+        with tempfile.TemporaryFile() as f:
+            f.write(hello_pdf())
+            f.flush()
+            document = PDFParser.from_pread(f, lazy_objects=True).parse()
+            self.assertEqual(["Hello", "World"], list(document.extract_text()))
+            self.assertEqual("LazyDictObject", type(
+                document._get_object_by_num(3).object).__name__)
+
+    def test_indirect_ref_values(self):
+        for lazy_objects in (False, True):
+            document = PDFParser.from_buffer(
+                hello_pdf(), lazy_objects=lazy_objects).parse()
+            parent = document._get_object_by_num(3).object[b"/Parent"]
+            self.assertEqual((2, 0), (parent.obj_num, parent.gen_num))
+            self.assertEqual(int, type(parent.obj_num))
+            self.assertFalse(hasattr(parent, "__dict__"))
+
+    def test_extract_text_filters(self):
+        hex_data = CONTENTS.hex().encode() + b">"
+        for body in [
+            stream_body(CONTENTS, compress=False),
+            b"<< /Length %d /Filter [/ASCIIHexDecode] >>\nstream\n%s\n"
+            b"endstream" % (len(hex_data), hex_data),
+        ]:
+            objects = hello_objects()
+            objects[5] = body
+            for engine in ("state", "table"):
+                document = PDFParser(io.BytesIO(build_pdf(objects)),
+                                     engine=engine).parse()
+                self.assertEqual(["Hello", "World"],
+                                 list(document.extract_text()))
+
+    def test_indirect_decode_parms(self):
+        data = zlib.compress(b"\x00" + CONTENTS)
+        hex_data = data.hex().encode() + b">"
+        for body in [
+            b"<< /Length %d /Filter /FlateDecode /DecodeParms 6 0 R >>\n"
+            b"stream\n%s\nendstream" % (len(data), data),
+            b"<< /Length %d /Filter [/ASCIIHexDecode /FlateDecode] "
+            b"/DecodeParms [null 6 0 R] >>\nstream\n%s\nendstream" % (
+                len(hex_data), hex_data),
+        ]:
+            objects = hello_objects()
+            objects[5] = body
+            objects[6] = b"<< /Predictor 10 /Columns %d >>" % len(CONTENTS)
+            document = PDFParser(io.BytesIO(build_pdf(objects))).parse()
+            self.assertEqual(["Hello", "World"], list(document.extract_text()))
+
+    def test_obj_on_the_same_line(self):
+        parser = PDFParser(io.BytesIO(b"12 0 obj<< /A 1 >>\nendobj"))
+        self.assertEqual((b"12", b"0"), parser.read_obj_line())
+        self.assertEqual(1, parser.read_dict()[b"/A"].value)
+
+    def test_extract_text_table_engine(self):
+        for parser in [
+            PDFParser(io.BytesIO(hello_pdf()), engine="table"),
+            PDFParser(io.BytesIO(hello_pdf()), block_size=16, engine="table"),
+            PDFParser.from_buffer(hello_pdf(), engine="table"),
+        ]:
+            document = parser.parse()
+            self.assertEqual(["Hello", "World"], list(document.extract_text()))
+
+    def test_extract_text_buffer(self):
+        for buf in (hello_pdf(), bytearray(hello_pdf()),
+                    memoryview(hello_pdf())):
+            document = PDFParser.from_buffer(buf).parse()
+            self.assertEqual(["Hello", "World"], list(document.extract_text()))
+
+    def test_extract_text_mmap(self):
+        with tempfile.TemporaryFile() as f:
+            f.write(hello_pdf())
+            f.flush()
+            document = PDFParser.from_mmap(f).parse()
+            self.assertEqual(["Hello", "World"], list(document.extract_text()))
+
+    def test_extract_text_pread(self):
+        with tempfile.TemporaryFile() as f:
+            f.write(hello_pdf())
+            f.flush()
+            for engine in ("state", "table"):
+                document = PDFParser.from_pread(f, engine=engine).parse()
+                self.assertEqual(["Hello", "World"],
+                                 list(document.extract_text()))
+
+    def test_pread_threads(self):
+        objects = hello_objects()
+        for obj_num in range(6, 106):
+            objects[obj_num] = stream_body(b"BT (%d) Tj ET" % obj_num)
+        with tempfile.TemporaryFile() as f:
+            f.write(build_pdf(objects))
+            f.flush()
+            document = PDFParser.from_pread(f, lazy_xref=True).parse()
+
+            def read(obj_num):
+                stream_obj = document._get_object_by_num(obj_num)
+                return document.get_stream(stream_obj).read_all()
+
+            with ThreadPoolExecutor(8) as executor:
+                texts = list(executor.map(read, range(6, 106)))
+        self.assertEqual([b"BT (%d) Tj ET" % obj_num
+                          for obj_num in range(6, 106)], texts)
+
+    def test_pread_stream(self):
+        with tempfile.TemporaryFile() as f:
+            f.write(b"abcdef")
+            f.flush()
+            stream = PreadStream.from_file(f)
+            self.assertEqual(b"ab", stream.read(2))
+            fork = stream.fork(4)
+            self.assertEqual(b"cdef", stream.read())
+            self.assertEqual(b"ef", fork.read(10))
+            self.assertEqual(b"", fork.read(1))
+            self.assertEqual(b"bc", stream.pread(2, 1))
+            self.assertEqual(6, stream.tell())
+
+    def test_buffer_stream(self):
+        for buf in (b"ab\rcd\r\nef\ngh", memoryview(b"ab\rcd\r\nef\ngh")):
+            stream = BufferStream(buf)
+            self.assertEqual(b"ab", stream.readline())
+            fork = stream.fork(stream.tell())
+            self.assertEqual(b"cd", stream.readline())
+            self.assertEqual(b"ef", stream.readline())
+            self.assertEqual(b"gh", stream.readline())
+            self.assertEqual(b"", stream.readline())
+            self.assertEqual(b"cd", bytes(fork.read(2)))
+            self.assertEqual(5, fork.tell())
+
 
 class FontParserTestCase(unittest.TestCase):
     def test_font_parser(self):
@@ -0,0 +1,63 @@
+import io
+import unittest
+
+from minimal_pdf_parser.parser import PDFParser
+from minimal_pdf_parser.recovery import scan_objects
+from pdf_fixtures import (hello_pdf, hello_objects, build_xref_stream_pdf,
+                          append_update, stream_body)
+
+
+def read_at(data):
+    return lambda offset, size: data[offset:offset + size]
+
+
+class RecoveryTestCase(unittest.TestCase):
+    def test_scan(self):
+        data = append_update(hello_pdf(),
+                             {5: stream_body(b"BT (Bye) Tj ET")})
+        expected = scan_objects(read_at(data), len(data))
+        self.assertEqual(data.rindex(b"5 0 obj"),
+                         expected.entry_by_obj_num[5][0])
+        self.assertEqual(data.rindex(b"trailer"), expected.trailer_offset)
+        self.assertEqual([1], expected.catalogs)
+        # the headers that cross the chunks are found
+        for chunk_size in (1, 3, 7, 64):
+            self.assertEqual(expected,
+                             scan_objects(read_at(data), len(data), chunk_size))
+
+    def test_scan_truncated_number(self):
+        data = b"%PDF-1.4\n12 0 obj\n<< >>\nendobj\n"
+        for chunk_size in range(1, 20):
+            result = scan_objects(read_at(data), len(data), chunk_size)
+            self.assertEqual({12: (9, 0)}, result.entry_by_obj_num)
+
+    def test_missing_xref(self):
+        data = hello_pdf()
+        data = data[:data.index(b"xref")]
+        self.assertRaises(ValueError, PDFParser(io.BytesIO(data)).parse)
+        with self.assertLogs(level="WARNING"):
+            document = PDFParser(io.BytesIO(data), recover=True).parse()
+        self.assertEqual(5, document.recovered_count)
+        self.assertEqual(["Hello", "World"], list(document.extract_text()))
+
+    def test_bad_startxref(self):
+        data = hello_pdf().replace(b"startxref\n", b"startxref\n9")
+        with self.assertLogs(level="WARNING"):
+            document = PDFParser.from_buffer(data, recover=True).parse()
+        self.assertEqual(b"/Catalog",
+                         document.get_root_object()[b"/Type"].bs)
+        self.assertEqual(6, document.size)
+
+    def test_object_stream(self):
+        objects = hello_objects()
+        compressed = {obj_num: objects.pop(obj_num) for obj_num in (1, 2, 3, 4)}
+        data = build_xref_stream_pdf(objects, compressed=compressed)
+        data = data[:data.rindex(b"startxref")]
+        with self.assertLogs(level="WARNING"):
+            document = PDFParser.from_buffer(data, recover=True).parse()
+        self.assertEqual(7, document.recovered_count)
+        self.assertEqual(["Hello", "World"], list(document.extract_text()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import io
+import os
+import tempfile
+import unittest
+from array import array
+from unittest import mock
+
+from minimal_pdf_parser.lexer import TableLexer
+from minimal_pdf_parser.parser import PDFParser, ObjectParser
+from minimal_pdf_parser.sidecar import (
+    index_key, read_index, write_index, DocumentIndex, to_pdf_syntax)
+from minimal_pdf_parser.tokenizer import XrefEntry
+from minimal_pdf_parser.xref import XrefIndex, CompressedXrefEntry
+from pdf_fixtures import (hello_objects, build_xref_stream_pdf, append_update,
+                          stream_body, hello_pdf, build_pdf)
+
+
+class SidecarTestCase(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.index_path = os.path.join(self._dir.name, "doc.idx")
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_round_trip(self):
+        xref_table = XrefIndex()
+        xref_table[1] = XrefEntry(15, 0, b"n")
+        xref_table[2] = CompressedXrefEntry(4, 70000)
+        key = index_key(100, 12, b"trailer")
+        write_index(self.index_path, key, DocumentIndex(
+            b"<</Size 3>>", xref_table, [1], array("q", [15, 100])))
+        index = read_index(self.index_path, key)
+        self.assertEqual(b"<</Size 3>>", index.trailer)
+        self.assertEqual(dict(xref_table), dict(index.xref_table))
+        self.assertEqual([1], index.page_obj_nums)
+        self.assertEqual([15, 100], list(index.offsets))
+        self.assertIsNone(read_index(self.index_path,
+                                     index_key(100, 12, b"other")))
+        self.assertIsNone(read_index(self.index_path + ".missing", key))
+
+    def test_pdf_syntax_numbers(self):
+        text = b"[0.0000001 -2.5 3 1. 123456789012.5 -.002]"
+        obj = ObjectParser(TableLexer(text)).parse()
+        syntax = to_pdf_syntax(obj)
+        self.assertEqual(b"[0.0000001 -2.5 3 1.0 123456789012.5 -0.002]",
+                         syntax)
+        self.assertEqual([v.value for v in obj], [
+            v.value for v in ObjectParser(TableLexer(syntax)).parse()])
+
+    def test_reopen(self):
+        data = append_update(build_xref_stream_pdf(hello_objects()),
+                             {5: stream_body(b"BT /F1 12 Tf (Bye) Tj ET")})
+        document = PDFParser(io.BytesIO(data)).parse(
+            index_path=self.index_path)
+        self.assertEqual(["Bye"], list(document.extract_text()))
+
+        with mock.patch.object(PDFParser, "get_xref_section",
+                               side_effect=AssertionError):
+            document = PDFParser(io.BytesIO(data)).parse(
+                index_path=self.index_path)
+            self.assertEqual(["Bye"], list(document.extract_text()))
+            self.assertEqual([3], document.get_page_obj_nums())
+            self.assertEqual(7, document.size)
+
+    def test_damaged_page_tree(self):
+        objects = hello_objects()
+        objects[2] = b"<< /Type /Pages /Kids 3 /Count 1 >>"
+        with self.assertLogs(level="WARNING"):
+            document = PDFParser(io.BytesIO(build_pdf(objects))).parse(
+                index_path=self.index_path)
+        self.assertEqual(6, document.size)
+        self.assertFalse(os.path.exists(self.index_path))
+
+    def test_stale_index(self):
+        with tempfile.TemporaryFile() as f:
+            f.write(hello_pdf())
+            f.flush()
+            PDFParser.from_pread(f).parse(index_path=self.index_path)
+            f.write(b"\n")
+            f.flush()
+            parser = PDFParser.from_pread(f)
+            self.assertIsNone(read_index(self.index_path, parser.index_key()))
+            document = parser.parse(index_path=self.index_path)
+            self.assertEqual(["Hello", "World"], list(document.extract_text()))
+            # the index was updated
+            self.assertIsNotNone(read_index(self.index_path,
+                                            parser.index_key()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,17 @@
 import io
 import unittest
 from pathlib import Path
-
-from minimal_pdf_parser.tokenizer import PDFTokenizer
+from unittest import mock
+
+from minimal_pdf_parser.lexer import (TableLexer, tokenize, TABLE_ENGINE,
+                                      scan_dict, scan_array, skip_object,
+                                      TokenError, lex_chunks)
+from minimal_pdf_parser.tokenizer import (PDFTokenizer, BinaryStreamWrapper,
+                                          BufferStreamWrapper,
+                                          BufferedBinaryStreamWrapper)
 from minimal_pdf_parser.base import OpenArrayToken, CloseArrayToken, StringObject, NameObject
+from minimal_pdf_parser import base
+from minimal_pdf_parser.base import decode_name, encode_name, intern_name
 
 
 FIXTURE_PATH = Path(__file__).parent.parent / "fixture"
@@ -119,6 +127,127 @@ are the same.)"""
             print(x)
 
 
+    def test_table_lexer_same_tokens(self):
+        for s in [
+            b"/ID [<9597C618BC90AFA4A078CA72B2DD061C> <48726007F483D>] ",
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612.5 792] >> ",
+            b"(These \\\ntwo strings \\\r\nare (the) same.) ",
+            b"(\\0053\\53\\245) (\\n\\t\\(\\x) <> <4> ",
+            b"1.2.3 -.5 +-3 T* ' \" % comment\r\n/a#20b [1 2] ",
+            b"BT /F1 12 Tf 72 712 Td (Hello) Tj [(W)-5(orld)] TJ ET ",
+        ]:
+            expected = [repr(t) for t in PDFTokenizer.create(io.BytesIO(s))]
+            actual = [repr(t) for t in TableLexer(s)]
+            self.assertEqual(expected, actual)
+
+    def test_table_lexer_last_token(self):
+        self.assertEqual(["WordToken(b'ET')"],
+                         [repr(t) for t in TableLexer(b"ET")])
+
+    def test_table_lexer_not_final(self):
+        s = b"/Type /Pa"
+        lexer = TableLexer(s, 0, False)
+        self.assertEqual(["NameObject(b'/Type')"], [repr(t) for t in lexer])
+        self.assertEqual(6, lexer.pos)
+        for s in [b"(abc", b"<4142", b"<", b">", b"% comment", b"12"]:
+            lexer = TableLexer(s, 0, False)
+            self.assertEqual([], list(lexer))
+            self.assertEqual(0, lexer.pos)
+
+    def test_number_values(self):
+        s = b"12 -3.5 +.5 4. 007 - 1.2.3 "
+        for tokens in [list(TableLexer(s)),
+                       list(PDFTokenizer.create(io.BytesIO(s)))]:
+            self.assertEqual([12, -3.5, 0.5, 4.0, 7, 1.2, 0.3],
+                             [t.value for t in tokens[:5] + tokens[6:]])
+            for _ in range(2):
+                with self.assertRaises(ValueError):
+                    tokens[5].value  # `-`
+            # not hidden by a default
+            self.assertRaises(ValueError, getattr, tokens[5], "value", None)
+            self.assertEqual("NumberObject(text=b'-')", repr(tokens[5]))
+            self.assertEqual(int, type(tokens[0].value))
+            self.assertFalse(hasattr(tokens[0], "__dict__"))
+
+    def test_interned_tokens(self):
+        s = b"/Type /Ty#70e /Font /A#2 Tj Tj "
+        for tokens in [list(TableLexer(s)),
+                       list(PDFTokenizer.create(io.BytesIO(s)))]:
+            self.assertEqual([b"/Type", b"/Type", b"/Font", b"/A#2", b"Tj",
+                              b"Tj"], [t.bs for t in tokens])
+            self.assertIs(tokens[0], tokens[1])
+            self.assertIs(tokens[4], tokens[5])
+        self.assertIs(next(iter(TableLexer(s))),
+                      next(iter(PDFTokenizer.create(io.BytesIO(s)))))
+
+    def test_name_escapes(self):
+        self.assertEqual(b"/A B#", decode_name(b"/A#20B#"))
+        self.assertEqual(b"/paired()parentheses",
+                         decode_name(b"/paired#28#29parentheses"))
+        self.assertEqual(b"/A#20B#23#2F", encode_name(b"/A B#/"))
+
+    def test_intern_escaped_names(self):
+        for spellings in [(b"/A#42", b"/A#2342"), (b"/A#2342", b"/A#42")]:
+            with mock.patch.dict(base._name_by_spelling, clear=True), \
+                    mock.patch.dict(base._name_by_bytes, clear=True):
+                names = [intern_name(bs) for bs in spellings * 2]
+                self.assertEqual([decode_name(bs) for bs in spellings * 2],
+                                 [name.bs for name in names])
+                self.assertIs(names[0], names[2])
+
+    def test_strings_in_one_step(self):
+        s = (b"(a (nested) \\) string) (\\0053\\53\\245) "
+             b"(line \\\r\ncontinued \\\ragain \\\n) (\\n\\t\\\\\\x) <41> "
+             * 3)
+        expected = [repr(t) for t in PDFTokenizer.create(io.BytesIO(s))]
+        self.assertEqual(["StringObject(b'a (nested) ) string')",
+                          "StringObject(b'\\x053+\\xa5')"], expected[:2])
+        for wrapper in [BufferStreamWrapper(memoryview(s)),
+                        BufferedBinaryStreamWrapper(io.BytesIO(s), 32)]:
+            self.assertEqual(expected,
+                             [repr(t) for t in PDFTokenizer(wrapper)])
+        self.assertEqual(expected, [repr(t) for t in TableLexer(s)])
+
+    def test_lex_chunks(self):
+        s = (b"BT /F1 12 Tf 72 712 Td (Hello) Tj [(W)-5.25(orld)] TJ "
+             b"<48656C6C6F> Tj % comment\n(" + b"long " * 2000 + b") Tj ET")
+        expected = [repr(t) for t in TableLexer(s)]
+        for size in (1, 7, 4096, len(s)):
+            chunks = [s[i:i + size] for i in range(0, len(s), size)]
+            self.assertEqual(expected, [repr(t) for t in lex_chunks(chunks)])
+        self.assertEqual([], list(lex_chunks([])))
+
+    def test_tokenize_table(self):
+        stream_wrapper = BinaryStreamWrapper(io.BytesIO(b"(a) Tj"))
+        self.assertEqual(["StringObject(b'a')", "WordToken(b'Tj')"],
+                         [repr(t) for t in tokenize(stream_wrapper,
+                                                    TABLE_ENGINE)])
+
+    def test_scan_dict(self):
+        s = (b"<< /A 1 0 R /B [1 (a]) <41>] %c >>\n/C << /D (x\\)) >> "
+             b"/E -1.5 /F true >>tail")
+        spans, end = scan_dict(s, 0)
+        self.assertEqual(b"tail", s[end:])
+        self.assertEqual({
+            b"/A": b"1 0 R", b"/B": b"[1 (a]) <41>]",
+            b"/C": b"<< /D (x\\)) >>", b"/E": b"-1.5", b"/F": b"true"
+        }, {k: s[start:stop] for k, (start, stop) in spans.items()})
+
+    def test_scan_array(self):
+        s = b"[1 2 3 0 R /R(())<<>>]"
+        spans, end = scan_array(s, 0)
+        self.assertEqual(len(s), end)
+        self.assertEqual([b"1", b"2", b"3 0 R", b"/R", b"(())", b"<<>>"],
+                         [s[start:stop] for start, stop in spans])
+
+    def test_scan_malformed(self):
+        for s in [b"<< /A 1", b"<< /A (b >>", b"<< 1 2 >>", b"<< /A <4G> >>",
+                  b"<< /A [1 >>", b"<< /A 1 >"]:
+            with self.assertRaises(TokenError):
+                scan_dict(s, 0)
+        with self.assertRaises(TokenError):
+            skip_object(b"  ", 0)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+
+from minimal_pdf_parser.xref import (decode_xref_stream, CompressedXrefEntry,
+                                     XrefIndex, XrefChain)
+from minimal_pdf_parser.tokenizer import XrefEntry
+
+
+class XrefTestCase(unittest.TestCase):
+    def test_decode_xref_stream(self):
+        data = bytes([
+            0, 0, 0, 0, 255,
+            1, 0, 0, 15, 0,
+            2, 0, 0, 12, 3,
+            1, 1, 0, 0, 0,
+        ])
+        self.assertEqual({
+            0: XrefEntry(0, 255, b"f"),
+            1: XrefEntry(15, 0, b"n"),
+            2: CompressedXrefEntry(12, 3),
+            10: XrefEntry(65536, 0, b"n"),
+        }, decode_xref_stream(data, [1, 3, 1], [0, 3, 10, 1]))
+
+    def test_decode_xref_stream_default_type(self):
+        data = bytes([0, 15, 0, 0, 20, 1])
+        self.assertEqual({
+            5: XrefEntry(15, 0, b"n"),
+            6: XrefEntry(20, 1, b"n"),
+        }, decode_xref_stream(data, [0, 2, 1], [5, 2]))
+
+    def test_decode_xref_stream_unknown_type(self):
+        data = bytes([7, 0, 1, 1, 2, 0])
+        self.assertEqual({1: XrefEntry(2, 0, b"n")},
+                         decode_xref_stream(data, [1, 1, 1], [0, 2]))
+
+
+class XrefIndexTestCase(unittest.TestCase):
+    def test_entries(self):
+        index = XrefIndex()
+        index[1] = XrefEntry(15, 0, b"n")
+        index[2] = CompressedXrefEntry(12, 3)
+        index[0] = XrefEntry(0, 65535, b"f")
+        index[1] = XrefEntry(17, 1, b"n")
+        self.assertEqual(3, len(index))
+        self.assertEqual([0, 1, 2], list(index))
+        self.assertEqual(XrefEntry(17, 1, b"n"), index[1])
+        self.assertEqual(CompressedXrefEntry(12, 3), index[2])
+        self.assertEqual(XrefEntry(0, 65535, b"f"), index[0])
+        self.assertEqual(17, index.byte_offset(1))
+        self.assertRaises(KeyError, index.byte_offset, 2)
+        self.assertNotIn(3, index)
+        self.assertRaises(KeyError, lambda: index[3])
+
+    def test_sparse(self):
+        index = XrefIndex(10)
+        index[5] = XrefEntry(15, 0, b"n")
+        index[10 ** 9] = XrefEntry(20, 0, b"n")
+        index[6] = CompressedXrefEntry(12, 70000)
+        self.assertEqual(3, len(index))
+        self.assertEqual([5, 6, 10 ** 9], list(index))
+        self.assertEqual(20, index.byte_offset(10 ** 9))
+        self.assertEqual(CompressedXrefEntry(12, 70000), index[6])
+        index[6] = CompressedXrefEntry(12, 1)
+        self.assertEqual(CompressedXrefEntry(12, 1), index[6])
+        self.assertEqual(3, len(index))
+        del index[10 ** 9]
+        del index[5]
+        self.assertEqual({6: CompressedXrefEntry(12, 1)}, dict(index))
+
+
+class XrefChainTestCase(unittest.TestCase):
+    def test_chain(self):
+        sections = {
+            10: ({2: "b2", 3: "b3"}, [(20, False), (30, True)]),
+            20: ({3: "c3"}, [(99, True)]),
+            30: ({1: "d1", 4: "d4"}, [(10, True)]),  # a loop
+        }
+        loaded = []
+
+        def load_section(offset, follow):
+            loaded.append(offset)
+            table, pending = sections[offset]
+            return table, pending if follow else []
+
+        chain = XrefChain({1: "a1"}, [(10, True)], load_section)
+        self.assertEqual("a1", chain[1])
+        self.assertEqual([], loaded)
+        self.assertEqual("b3", chain[3])
+        self.assertEqual([10], loaded)
+        self.assertEqual("d4", chain[4])
+        self.assertEqual([10, 20, 30], loaded)
+        self.assertNotIn(5, chain)
+        self.assertEqual([1, 2, 3, 4], sorted(chain))
+        self.assertEqual(4, chain.loaded_count)
+
+
+if __name__ == "__main__":
+    unittest.main()